@@ -1,6 +1,7 @@
 import os
-from celery import Celery
+from celery import Celery, signals
 from celery.schedules import crontab
+from kombu import Queue
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
@@ -11,6 +12,40 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 # Автоматически находим задачи в приложениях
 app.autodiscover_tasks()
 
+# Очереди:
+# - interactive: задачи, запущенные действиями пользователей (должны выполняться сразу)
+# - feeds: обновление кэшей TMDB и индексов (короткие, по расписанию)
+# - batch: тяжёлые задачи по всему каталогу (синхронизация, пересчёты)
+# У каждой очереди свои воркеры, поэтому большой batch не задерживает interactive.
+app.conf.task_queues = (
+    Queue('interactive'),
+    Queue('feeds'),
+    Queue('batch'),
+)
+app.conf.task_default_queue = 'interactive'
+app.conf.task_routes = {
+    'movies.tasks.fan_out_activity': {'queue': 'interactive'},
+    'movies.tasks.update_trending_cache': {'queue': 'feeds'},
+    'movies.tasks.update_popular_cache': {'queue': 'feeds'},
+    'movies.tasks.update_title_index': {'queue': 'feeds'},
+    'movies.tasks.update_genre_map': {'queue': 'feeds'},
+    'movies.tasks.compact_leaderboards': {'queue': 'feeds'},
+    'movies.tasks.sync_tmdb_changes': {'queue': 'batch'},
+    'movies.tasks.refresh_films_batch': {'queue': 'batch'},
+    'movies.tasks.import_library_items': {'queue': 'batch'},
+    'movies.tasks.recompute_recommendations': {'queue': 'batch'},
+    'movies.tasks.recompute_recommendations_shard': {'queue': 'batch'},
+    'movies.tasks.recommendations_report': {'queue': 'batch'},
+}
+
+# Профили воркеров (параметры командной строки, см. README):
+#   interactive: -Q interactive -c 8 --prefetch-multiplier 4
+#   feeds:       -Q feeds -c 2 --prefetch-multiplier 1
+#   batch:       -Q batch -c 4 --prefetch-multiplier 1 -O fair
+# По умолчанию воркер не набирает задачи впрок: длинная задача не держит
+# очередь из уже полученных сообщений.
+app.conf.worker_prefetch_multiplier = 1
+
 # Настройка периодических задач
 app.conf.beat_schedule = {
     'update-trending-cache': {
@@ -21,6 +56,41 @@ app.conf.beat_schedule = {
         'task': 'movies.tasks.update_popular_cache',
         'schedule': crontab(hour='*/6'),  # Каждые 6 часов
     },
+    'update-title-index': {
+        'task': 'movies.tasks.update_title_index',
+        'schedule': crontab(minute=30),  # Каждый час
+    },
+    'compact-leaderboards': {
+        'task': 'movies.tasks.compact_leaderboards',
+        'schedule': crontab(minute=45),  # Каждый час
+    },
+    'sync-tmdb-changes': {
+        'task': 'movies.tasks.sync_tmdb_changes',
+        'schedule': crontab(hour=3, minute=15),  # Раз в сутки
+    },
+    'update-genre-map': {
+        'task': 'movies.tasks.update_genre_map',
+        'schedule': crontab(hour=4, minute=0),  # Раз в сутки
+    },
+    'recompute-recommendations': {
+        'task': 'movies.tasks.recompute_recommendations',
+        'schedule': crontab(hour=2, minute=0),  # Каждую ночь
+    },
 }
 
 app.conf.timezone = 'UTC'
+
+
+@signals.worker_init.connect
+def warm_up_worker(**kwargs):
+    # Прогрев в родительском процессе: дочерние процессы пула получают его через fork
+    from config.warmup import warm_up
+
+    warm_up()
+
+
+@signals.worker_process_init.connect
+def close_inherited_connections(**kwargs):
+    from django.db import connections
+
+    connections.close_all()
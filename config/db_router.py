@@ -0,0 +1,69 @@
+"""
+Primary/replica database routing.
+
+Writes always go to the primary ("default"). Reads go to a random replica
+(settings.DATABASE_REPLICAS) only inside GET/HEAD requests, so that
+Celery tasks, management commands and form handlers that read data they
+or the request just wrote never see replication lag.
+
+Read-your-writes: after any write in a request the rest of that request
+reads from the primary, and the response sets a short-lived cookie that
+keeps the user's following requests on the primary for
+settings.DATABASE_PRIMARY_PIN_SECONDS (e.g. the redirect after changing a
+watch status or saving a review).
+"""
+
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+
+PIN_COOKIE = "db_primary"
+
+_use_replica = ContextVar("db_use_replica", default=False)
+_wrote = ContextVar("db_wrote", default=False)
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if settings.DATABASE_REPLICAS and _use_replica.get():
+            return random.choice(settings.DATABASE_REPLICAS)
+        return "default"
+
+    def db_for_write(self, model, **hints):
+        _use_replica.set(False)
+        _wrote.set(True)
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == "default"
+
+
+class ReplicaRoutingMiddleware:
+    """Enables replica reads for safe requests of users that didn't write recently."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        use_replica = request.method in ("GET", "HEAD") and PIN_COOKIE not in request.COOKIES
+        use_replica_token = _use_replica.set(use_replica)
+        wrote_token = _wrote.set(False)
+        try:
+            response = self.get_response(request)
+            if _wrote.get():
+                response.set_cookie(
+                    PIN_COOKIE,
+                    "1",
+                    max_age=settings.DATABASE_PRIMARY_PIN_SECONDS,
+                    httponly=True,
+                    samesite="Lax",
+                )
+        finally:
+            _use_replica.reset(use_replica_token)
+            _wrote.reset(wrote_token)
+        return response
@@ -47,6 +47,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'config.db_router.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -78,8 +79,6 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
-load_dotenv()
-
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.postgresql",
@@ -88,9 +87,36 @@ DATABASES = {
         "PASSWORD": os.getenv("DB_PASSWORD"),
         "HOST": os.getenv("DB_HOST"),
         "PORT": os.getenv("DB_PORT"),
+        "OPTIONS": {
+            # psycopg connection pool per process (and per database alias)
+            "pool": {
+                "min_size": int(os.getenv("DB_POOL_MIN_SIZE", "2")),
+                "max_size": int(os.getenv("DB_POOL_MAX_SIZE", "10")),
+                "timeout": int(os.getenv("DB_POOL_TIMEOUT", "10")),
+            },
+        },
     }
 }
 
+# Read replicas (comma-separated hosts, same credentials as the primary).
+# GET requests read from a random replica unless the user wrote recently,
+# see config/db_router.py.
+DATABASE_REPLICAS = []
+for _i, _host in enumerate(h.strip() for h in os.getenv("DB_REPLICA_HOSTS", "").split(",")):
+    if _host:
+        DATABASES[f"replica_{_i}"] = {
+            **DATABASES["default"],
+            "HOST": _host,
+            "TEST": {"MIRROR": "default"},
+        }
+        DATABASE_REPLICAS.append(f"replica_{_i}")
+
+DATABASE_ROUTERS = ["config.db_router.PrimaryReplicaRouter"]
+
+# After a write the user's reads stay on the primary for this long (seconds),
+# so they see their own changes despite replication lag
+DATABASE_PRIMARY_PIN_SECONDS = int(os.getenv("DATABASE_PRIMARY_PIN_SECONDS", "10"))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -132,9 +158,20 @@ STATICFILES_DIRS = [
     BASE_DIR / "static",
 ]
 
+MEDIA_ROOT = Path(os.getenv("MEDIA_ROOT") or BASE_DIR / "media")
+
+# Local copies of TMDB posters (movies.posters). With POSTER_ACCEL_REDIRECT set
+# (e.g. "/protected-posters/", an nginx `internal` location aliased to
+# POSTER_ROOT) files are sent by nginx instead of Django.
+POSTER_ROOT = Path(os.getenv("POSTER_ROOT") or MEDIA_ROOT / "posters")
+POSTER_ACCEL_REDIRECT = os.getenv("POSTER_ACCEL_REDIRECT", "")
+
 
 AUTH_USER_MODEL = 'users.User'
 
+# Cache-Control max-age for pages that anonymous visitors can share via a proxy
+PUBLIC_PAGE_MAX_AGE = int(os.getenv("PUBLIC_PAGE_MAX_AGE", "300"))
+
 LOGIN_URL = "/login/"
 
 LOGIN_REDIRECT_URL = "/"
@@ -143,6 +180,25 @@ LOGOUT_REDIRECT_URL = "/login/"
 
 TMDB_API_KEY = os.getenv("TMDB_API_KEY")
 
+# TMDB circuit breaker: open after N consecutive failures, retry after cooldown (seconds)
+TMDB_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("TMDB_CIRCUIT_FAILURE_THRESHOLD", "5"))
+TMDB_CIRCUIT_COOLDOWN = int(os.getenv("TMDB_CIRCUIT_COOLDOWN", "30"))
+
+# Global outbound TMDB budget shared by all processes (token bucket in Redis).
+# Background jobs can't dip into the last INTERACTIVE_RESERVE tokens and wait
+# up to MAX_WAIT seconds for a token; interactive requests fail fast.
+TMDB_RATE_LIMIT_PER_SECOND = float(os.getenv("TMDB_RATE_LIMIT_PER_SECOND", "20"))
+TMDB_RATE_LIMIT_BURST = int(os.getenv("TMDB_RATE_LIMIT_BURST", "40"))
+TMDB_RATE_LIMIT_INTERACTIVE_RESERVE = int(os.getenv("TMDB_RATE_LIMIT_INTERACTIVE_RESERVE", "10"))
+TMDB_RATE_LIMIT_MAX_WAIT = float(os.getenv("TMDB_RATE_LIMIT_MAX_WAIT", "30"))
+
+# JSON file with {"movie": [tmdb ids], "tv": [...]} used by the daily changes
+# sync instead of the TMDB /changes endpoints (local development)
+TMDB_CHANGES_FIXTURE = os.getenv("TMDB_CHANGES_FIXTURE", "")
+
+# Number of user shards for the nightly recommendations recompute
+RECOMMENDATION_SHARDS = int(os.getenv("RECOMMENDATION_SHARDS", "16"))
+
 # Celery Configuration
 CELERY_BROKER_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 CELERY_RESULT_BACKEND = os.getenv("REDIS_URL", "redis://localhost:6379/0")
@@ -158,8 +214,25 @@ CACHES = {
         "LOCATION": os.getenv("REDIS_URL", "redis://localhost:6379/1"),
         "OPTIONS": {
             "CLIENT_CLASS": "django_redis.client.DefaultClient",
+            # Cached TMDB payloads are text-heavy and compress well
+            "COMPRESSOR": "django_redis.compressors.zlib.ZlibCompressor",
         },
         "KEY_PREFIX": "cinema_tracker",
         "TIMEOUT": 300,  # 5 minutes default
-    }
-}
\ No newline at end of file
+    },
+    # Per-process cache for rendered template fragments. Fragment keys contain
+    # versions/fingerprints of their data, so processes never serve stale HTML.
+    "fragments": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "fragments",
+        "TIMEOUT": 60 * 60,
+        "OPTIONS": {
+            "MAX_ENTRIES": 5000,
+        },
+    },
+}
+
+# In-process L1 in front of Redis for hot shared keys (feeds, genre map),
+# see movies/local_cache.py. Kept coherent by pub/sub; the TTL bounds staleness.
+LOCAL_CACHE_MAX_ENTRIES = int(os.getenv("LOCAL_CACHE_MAX_ENTRIES", "256"))
+LOCAL_CACHE_TIMEOUT = int(os.getenv("LOCAL_CACHE_TIMEOUT", "60"))
@@ -0,0 +1,76 @@
+from unittest import mock
+
+from django.http import HttpResponse
+from django.template.loader import get_template
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from config.db_router import PIN_COOKIE, PrimaryReplicaRouter, ReplicaRoutingMiddleware
+from config.warmup import WARM_TEMPLATES, warm_up
+
+
+@override_settings(DATABASE_REPLICAS=["replica_0"], DATABASE_PRIMARY_PIN_SECONDS=10)
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+        self.factory = RequestFactory()
+        self.reads = []
+
+    def request(self, request, write=False):
+        def view(request):
+            self.reads.append(self.router.db_for_read(None))
+            if write:
+                self.assertEqual(self.router.db_for_write(None), "default")
+                self.reads.append(self.router.db_for_read(None))
+            return HttpResponse()
+
+        return ReplicaRoutingMiddleware(view)(request)
+
+    def test_safe_requests_read_from_replicas(self):
+        response = self.request(self.factory.get("/"))
+        self.assertEqual(self.reads, ["replica_0"])
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_unsafe_requests_and_code_outside_requests_use_the_primary(self):
+        self.request(self.factory.post("/"))
+        self.assertEqual(self.reads, ["default"])
+        # Celery tasks, management commands, and code after the request
+        self.assertEqual(self.router.db_for_read(None), "default")
+
+    def test_write_switches_to_primary_and_pins_the_user(self):
+        response = self.request(self.factory.get("/"), write=True)
+
+        self.assertEqual(self.reads, ["replica_0", "default"])
+        cookie = response.cookies[PIN_COOKIE]
+        self.assertEqual(cookie["max-age"], 10)
+        self.assertTrue(cookie["httponly"])
+
+    def test_pinned_users_read_from_primary(self):
+        request = self.factory.get("/")
+        request.COOKIES[PIN_COOKIE] = "1"
+        self.request(request)
+        self.assertEqual(self.reads, ["default"])
+
+    def test_without_replicas_everything_uses_the_primary(self):
+        with override_settings(DATABASE_REPLICAS=[]):
+            self.request(self.factory.get("/"))
+        self.assertEqual(self.reads, ["default"])
+
+    def test_migrations_run_on_the_primary_only(self):
+        self.assertTrue(self.router.allow_migrate("default", "movies"))
+        self.assertFalse(self.router.allow_migrate("replica_0", "movies"))
+
+
+class WarmUpTests(SimpleTestCase):
+    @mock.patch("config.warmup.close_connections_before_fork")
+    def test_templates_are_compiled_and_connections_closed(self, close_connections):
+        with mock.patch("config.warmup.get_template") as get_template:
+            warm_up()
+        self.assertEqual(
+            [call.args[0] for call in get_template.call_args_list], list(WARM_TEMPLATES),
+        )
+        close_connections.assert_called_once_with()
+
+    def test_warm_templates_exist(self):
+        for name in WARM_TEMPLATES:
+            with self.subTest(template=name):
+                get_template(name)
@@ -0,0 +1,64 @@
+"""
+Warm-up of a parent process before it forks workers
+(gunicorn with preload_app, Celery prefork pool).
+
+Whatever is loaded here is inherited by every forked worker (copy-on-write),
+so a new worker starts serving without paying for imports, URL resolving
+and template compilation. Nothing here may open database or TMDB
+connections: sockets and connection pools don't survive fork.
+"""
+
+import importlib
+
+from django.db import connections
+from django.template import TemplateDoesNotExist
+from django.template.loader import get_template
+from django.urls import get_resolver
+
+WARM_MODULES = (
+    "movies.views",
+    "users.views",
+    "movies.tasks",
+    "movies.services_tmdb",
+    "movies.tmdb_client",
+)
+
+WARM_TEMPLATES = (
+    "home.html",
+    "users/dashboard_rail.html",
+    "users/profile.html",
+    "users/watchlist.html",
+    "movies/search_movies.html",
+    "movies/film_detail.html",
+    "movies/recommendations.html",
+)
+
+
+def warm_up():
+    for module in WARM_MODULES:
+        importlib.import_module(module)
+
+    # Builds the URL resolver's lookup tables
+    get_resolver().reverse_dict
+
+    # Compiled templates stay in the cached template loader (DEBUG=False)
+    for name in WARM_TEMPLATES:
+        try:
+            get_template(name)
+        except TemplateDoesNotExist:
+            pass
+
+    close_connections_before_fork()
+
+
+def close_connections_before_fork():
+    """
+    Closes every database connection of this process, including psycopg
+    connection pools: close_all() only returns pooled connections to the
+    pool, whose open sockets would then be shared with the forked children.
+    """
+    for connection in connections.all(initialized_only=True):
+        connection.close()
+        # PostgreSQL backend only; a no-op without the "pool" option
+        if hasattr(connection, "close_pool"):
+            connection.close_pool()
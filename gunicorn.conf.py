@@ -0,0 +1,36 @@
+"""
+Gunicorn configuration.
+
+The app is loaded and warmed up once in the master process (preload_app),
+then workers are forked from it, so new workers and new pods start serving
+without re-importing Django. Run with:
+
+    gunicorn -c gunicorn.conf.py
+"""
+
+import multiprocessing
+import os
+
+wsgi_app = "config.wsgi:application"
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv("GUNICORN_THREADS", "1"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "30"))
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "2000"))
+max_requests_jitter = 200
+
+preload_app = True
+
+
+def when_ready(server):
+    # Runs in the master after the app is loaded, before workers are forked
+    from config.warmup import warm_up
+
+    warm_up()
+
+
+def post_fork(server, worker):
+    # Connections must never be shared with the master
+    from django.db import connections
+
+    connections.close_all()
@@ -1,7 +1,165 @@
-from django.contrib import admin
-from .models import Film, Genre, Review, WatchStatus
+"""
+Admin for tables that are too big for the defaults.
 
-admin.site.register(Genre)
-admin.site.register(Film)
-admin.site.register(WatchStatus)
-admin.site.register(Review)
\ No newline at end of file
+- Changelists don't run COUNT(*) over a whole table: EstimatedCountPaginator
+  reads the planner's row estimate (pg_class.reltuples) for unfiltered
+  lists, and show_full_result_count is off.
+- Rows are loaded with their user/film in the same query (list_select_related),
+  and FK fields use raw id / autocomplete widgets instead of <select>s with
+  every user and film.
+- Searches and filters only use indexed columns (exact username, film title
+  prefix - see migration 0010, TMDB id) and choice fields.
+- Bulk actions are single UPDATE statements or Celery tasks.
+
+Admin pages are GET requests, so with replicas configured they read from a
+replica (config/db_router.py) and don't load the primary.
+"""
+
+from django.contrib import admin, messages
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+from .models import Activity, Film, Genre, Review, WatchStatus
+from .services import update_watch_statuses
+from .tasks import REFRESH_BATCH_SIZE, refresh_films_batch
+
+# Below this estimate the exact count is cheap enough
+EXACT_COUNT_THRESHOLD = 10000
+
+
+class EstimatedCountPaginator(Paginator):
+    """Uses the PostgreSQL row estimate instead of COUNT(*) for unfiltered querysets."""
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        estimate = None
+        if not queryset.query.where:
+            estimate = _estimate_rows(queryset.db, queryset.model._meta.db_table)
+        if estimate is None or estimate < EXACT_COUNT_THRESHOLD:
+            return super().count
+        return estimate
+
+
+def _estimate_rows(alias, table):
+    """Planner estimate of a table's rows (including partitions), None if unknown."""
+    connection = connections[alias]
+    if connection.vendor != "postgresql":
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT SUM(GREATEST(c.reltuples, 0))::bigint FROM pg_class c "
+            "WHERE c.oid = to_regclass(%s) "
+            "OR c.oid IN (SELECT inhrelid FROM pg_inherits WHERE inhparent = to_regclass(%s))",
+            [table, table],
+        )
+        row = cursor.fetchone()
+    return row[0] if row and row[0] else None
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(Genre)
+class GenreAdmin(admin.ModelAdmin):
+    search_fields = ("name",)
+    ordering = ("name",)
+
+
+@admin.register(Film)
+class FilmAdmin(LargeTableAdmin):
+    list_display = ("title", "type", "start_year", "end_year", "tmdb_id", "updated_at")
+    list_filter = ("type",)
+    # Title prefix or TMDB id, see get_search_results
+    search_fields = ("title",)
+    search_help_text = "Title prefix or TMDB id"
+    ordering = ("-id",)
+    readonly_fields = ("updated_at",)
+    actions = ("resync_from_tmdb",)
+
+    def get_search_results(self, request, queryset, search_term):
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        if search_term.isdigit():
+            return queryset.filter(tmdb_id=int(search_term)), False
+        # UPPER(title) LIKE 'X%' uses the prefix index from migration 0010
+        return queryset.filter(title__istartswith=search_term), False
+
+    @admin.action(description="Re-sync selected films from TMDB")
+    def resync_from_tmdb(self, request, queryset):
+        film_ids = list(queryset.filter(tmdb_id__isnull=False).values_list("id", flat=True))
+        for i in range(0, len(film_ids), REFRESH_BATCH_SIZE):
+            refresh_films_batch.delay(film_ids[i:i + REFRESH_BATCH_SIZE])
+        self.message_user(
+            request,
+            f"Queued {len(film_ids)} films for re-sync from TMDB.",
+            messages.SUCCESS,
+        )
+
+
+class RatingFilter(admin.SimpleListFilter):
+    """Fixed 1-10 choices (the default filter would SELECT DISTINCT over the table)."""
+
+    title = "rating"
+    parameter_name = "rating"
+
+    def lookups(self, request, model_admin):
+        return [(str(rating), str(rating)) for rating in range(10, 0, -1)]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(rating=self.value())
+        return queryset
+
+
+class UserFilmAdmin(LargeTableAdmin):
+    list_select_related = ("user", "film")
+    raw_id_fields = ("user",)
+    autocomplete_fields = ("film",)
+    search_fields = ("user__username__exact",)
+    search_help_text = "Exact username"
+    # Matches the (user_id, id) primary key of the partitioned tables
+    ordering = ("-user_id", "-id")
+
+
+def _status_action(status, label):
+    @admin.action(description=f"Mark selected as {label}")
+    def action(modeladmin, request, queryset):
+        count = update_watch_statuses(queryset=queryset, status=status)
+        modeladmin.message_user(request, f"Updated {count} watch statuses.", messages.SUCCESS)
+
+    action.__name__ = f"mark_{status}"
+    return action
+
+
+@admin.register(WatchStatus)
+class WatchStatusAdmin(UserFilmAdmin):
+    list_display = ("user", "film", "status", "updated_at")
+    list_filter = ("status",)
+    readonly_fields = ("created_at", "updated_at")
+    actions = [_status_action(value, label) for value, label in WatchStatus.Status.choices]
+
+
+@admin.register(Review)
+class ReviewAdmin(UserFilmAdmin):
+    list_display = ("user", "film", "rating", "updated_at")
+    list_filter = (RatingFilter,)
+    readonly_fields = ("created_at", "updated_at")
+
+
+@admin.register(Activity)
+class ActivityAdmin(LargeTableAdmin):
+    list_display = ("user", "film", "verb", "status", "rating", "created_at")
+    list_filter = ("verb",)
+    list_select_related = ("user", "film")
+    raw_id_fields = ("user",)
+    autocomplete_fields = ("film",)
+    search_fields = ("user__username__exact",)
+    search_help_text = "Exact username"
+    # Same order as created_at, but served by the primary key index
+    ordering = ("-id",)
+    readonly_fields = ("created_at",)
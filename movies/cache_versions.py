@@ -0,0 +1,117 @@
+"""
+Generation counters for O(1) invalidation of derived caches.
+
+Every user and every film has a version number stored in the cache. Cache
+keys of anything derived from a user's or film's data include that version,
+so bumping the counter makes all dependent entries stale at once without
+scanning or deleting keys; the old entries simply expire.
+
+- versioned_key() builds a cache key from a name and user/film versions.
+- @versioned_cache caches a service function's result under such a key.
+- bump_versions() is called by services after writes and by model signals.
+
+Missing counters are initialised from the current time in milliseconds, so
+a counter that was evicted never goes back to a generation that may still
+have live entries.
+"""
+
+import time
+from functools import wraps
+
+from django.core.cache import cache
+from django_redis import get_redis_connection
+
+USER = "user"
+FILM = "film"
+FEED = "feed"
+
+_MISSING = object()
+
+
+def _version_key(scope, pk):
+    return f"cachever:{scope}:{pk}"
+
+
+def _initial_version():
+    return int(time.time() * 1000)
+
+
+def get_versions(scope, pks):
+    """Returns {pk: version} for the given scope, initialising missing counters."""
+    keys = {_version_key(scope, pk): pk for pk in pks}
+    found = cache.get_many(keys)
+
+    versions = {keys[key]: int(value) for key, value in found.items()}
+    for key, pk in keys.items():
+        if pk in versions:
+            continue
+        initial = _initial_version()
+        if not cache.add(key, initial, timeout=None):
+            initial = cache.get(key, initial)
+        versions[pk] = int(initial)
+    return versions
+
+
+def get_version(scope, pk):
+    return get_versions(scope, [pk])[pk]
+
+
+def bump_versions(*, users=(), films=(), feeds=()):
+    """Increments generation counters in one Redis round trip."""
+    conn = get_redis_connection("default")
+    pipe = conn.pipeline(transaction=False)
+    initial = _initial_version()
+    for scope, pks in ((USER, users), (FILM, films), (FEED, feeds)):
+        for pk in set(pks):
+            key = cache.make_key(_version_key(scope, pk))
+            pipe.set(key, initial, nx=True)
+            pipe.incr(key)
+    pipe.execute()
+
+
+def versioned_key(name, *parts, user=None, film=None):
+    """
+    Builds a cache key that changes whenever the user's or film's version
+    is bumped. parts are extra values the cached data depends on.
+    """
+    segments = [name]
+    if user is not None:
+        user_pk = getattr(user, "pk", user)
+        segments.append(f"u{user_pk}.{get_version(USER, user_pk)}")
+    if film is not None:
+        film_pk = getattr(film, "pk", film)
+        segments.append(f"f{film_pk}.{get_version(FILM, film_pk)}")
+    segments.extend(str(part) for part in parts)
+    return ":".join(segments)
+
+
+def versioned_cache(name, timeout=60 * 60, user_arg="user", film_arg="film"):
+    """
+    Caches a keyword-only service function under a versioned key.
+
+    The user/film are taken from the user_arg/film_arg keyword arguments;
+    the remaining keyword arguments become part of the key.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(**kwargs):
+            parts = [
+                f"{k}={v}" for k, v in sorted(kwargs.items())
+                if k not in (user_arg, film_arg)
+            ]
+            key = versioned_key(
+                name,
+                *parts,
+                user=kwargs.get(user_arg),
+                film=kwargs.get(film_arg),
+            )
+            result = cache.get(key, _MISSING)
+            if result is _MISSING:
+                result = func(**kwargs)
+                cache.set(key, result, timeout)
+            return result
+
+        wrapper.uncached = func
+        return wrapper
+
+    return decorator
@@ -0,0 +1,79 @@
+"""
+Circuit breaker for outbound calls to external APIs (TMDB).
+
+State lives in the shared Django cache (Redis), so every web and Celery
+worker sees the same picture: once the upstream has failed enough times in a
+row, all workers stop calling it until the cooldown expires.
+
+- closed: calls go through, consecutive failures are counted.
+- open: calls are short-circuited until the cooldown key expires.
+- half-open: after the cooldown a single probe call goes through (the first
+  caller to take the probe key); a success resets the counter, a failure
+  re-opens the circuit immediately. Other callers are short-circuited
+  until the probe finishes.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is short-circuited because the circuit is open."""
+
+
+class CircuitBreaker:
+    def __init__(self, name, failure_threshold=5, cooldown=30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+
+    @property
+    def _failures_key(self):
+        return f"circuit:{self.name}:failures"
+
+    @property
+    def _open_key(self):
+        return f"circuit:{self.name}:open"
+
+    @property
+    def _probe_key(self):
+        return f"circuit:{self.name}:probe"
+
+    def is_open(self):
+        return cache.get(self._open_key) is not None
+
+    def allow_request(self):
+        """
+        True if a call may go through now. In the half-open state only the
+        caller that takes the probe key is let through.
+        """
+        if self.is_open():
+            return False
+        if cache.get(self._failures_key, 0) < self.failure_threshold:
+            return True
+        return cache.add(self._probe_key, True, self.cooldown)
+
+    def record_success(self):
+        cache.delete_many([self._failures_key, self._probe_key])
+
+    def record_failure(self):
+        # add() is a no-op if the counter already exists; the TTL makes stale
+        # failures from long ago stop counting towards the threshold.
+        cache.add(self._failures_key, 0, self.cooldown * 10)
+        try:
+            failures = cache.incr(self._failures_key)
+        except ValueError:
+            failures = 1
+            cache.set(self._failures_key, failures, self.cooldown * 10)
+
+        if failures >= self.failure_threshold:
+            cache.set(self._open_key, True, self.cooldown)
+            # The next probe is allowed once the new cooldown expires
+            cache.delete(self._probe_key)
+
+
+tmdb_breaker = CircuitBreaker(
+    "tmdb",
+    failure_threshold=settings.TMDB_CIRCUIT_FAILURE_THRESHOLD,
+    cooldown=settings.TMDB_CIRCUIT_COOLDOWN,
+)
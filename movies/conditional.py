@@ -0,0 +1,122 @@
+"""
+Validators for HTTP conditional GET (ETag / Last-Modified).
+
+Each page's validators come from max(updated_at) and row counts of the
+rows it renders (counts catch deletions; the profile also uses the latest
+activity id), plus the viewer, so unchanged pages can be answered with
+304 Not Modified without rendering.
+Validators are computed once per request and reused by both
+etag_func and last_modified_func of @condition.
+
+Pages with pending flash messages are never answered with 304, otherwise
+the message would not be shown.
+"""
+
+import hashlib
+import time
+
+from django.contrib import messages
+from django.db.models import Count, Max
+
+from .models import Activity, Film, FilmStats, Review, TasteProfile, WatchStatus
+
+# film_detail also shows data we don't track here (recommendations based on
+# other films' ratings, TMDB rating), so its ETag rotates at least this often.
+FILM_ETAG_MAX_AGE = 60 * 60
+
+
+def _aggregate(queryset):
+    row = queryset.aggregate(last=Max("updated_at"), n=Count("id"))
+    return row["last"], row["n"]
+
+
+def _validators(request, key, compute):
+    """Compute (etag, last_modified) once per request."""
+    cache = request.__dict__.setdefault("_conditional_validators", {})
+    if key not in cache:
+        if len(messages.get_messages(request)):
+            cache[key] = (None, None)
+        else:
+            parts, timestamps = compute()
+            viewer = request.user.pk if request.user.is_authenticated else 0
+            raw = ":".join(str(p) for p in (key, viewer, *parts, *timestamps))
+            timestamps = [t for t in timestamps if t is not None]
+            cache[key] = (
+                hashlib.md5(raw.encode()).hexdigest(),
+                max(timestamps) if timestamps else None,
+            )
+    return cache[key]
+
+
+def _film_detail(request, film_id):
+    def compute():
+        film_updated = Film.objects.filter(id=film_id).values_list("updated_at", flat=True).first()
+        # Other users' reviews via the per-film summary (Review is partitioned by user)
+        stats = FilmStats.objects.filter(film_id=film_id).values_list("updated_at", "reviews_count").first()
+        stats_updated, reviews_count = stats or (None, 0)
+        timestamps = [film_updated, stats_updated]
+        if request.user.is_authenticated:
+            # The viewer's own review and status change the page right away
+            status_last, _ = _aggregate(
+                WatchStatus.objects.filter(user=request.user, film_id=film_id)
+            )
+            review_last, _ = _aggregate(
+                Review.objects.filter(user=request.user, film_id=film_id)
+            )
+            timestamps += [status_last, review_last]
+        return [reviews_count, int(time.time() // FILM_ETAG_MAX_AGE)], timestamps
+
+    return _validators(request, f"film:{film_id}", compute)
+
+
+def film_detail_etag(request, film_id):
+    return _film_detail(request, film_id)[0]
+
+
+def film_detail_last_modified(request, film_id):
+    return _film_detail(request, film_id)[1]
+
+
+def _profile(request, username=None):
+    def compute():
+        owner = {"user__username": username} if username else {"user": request.user}
+        status_last, status_count = _aggregate(WatchStatus.objects.filter(**owner))
+        reviews_last, reviews_count = _aggregate(Review.objects.filter(**owner))
+        # The page also shows the taste summary and the activity feed
+        taste_updated = (
+            TasteProfile.objects.filter(**owner).values_list("updated_at", flat=True).first()
+        )
+        last_activity = Activity.objects.filter(**owner).aggregate(last=Max("id"))["last"]
+        return [
+            username, status_count, reviews_count, last_activity, request.GET.get("page", ""),
+        ], [status_last, reviews_last, taste_updated]
+
+    return _validators(request, f"profile:{username}", compute)
+
+
+def profile_etag(request, username=None):
+    return _profile(request, username)[0]
+
+
+def profile_last_modified(request, username=None):
+    return _profile(request, username)[1]
+
+
+def _watchlist(request, status):
+    def compute():
+        # The list renders the films too, so their metadata changes count
+        row = WatchStatus.objects.filter(user=request.user, status=status).aggregate(
+            last=Max("updated_at"), n=Count("id"), films_last=Max("film__updated_at"),
+        )
+        reviews_last, reviews_count = _aggregate(Review.objects.filter(user=request.user))
+        return [row["n"], reviews_count], [row["last"], row["films_last"], reviews_last]
+
+    return _validators(request, f"watchlist:{status}", compute)
+
+
+def watchlist_etag(request, status):
+    return _watchlist(request, status)[0]
+
+
+def watchlist_last_modified(request, status):
+    return _watchlist(request, status)[1]
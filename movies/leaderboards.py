@@ -0,0 +1,217 @@
+"""
+Site-wide film leaderboards stored in Redis (time-decayed sorted sets).
+
+Boards rank films by what users did recently:
+
+- "added": films added to a library (planned / watching / watched), +1;
+- "rated": reviews, +1 for a 10 and -1 for a 1 (5.5 is neutral).
+
+Each user counts once per film: the weight last counted for a (user, film)
+and the increment it added are remembered per window for SEEN_HALF_LIVES
+half-lives. Toggling statuses adds nothing more; re-saving a review with
+another rating takes the earlier increment back and adds the new one, so
+the film ends up as if only the latest rating had been given.
+
+Each metric has a board per window ("day", "week"), for all films, per
+media type and per genre. Old events fade out exponentially with the
+window's half-life. Instead of decaying every score over time, increments
+grow: an event at time t adds weight * 2^((t - epoch) / half_life), so
+relative order is always right and a write is one ZINCRBY per board,
+O(log n). compact_leaderboards() periodically rescales the boards to a new
+epoch (keeps the numbers small), drops faded entries and caps their size.
+
+Increments and compaction run as Lua scripts, so a write never mixes up
+the epoch of a board being compacted. Reading a top-N is one round trip;
+films are hydrated with one query.
+"""
+
+import time
+
+from django_redis import get_redis_connection
+
+from .models import Film
+
+BOARD_KEY = "cinema_tracker:leaderboard:{metric}:{window}:{dimension}"
+EPOCH_KEY = "cinema_tracker:leaderboard:epoch:{window}"
+# Outside the "leaderboard:" namespace, so compaction's board scan never matches it
+SEEN_KEY = "cinema_tracker:leaderboard_seen:{metric}:{window}:{user_id}:{film_id}"
+
+ADDED = "added"
+RATED = "rated"
+METRICS = (ADDED, RATED)
+
+# window -> half-life (seconds)
+WINDOWS = {
+    "day": 60 * 60 * 6,
+    "week": 60 * 60 * 24 * 2,
+}
+
+ALL = "all"
+MAX_BOARD_SIZE = 1000
+MIN_SCORE = 0.01  # entries that faded to |score| below this (in current-epoch units) are dropped
+# How long a user's counted weight for a film is remembered (the event has
+# faded to 1/16 by then)
+SEEN_HALF_LIVES = 4
+
+NEUTRAL_RATING = 5.5
+RATING_SCALE = 4.5
+
+# KEYS: epoch, seen, boards...; ARGV: now, half_life, member, weight, seen_ttl
+# The seen key holds "weight increment epoch": the increment that was applied
+# and the epoch it is scaled to, so it can be taken back exactly later.
+_INCREMENT = """
+local now = tonumber(ARGV[1])
+local half_life = tonumber(ARGV[2])
+local weight = tonumber(ARGV[4])
+local epoch = tonumber(redis.call('GET', KEYS[1]))
+if not epoch then
+    epoch = now
+    redis.call('SET', KEYS[1], ARGV[1])
+end
+local previous = 0
+local seen = redis.call('GET', KEYS[2])
+if seen then
+    local w, applied, applied_epoch = string.match(seen, '^(%S+) (%S+) (%S+)$')
+    if not w then
+        -- written before increments were stored: the weight alone
+        w, applied, applied_epoch = seen, seen * math.pow(2, (now - epoch) / half_life), epoch
+    end
+    if tonumber(w) == weight then
+        redis.call('EXPIRE', KEYS[2], ARGV[5])
+        return '0'
+    end
+    -- the increment was scaled to the epoch of its time; rescale it to the current one
+    previous = tonumber(applied) * math.pow(2, (tonumber(applied_epoch) - epoch) / half_life)
+end
+local applied = weight * math.pow(2, (now - epoch) / half_life)
+redis.call('SET', KEYS[2],
+    ARGV[4] .. ' ' .. string.format('%.17g', applied) .. ' ' .. string.format('%.17g', epoch),
+    'EX', ARGV[5])
+local increment = applied - previous
+for i = 3, #KEYS do
+    redis.call('ZINCRBY', KEYS[i], string.format('%.17g', increment), ARGV[3])
+end
+return tostring(increment)
+"""
+
+# KEYS: epoch, boards...; ARGV: now, half_life, min_score, max_size
+_COMPACT = """
+local epoch = tonumber(redis.call('GET', KEYS[1]))
+redis.call('SET', KEYS[1], ARGV[1])
+if not epoch then
+    return 0
+end
+local factor = math.pow(2, (epoch - tonumber(ARGV[1])) / tonumber(ARGV[2]))
+local removed = 0
+for i = 2, #KEYS do
+    redis.call('ZUNIONSTORE', KEYS[i], 1, KEYS[i], 'WEIGHTS', tostring(factor))
+    -- faded in both directions; strongly negative entries stay to offset later events
+    removed = removed + redis.call('ZREMRANGEBYSCORE', KEYS[i], '(-' .. ARGV[3], '(' .. ARGV[3])
+    removed = removed + redis.call('ZREMRANGEBYRANK', KEYS[i], 0, -tonumber(ARGV[4]) - 1)
+end
+return removed
+"""
+
+
+def _dimensions(film_type, genre_ids):
+    return [ALL, f"type:{film_type}", *(f"genre:{genre_id}" for genre_id in genre_ids)]
+
+
+def _board_keys(metric, window, dimensions):
+    return [BOARD_KEY.format(metric=metric, window=window, dimension=d) for d in dimensions]
+
+
+def rating_weight(rating):
+    return (rating - NEUTRAL_RATING) / RATING_SCALE
+
+
+def record_events(events, now=None):
+    """
+    Adds events to every board of their film's type and genres.
+
+    events: iterable of (metric, user_id, film_id, weight); only the change
+    from the weight last counted for the same user and film is added.
+    Films' types and genres are loaded in one query.
+    """
+    events = list(events)
+    if not events:
+        return
+    now = time.time() if now is None else now
+
+    films = {}
+    for film_id, film_type, genre_id in (
+        Film.objects.filter(id__in={film_id for _, _, film_id, _ in events})
+        .values_list("id", "type", "genres")
+    ):
+        _, genres = films.setdefault(film_id, (film_type, []))
+        if genre_id is not None:
+            genres.append(genre_id)
+
+    conn = get_redis_connection("default")
+    increment = conn.register_script(_INCREMENT)
+    pipe = conn.pipeline(transaction=False)
+    for metric, user_id, film_id, weight in events:
+        if film_id not in films:
+            continue
+        dimensions = _dimensions(*films[film_id])
+        for window, half_life in WINDOWS.items():
+            seen = SEEN_KEY.format(metric=metric, window=window, user_id=user_id, film_id=film_id)
+            increment(
+                keys=[EPOCH_KEY.format(window=window), seen, *_board_keys(metric, window, dimensions)],
+                args=[now, half_life, film_id, weight, half_life * SEEN_HALF_LIVES],
+                client=pipe,
+            )
+    pipe.execute()
+
+
+def compact_leaderboards(now=None):
+    """
+    Rescales all boards to the current epoch, drops faded entries and caps
+    each board at MAX_BOARD_SIZE. Returns the number of removed entries.
+    """
+    now = time.time() if now is None else now
+    conn = get_redis_connection("default")
+    compact = conn.register_script(_COMPACT)
+    removed = 0
+    for window, half_life in WINDOWS.items():
+        pattern = BOARD_KEY.format(metric="*", window=window, dimension="*")
+        keys = sorted(key.decode() for key in conn.scan_iter(match=pattern, count=1000))
+        removed += int(compact(
+            keys=[EPOCH_KEY.format(window=window), *keys],
+            args=[now, half_life, MIN_SCORE, MAX_BOARD_SIZE],
+        ))
+    return removed
+
+
+def get_leaderboard(metric, window, *, media_type=None, genre_id=None, limit=20, now=None):
+    """
+    Top films of a board as [(film, score)], best first; score is the
+    decayed event count as of now.
+    """
+    if media_type is not None:
+        dimension = f"type:{media_type}"
+    elif genre_id is not None:
+        dimension = f"genre:{genre_id}"
+    else:
+        dimension = ALL
+    now = time.time() if now is None else now
+
+    conn = get_redis_connection("default")
+    # MULTI/EXEC: the epoch and the board must come from the same side of a compaction
+    pipe = conn.pipeline(transaction=True)
+    pipe.get(EPOCH_KEY.format(window=window))
+    pipe.zrevrange(
+        BOARD_KEY.format(metric=metric, window=window, dimension=dimension),
+        0, limit - 1, withscores=True,
+    )
+    epoch, entries = pipe.execute()
+    if not entries:
+        return []
+
+    factor = 2 ** ((float(epoch or now) - now) / WINDOWS[window])
+    by_id = Film.objects.in_bulk([int(member) for member, _ in entries])
+    return [
+        (by_id[int(member)], score * factor)
+        for member, score in entries
+        if int(member) in by_id and score > 0
+    ]
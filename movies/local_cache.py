@@ -0,0 +1,154 @@
+"""
+In-process L1 cache in front of Redis for hot, shared, read-mostly keys.
+
+Feeds, feed versions and the genre map are the same for every user and
+change at most hourly, yet every dashboard request used to fetch and
+unpickle them from Redis. Each process now keeps the decoded values
+(immutable TMDBItems, plain dicts) in a small LRU with a short TTL:
+
+- get_or_set(key, load) returns the local copy, or calls load() (which
+  reads Redis / TMDB as before) and keeps its result;
+- writers call invalidate(*keys) after updating Redis. It publishes the keys
+  on a Redis pub/sub channel; every process listens on it from a daemon
+  thread and drops them;
+- the TTL bounds staleness if an invalidation is missed (listener
+  reconnecting); on reconnect the whole local cache is dropped.
+
+Only use it for values that are safe to share between threads and are
+never mutated by callers.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "cinema_tracker:local_cache:invalidate"
+RECONNECT_DELAY = 5
+
+_MISSING = object()
+
+
+class LocalCache:
+    """Thread-safe LRU with per-entry expiry, kept coherent by Redis pub/sub."""
+
+    def __init__(self, max_entries, timeout):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._listener = None
+        self.hits = 0
+        self.misses = 0
+
+    def _check_fork(self):
+        # Forked workers inherit a copy of the entries but not the listener thread
+        if self._pid != os.getpid():
+            self._reset()
+
+    def get(self, key, default=None):
+        self._check_fork()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, timeout=None):
+        self._check_fork()
+        self._ensure_listener()
+        expires_at = time.monotonic() + (self.timeout if timeout is None else timeout)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_set(self, key, load, timeout=None):
+        """
+        Local copy of key, or load() kept locally. None results are not kept
+        (callers use None for "not in Redis either").
+        """
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = load()
+            if value is not None:
+                self.set(key, value, timeout)
+        return value
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def invalidate(self, *keys):
+        """Drops keys here and, through pub/sub, in every other process."""
+        self.delete(*keys)
+        try:
+            conn = get_redis_connection("default")
+            for key in keys:
+                conn.publish(INVALIDATION_CHANNEL, key)
+        except RedisError:
+            # Other processes pick the new value up when their copy expires
+            logger.warning("Could not publish local cache invalidation of %s", keys)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else None,
+        }
+
+    def _ensure_listener(self):
+        if self._listener is not None and self._listener.is_alive():
+            return
+        with self._lock:
+            if self._listener is not None and self._listener.is_alive():
+                return
+            self._listener = threading.Thread(
+                target=self._listen, name="local-cache-invalidation", daemon=True,
+            )
+            self._listener.start()
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = get_redis_connection("default").pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(INVALIDATION_CHANNEL)
+                # Anything could have changed while we weren't subscribed
+                self.clear()
+                for message in pubsub.listen():
+                    key = message["data"]
+                    self.delete(key.decode() if isinstance(key, bytes) else key)
+            except RedisError:
+                logger.warning("Local cache invalidation listener disconnected, retrying")
+            self.clear()
+            time.sleep(RECONNECT_DELAY)
+
+
+local_cache = LocalCache(
+    max_entries=settings.LOCAL_CACHE_MAX_ENTRIES,
+    timeout=settings.LOCAL_CACHE_TIMEOUT,
+)
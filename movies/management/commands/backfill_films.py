@@ -0,0 +1,100 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from requests import HTTPError, RequestException
+
+from movies.services_tmdb import (
+    FILM_MEDIA_TYPES,
+    fetch_movie_details,
+    fill_missing_details,
+    get_incomplete_films,
+)
+from movies.tmdb_client import tmdb_background
+
+CHECKPOINT_KEY = "backfill_films:checkpoint"
+
+
+def _fetch(film):
+    """
+    (film, TMDB details), or (film, None) if the film is gone from TMDB.
+    Other errors (TMDB down, circuit open, rate limit budget exhausted)
+    are raised: they would fail every following film too.
+    """
+    # Runs in a worker thread: the rate limit lane (a context var) isn't inherited
+    with tmdb_background():
+        try:
+            return film, fetch_movie_details(film.tmdb_id, FILM_MEDIA_TYPES[film.type])
+        except HTTPError as e:
+            if e.response is not None and e.response.status_code == 404:
+                return film, None
+            raise
+        finally:
+            close_old_connections()
+
+
+class Command(BaseCommand):
+    help = "Fill in missing year, description and genres of TMDB films"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers", type=int, default=8,
+            help="Concurrent TMDB requests (the shared rate limit still applies)",
+        )
+        parser.add_argument("--batch-size", type=int, default=200)
+        parser.add_argument("--limit", type=int, help="Stop after this many films")
+        parser.add_argument(
+            "--restart", action="store_true",
+            help="Ignore the saved checkpoint and start from the first film",
+        )
+
+    def handle(self, *args, **options):
+        if options["restart"]:
+            cache.delete(CHECKPOINT_KEY)
+        checkpoint = cache.get(CHECKPOINT_KEY, 0)
+        if checkpoint:
+            self.stdout.write(f"Resuming after film id {checkpoint}")
+
+        films = (
+            get_incomplete_films()
+            .filter(id__gt=checkpoint)
+            .only("id", "tmdb_id", "type", "start_year", "description")
+            .iterator(chunk_size=options["batch_size"])
+        )
+        if options["limit"]:
+            films = islice(films, options["limit"])
+
+        processed = updated = missing = 0
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=options["workers"]) as executor:
+            while batch := list(islice(films, options["batch_size"])):
+                try:
+                    results = list(executor.map(_fetch, batch))
+                except RequestException as e:
+                    # The checkpoint stays before this batch, so the next run retries it
+                    raise CommandError(
+                        f"TMDB request failed ({e}), stopped after {processed} films. "
+                        "Run the command again to resume."
+                    )
+                details = [(film, data) for film, data in results if data is not None]
+                missing += len(results) - len(details)
+                updated += fill_missing_details(details)
+                processed += len(batch)
+
+                # Films missing at TMDB stay incomplete and are picked up by a --restart run
+                cache.set(CHECKPOINT_KEY, batch[-1].id, timeout=None)
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f"{processed} films, {updated} updated, {missing} not found at TMDB "
+                    f"({processed / max(elapsed, 0.001):.1f} films/s)"
+                )
+
+        if not options["limit"]:
+            # Reached the end: the next run starts over
+            cache.delete(CHECKPOINT_KEY)
+        self.stdout.write(self.style.SUCCESS(
+            f"Done: {processed} films checked, {updated} updated, {missing} not found at TMDB"
+        ))
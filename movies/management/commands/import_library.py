@@ -0,0 +1,52 @@
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from movies.services_export import EXPORT_FORMATS, import_library
+
+
+class Command(BaseCommand):
+    help = "Import a user's watch statuses and reviews from a CSV or JSON Lines export"
+
+    def add_arguments(self, parser):
+        parser.add_argument("username")
+        parser.add_argument("path")
+        parser.add_argument(
+            "--format",
+            choices=sorted(EXPORT_FORMATS),
+            help="File format (default: guessed from the file extension)",
+        )
+        parser.add_argument("--chunk-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        try:
+            user = User.objects.get(username=options["username"])
+        except User.DoesNotExist:
+            raise CommandError(f"User '{options['username']}' does not exist")
+
+        path = Path(options["path"])
+        fmt = options["format"] or path.suffix.lstrip(".").lower()
+        if fmt not in EXPORT_FORMATS:
+            raise CommandError("Cannot guess file format, use --format")
+
+        totals = {"statuses": 0, "reviews": 0, "importing": 0, "missing": 0, "errors": 0}
+        with path.open(newline="", encoding="utf-8") as f:
+            for result in import_library(
+                user=user, lines=f, fmt=fmt, chunk_size=options["chunk_size"]
+            ):
+                totals["statuses"] += result["statuses"]
+                totals["reviews"] += result["reviews"]
+                totals["importing"] += result["importing"]
+                totals["missing"] += len(result["missing"])
+                totals["errors"] += len(result["errors"])
+                self.stdout.write(
+                    f"Imported {totals['statuses']} statuses, {totals['reviews']} reviews..."
+                )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Done: {totals['statuses']} statuses, {totals['reviews']} reviews, "
+            f"{totals['importing']} films queued for import from TMDB, "
+            f"{totals['missing']} films not found, {totals['errors']} invalid rows"
+        ))
@@ -0,0 +1,87 @@
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from movies.partitioning import (
+    copy_batch,
+    is_partitioned,
+    max_id,
+    partitioned_models,
+    swap_tables,
+)
+from movies.services_stats import refresh_film_stats
+
+CHECKPOINT_KEY = "partition_tables:{table}"
+
+
+class Command(BaseCommand):
+    help = (
+        "Move WatchStatus/Review rows into hash-partitioned tables online "
+        "(see movies/partitioning.py)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=10000)
+        parser.add_argument(
+            "--sleep", type=float, default=0.05,
+            help="Pause between batches (seconds), to limit load on the primary",
+        )
+        parser.add_argument(
+            "--swap", action="store_true",
+            help="After copying, lock each table briefly and swap in the partitioned one",
+        )
+        parser.add_argument(
+            "--film-stats", action="store_true",
+            help="Only rebuild FilmStats of all films",
+        )
+
+    def handle(self, *args, **options):
+        if options["film_stats"]:
+            count = refresh_film_stats()
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt stats of {count} films"))
+            return
+
+        if connection.vendor != "postgresql":
+            raise CommandError("Table partitioning requires PostgreSQL")
+
+        for model in partitioned_models():
+            table = model._meta.db_table
+            if is_partitioned(model):
+                self.stdout.write(f"{table}: already partitioned")
+                continue
+
+            key = CHECKPOINT_KEY.format(table=table)
+            copied_up_to = cache.get(key, 0)
+            if copied_up_to:
+                self.stdout.write(f"{table}: resuming after id {copied_up_to}")
+
+            rows = 0
+            started = time.monotonic()
+            last_id = max_id(model)
+            while copied_up_to < last_id:
+                rows += copy_batch(model, copied_up_to, options["batch_size"])
+                copied_up_to += options["batch_size"]
+                cache.set(key, copied_up_to, timeout=None)
+
+                elapsed = max(time.monotonic() - started, 0.001)
+                self.stdout.write(
+                    f"{table}: up to id {min(copied_up_to, last_id)} of {last_id}, "
+                    f"{rows} rows ({rows / elapsed:.0f} rows/s)"
+                )
+                time.sleep(options["sleep"])
+                # Rows inserted meanwhile are mirrored by the trigger anyway;
+                # the final ones are copied under the lock in --swap
+                if copied_up_to >= last_id:
+                    last_id = max_id(model)
+
+            if not options["swap"]:
+                self.stdout.write(self.style.SUCCESS(f"{table}: copied, run with --swap to switch"))
+                continue
+
+            swap_tables(model, copied_up_to, options["batch_size"])
+            cache.delete(key)
+            self.stdout.write(self.style.SUCCESS(
+                f"{table}: partitioned, old table kept as {table}_unpartitioned"
+            ))
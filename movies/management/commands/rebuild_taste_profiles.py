@@ -0,0 +1,28 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from movies.cache_versions import bump_versions
+from movies.services_taste import refresh_taste_profiles
+
+
+class Command(BaseCommand):
+    help = "Rebuild taste profiles of all users (normally updated after each write)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        user_ids = list(get_user_model().objects.order_by("id").values_list("id", flat=True))
+        count = 0
+        for i in range(0, len(user_ids), options["batch_size"]):
+            batch = user_ids[i:i + options["batch_size"]]
+            count += refresh_taste_profiles(batch, batch_size=options["batch_size"])
+            bump_versions(users=batch)
+            self.stdout.write(f"{count} of {len(user_ids)} users")
+        elapsed = max(time.monotonic() - started, 0.001)
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {count} taste profiles ({count / elapsed:.0f} users/s)"
+        ))
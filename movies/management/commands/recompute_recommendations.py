@@ -0,0 +1,83 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from config.warmup import close_connections_before_fork
+from movies.services_recommendations import (
+    compute_shard,
+    get_pending_shards,
+    start_pipeline_run,
+    summarize_shards,
+)
+from movies.tmdb_client import tmdb_background
+
+
+def _run_shard(shard, lo, hi):
+    with tmdb_background():
+        return compute_shard(shard, lo, hi)
+
+
+class Command(BaseCommand):
+    help = "Recompute recommendations of all users, shard by shard, in local processes"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--shards", type=int, default=settings.RECOMMENDATION_SHARDS)
+        parser.add_argument("--processes", type=int, default=1)
+        parser.add_argument(
+            "--resume", action="store_true",
+            help="Only run shards of the last run that didn't complete",
+        )
+        parser.add_argument("--shard", type=int, help="Run one shard of the last run")
+
+    def handle(self, *args, **options):
+        if options["resume"] or options["shard"] is not None:
+            shards = get_pending_shards()
+            if options["shard"] is not None:
+                if options["shard"] not in shards:
+                    raise CommandError(f"Shard {options['shard']} is not pending in the last run")
+                shards = {options["shard"]: shards[options["shard"]]}
+        else:
+            shards = dict(enumerate(start_pipeline_run(options["shards"])))
+
+        if not shards:
+            self.stdout.write("Nothing to recompute")
+            return
+
+        started_at = time.time()
+        results, failed = [], []
+        # Children are forked: they must not share the parent's DB connections or pools
+        close_connections_before_fork()
+        with ProcessPoolExecutor(
+            max_workers=options["processes"],
+            mp_context=multiprocessing.get_context("fork"),
+        ) as executor:
+            futures = {
+                executor.submit(_run_shard, shard, lo, hi): shard
+                for shard, (lo, hi) in shards.items()
+            }
+            for future in as_completed(futures):
+                shard = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    failed.append(shard)
+                    self.stderr.write(f"Shard {shard} failed: {e}")
+                    continue
+                results.append(result)
+                self.stdout.write(
+                    f"Shard {shard}: {result['users']} users in {result['seconds']:.1f}s"
+                )
+
+        summary = summarize_shards(results, started_at)
+        self.stdout.write(self.style.SUCCESS(
+            f"Done: {summary['users']} users in {summary['shards']} shards, "
+            f"{summary['seconds']}s ({summary['users_per_second']} users/s)"
+        ))
+        if failed:
+            raise CommandError(
+                f"{len(failed)} shards failed ({', '.join(map(str, sorted(failed)))}), "
+                "run again with --resume"
+            )
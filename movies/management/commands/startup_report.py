@@ -0,0 +1,74 @@
+import os
+import re
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# What a fresh process of each kind imports before it can serve
+TARGETS = {
+    "setup": "import django; django.setup()",
+    "wsgi": "import config.wsgi",
+    "celery": (
+        "import django; django.setup(); "
+        "from config.celery import app; app.loader.import_default_modules()"
+    ),
+    "warm": "import config.wsgi; from config.warmup import warm_up; warm_up()",
+}
+
+_LINE_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)")
+
+
+class Command(BaseCommand):
+    help = "Break down the import time of a cold process (python -X importtime, aggregated)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--target", choices=sorted(TARGETS), default="wsgi")
+        parser.add_argument(
+            "--group-by", choices=("package", "module"), default="package",
+            help="Aggregate self time by top-level package or show single modules",
+        )
+        parser.add_argument("--top", type=int, default=25)
+
+    def handle(self, *args, **options):
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": os.environ.get("DJANGO_SETTINGS_MODULE", "config.settings")}
+        started = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", TARGETS[options["target"]]],
+            cwd=settings.BASE_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        wall = time.perf_counter() - started
+
+        self_us = defaultdict(int)
+        modules = defaultdict(int)
+        total_us = 0
+        other = []
+        for line in proc.stderr.splitlines():
+            match = _LINE_RE.match(line)
+            if not match:
+                other.append(line)
+                continue
+            own, _cumulative, _indent, module = match.groups()
+            key = module.split(".")[0] if options["group_by"] == "package" else module
+            self_us[key] += int(own)
+            modules[key] += 1
+            total_us += int(own)
+
+        if proc.returncode:
+            raise CommandError("Target failed:\n" + "\n".join(other[-20:]))
+
+        self.stdout.write(f"{'name':<40} {'self ms':>10} {'share':>7} {'modules':>8}")
+        for key, us in sorted(self_us.items(), key=lambda kv: -kv[1])[:options["top"]]:
+            self.stdout.write(
+                f"{key:<40} {us / 1000:>10.1f} {us / max(total_us, 1):>7.1%} {modules[key]:>8}"
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"{options['target']}: {sum(modules.values())} modules, "
+            f"imports {total_us / 1000:.0f} ms, process {wall * 1000:.0f} ms"
+        ))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from movies.rate_limit import get_rate_limit_stats, reset_rate_limit_stats
+
+
+class Command(BaseCommand):
+    help = "Show outbound TMDB tokens consumed/rejected per rate limit lane"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--reset", action="store_true", help="Reset counters after printing")
+
+    def handle(self, *args, **options):
+        for lane, counters in get_rate_limit_stats().items():
+            self.stdout.write(
+                f"{lane:<12} consumed={counters['consumed']:<8} rejected={counters['rejected']}"
+            )
+
+        if options["reset"]:
+            reset_rate_limit_stats()
+            self.stdout.write(self.style.SUCCESS("Counters reset"))
@@ -0,0 +1,20 @@
+# Generated by Django 6.0.1 on 2026-10-18 12:30
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0003_activity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='film',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
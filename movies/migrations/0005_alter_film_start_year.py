@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-18 12:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0004_film_updated_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='film',
+            name='start_year',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 6.0.1 on 2026-10-18 13:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0006_recommendationset'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FilmStats',
+            fields=[
+                ('film', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='movies.film')),
+                ('watchers_count', models.PositiveIntegerField(default=0)),
+                ('reviews_count', models.PositiveIntegerField(default=0)),
+                ('rating_sum', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
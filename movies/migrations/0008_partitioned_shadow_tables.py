@@ -0,0 +1,36 @@
+# Generated by Django 6.0.1 on 2026-10-18 13:10
+
+from django.db import migrations
+
+
+def create_shadow_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    from movies.partitioning import create_shadow_table, partitioned_models
+
+    for model in partitioned_models(apps):
+        create_shadow_table(model, schema_editor)
+
+
+def drop_shadow_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    from movies.partitioning import drop_shadow_table, partitioned_models
+
+    for model in partitioned_models(apps):
+        drop_shadow_table(model, schema_editor)
+
+
+class Migration(migrations.Migration):
+    """
+    Partitioned copies of WatchStatus/Review kept in sync by triggers.
+    Data is moved by `manage.py partition_tables` (see movies/partitioning.py).
+    """
+
+    dependencies = [
+        ('movies', '0007_filmstats'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_shadow_tables, drop_shadow_tables),
+    ]
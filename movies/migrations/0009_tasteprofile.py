@@ -0,0 +1,27 @@
+# Generated by Django 6.0.1 on 2026-10-18 14:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0008_partitioned_shadow_tables'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TasteProfile',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='taste_profile', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('genres', models.JSONField(default=dict)),
+                ('decades', models.JSONField(default=dict)),
+                ('movies_count', models.PositiveIntegerField(default=0)),
+                ('series_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 6.0.1 on 2026-10-18 14:50
+
+from django.db import migrations
+
+INDEX_NAME = "movies_film_title_upper_prefix"
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    table = schema_editor.quote_name(apps.get_model("movies", "Film")._meta.db_table)
+    # Same expression as the title__istartswith lookup (admin search), so
+    # UPPER(title::text) LIKE 'X%' is an index range scan
+    schema_editor.execute(
+        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {schema_editor.quote_name(INDEX_NAME)} "
+        f"ON {table} ((UPPER(title::text)) text_pattern_ops)"
+    )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {schema_editor.quote_name(INDEX_NAME)}")
+
+
+class Migration(migrations.Migration):
+    """Prefix-search index on Film.title, built without locking writes."""
+
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('movies', '0009_tasteprofile'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 6.0.1 on 2026-10-18 16:20
+
+from django.db import migrations
+
+
+def create_id_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    from movies.partitioning import create_id_index, partitioned_models
+
+    for model in partitioned_models(apps):
+        create_id_index(model, schema_editor)
+
+
+def drop_id_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    from movies.partitioning import drop_id_index, partitioned_models
+
+    for model in partitioned_models(apps):
+        drop_id_index(model, schema_editor)
+
+
+class Migration(migrations.Migration):
+    """
+    Index on id of the partitioned WatchStatus/Review tables, whose primary
+    key is (user_id, id): lookups by pk would otherwise scan every partition.
+    """
+
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('movies', '0010_film_title_prefix_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_id_indexes, drop_id_indexes),
+    ]
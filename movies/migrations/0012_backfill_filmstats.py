@@ -0,0 +1,65 @@
+# Generated by Django 6.0.1 on 2026-10-18 17:40
+
+from django.db import migrations
+from django.db.models import Count, Sum
+
+BATCH_SIZE = 1000
+
+
+def backfill_film_stats(apps, schema_editor):
+    """Same counters as services_stats.refresh_film_stats, from historical models."""
+    Film = apps.get_model("movies", "Film")
+    FilmStats = apps.get_model("movies", "FilmStats")
+    WatchStatus = apps.get_model("movies", "WatchStatus")
+    Review = apps.get_model("movies", "Review")
+
+    last_id = 0
+    while batch := list(
+        Film.objects.filter(id__gt=last_id).order_by("id").values_list("id", flat=True)[:BATCH_SIZE]
+    ):
+        watchers = dict(
+            WatchStatus.objects.filter(film_id__in=batch)
+            .values("film_id")
+            .annotate(n=Count("id"))
+            .values_list("film_id", "n")
+        )
+        reviews = {
+            row["film_id"]: row
+            for row in Review.objects.filter(film_id__in=batch)
+            .values("film_id")
+            .annotate(n=Count("id"), total=Sum("rating"))
+        }
+        FilmStats.objects.bulk_create(
+            [
+                FilmStats(
+                    film_id=film_id,
+                    watchers_count=watchers.get(film_id, 0),
+                    reviews_count=reviews[film_id]["n"] if film_id in reviews else 0,
+                    rating_sum=reviews[film_id]["total"] if film_id in reviews else 0,
+                )
+                for film_id in batch
+            ],
+            update_conflicts=True,
+            unique_fields=["film"],
+            update_fields=["watchers_count", "reviews_count", "rating_sum", "updated_at"],
+        )
+        last_id = batch[-1]
+
+
+class Migration(migrations.Migration):
+    """
+    FilmStats was created empty in 0007 and is only filled in by
+    update_film_stats after writes, so films nobody touched since showed
+    no ratings. Fill it in for every existing film.
+    """
+
+    # One transaction per batch, not one over the whole catalogue
+    atomic = False
+
+    dependencies = [
+        ('movies', '0011_partitioned_id_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_film_stats, migrations.RunPython.noop),
+    ]
@@ -21,7 +21,8 @@ class Film(models.Model):
 
     tmdb_id = models.PositiveIntegerField(unique=True, null=True, blank=True)
 
-    start_year = models.PositiveIntegerField()
+    # Unknown for some TMDB imports until `manage.py backfill_films` fills it in
+    start_year = models.PositiveIntegerField(null=True, blank=True)
     end_year = models.PositiveIntegerField(null=True, blank=True)
 
     type = models.CharField(
@@ -31,11 +32,17 @@ class Film(models.Model):
     )
     genres = models.ManyToManyField(Genre, related_name="films")
 
+    # Last change of our copy of the metadata (used for HTTP caching)
+    updated_at = models.DateTimeField(auto_now=True)
+
     def clean(self):
-        if self.end_year and self.end_year < self.start_year:
+        if self.end_year and self.start_year and self.end_year < self.start_year:
             raise ValidationError("end_year cannot be less than start_year")
 
     def __str__(self):
+        if not self.start_year:
+            return self.title
+
         # Фильмы
         if self.type == self.TypeChoices.MOVIE:
             return f"{self.title} ({self.start_year})"
@@ -81,6 +88,8 @@ class WatchStatus(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
+        # Hash-partitioned by user_id in PostgreSQL (see movies/partitioning.py);
+        # per-film counts live in FilmStats
         unique_together = ("user", "film")
 
     def __str__(self):
@@ -104,7 +113,118 @@ class Review(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
+        # Hash-partitioned by user_id in PostgreSQL (see movies/partitioning.py);
+        # per-film counts live in FilmStats
         unique_together = ("user", "film")
 
     def __str__(self):
-        return f"{self.user} → {self.film} ({self.rating})"
\ No newline at end of file
+        return f"{self.user} → {self.film} ({self.rating})"
+
+
+class Activity(models.Model):
+    """User activity event (status change, review), shown in activity feeds."""
+
+    class Verb(models.TextChoices):
+        STATUS = "status", "Status changed"
+        REVIEW = "review", "Reviewed"
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="activities"
+    )
+    film = models.ForeignKey(
+        "movies.Film",
+        on_delete=models.CASCADE,
+        related_name="activities"
+    )
+    verb = models.CharField(max_length=20, choices=Verb.choices)
+    status = models.CharField(max_length=20, choices=WatchStatus.Status.choices, blank=True)
+    rating = models.PositiveSmallIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ("-created_at", "-id")
+        indexes = [
+            models.Index(fields=["user", "-created_at"], name="activity_user_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.user} {self.verb} {self.film}"
+
+
+class RecommendationSet(models.Model):
+    """Precomputed recommendations of a user (nightly pipeline)."""
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="recommendation_set"
+    )
+    # TMDBItem tuples (see tmdb_types.TMDBItem.to_tuple), best first
+    items = models.JSONField(default=list)
+    computed_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.user}: {len(self.items)} recommendations"
+
+
+class FilmStats(models.Model):
+    """
+    Per-film summary of WatchStatus/Review rows.
+
+    Those tables are partitioned by user, so aggregating them by film touches
+    every partition; pages read these counters instead. Maintained by the
+    update_film_stats task after writes.
+    """
+
+    film = models.OneToOneField(
+        "movies.Film",
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="stats"
+    )
+    watchers_count = models.PositiveIntegerField(default=0)
+    reviews_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def avg_rating(self):
+        if not self.reviews_count:
+            return None
+        return self.rating_sum / self.reviews_count
+
+    def __str__(self):
+        return f"{self.film}: {self.watchers_count} watchers, {self.reviews_count} reviews"
+
+
+class TasteProfile(models.Model):
+    """
+    Precomputed taste of a user: genre affinity, decades and movie/series split.
+
+    Rebuilt from the user's WatchStatus/Review rows by the deduplicated
+    update_taste_profiles task after writes (see services_taste).
+    """
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="taste_profile"
+    )
+    # {genre name: affinity in [-1, 1]}, rating-weighted, best first
+    genres = models.JSONField(default=dict)
+    # {decade ("1990"): films in library}
+    decades = models.JSONField(default=dict)
+    movies_count = models.PositiveIntegerField(default=0)
+    series_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def movie_share(self):
+        total = self.movies_count + self.series_count
+        return self.movies_count / total if total else None
+
+    def __str__(self):
+        return f"{self.user}: {len(self.genres)} genres"
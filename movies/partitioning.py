@@ -0,0 +1,250 @@
+"""
+Hash partitioning of WatchStatus and Review by user_id (PostgreSQL).
+
+Both tables are read almost always by user, so they are split into
+PARTITION_COUNT hash partitions on user_id: per-user queries touch one
+small partition, and vacuum/index maintenance works per partition.
+Per-film reads go through FilmStats instead of aggregating every partition.
+
+The ORM doesn't change: models keep `id` as their primary key. In the
+database the primary key is (user_id, id), because a partitioned table's
+unique constraints must include the partition key; (user_id, film_id)
+stays unique. Ids come from a sequence, so they remain unique. A plain
+index on id (migration 0011) keeps lookups by pk - Model.save/delete, the
+deletion collector, admin change pages - at one index probe per partition
+instead of scanning all of them.
+
+Existing tables are converted online:
+
+1. migration 0008 creates an empty partitioned shadow table
+   "<table>_part" per model, plus triggers that mirror every insert,
+   update and delete on the live table into it;
+2. `manage.py partition_tables` copies existing rows in id batches
+   (the triggers keep already copied rows in sync meanwhile);
+3. `manage.py partition_tables --swap` takes a short exclusive lock,
+   copies the last rows and swaps the tables by renaming. The old table
+   is kept as "<table>_unpartitioned" until it is dropped by hand.
+"""
+
+from django.apps import apps as global_apps
+from django.db import connection, transaction
+
+PARTITION_COUNT = 16
+PARTITIONED_MODEL_NAMES = ("WatchStatus", "Review")
+
+
+def partitioned_models(apps=global_apps):
+    """
+    The partitioned models. Migrations pass their `apps`, so the functions
+    below get historical models and never depend on the current models.py.
+    """
+    return [apps.get_model("movies", name) for name in PARTITIONED_MODEL_NAMES]
+
+
+def _names(model):
+    table = model._meta.db_table
+    return {
+        "table": table,
+        "shadow": f"{table}_part",
+        "old": f"{table}_unpartitioned",
+        "sequence": f"{table}_part_id_seq",
+        "function": f"{table}_sync_part",
+        "trigger": f"{table}_sync_part_trg",
+    }
+
+
+def _columns(table, conn=connection):
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT column_name FROM information_schema.columns "
+            "WHERE table_name = %s AND table_schema = current_schema() "
+            "ORDER BY ordinal_position",
+            [table],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _relkind(table, conn=connection):
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relkind FROM pg_class c "
+            "JOIN pg_namespace n ON n.oid = c.relnamespace "
+            "WHERE c.relname = %s AND n.nspname = current_schema()",
+            [table],
+        )
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def is_partitioned(model):
+    return _relkind(model._meta.db_table) == "p"
+
+
+def create_shadow_table(model, schema_editor):
+    """Creates the partitioned copy of model's table and the sync trigger."""
+    n = _names(model)
+    qn = schema_editor.quote_name
+    user_table = model._meta.get_field("user").related_model._meta.db_table
+    film_table = model._meta.get_field("film").related_model._meta.db_table
+
+    schema_editor.execute(
+        f"CREATE TABLE {qn(n['shadow'])} "
+        f"(LIKE {qn(n['table'])} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+        f"PARTITION BY HASH (user_id)"
+    )
+    for remainder in range(PARTITION_COUNT):
+        partition = f"{n['shadow']}_{remainder}"
+        schema_editor.execute(
+            f"CREATE TABLE {qn(partition)} PARTITION OF {qn(n['shadow'])} "
+            f"FOR VALUES WITH (MODULUS {PARTITION_COUNT}, REMAINDER {remainder})"
+        )
+
+    schema_editor.execute(f"CREATE SEQUENCE {qn(n['sequence'])} OWNED BY {qn(n['shadow'])}.id")
+    schema_editor.execute(
+        f"ALTER TABLE {qn(n['shadow'])} "
+        f"ALTER COLUMN id SET DEFAULT nextval('{n['sequence']}'), "
+        f"ADD PRIMARY KEY (user_id, id), "
+        f"ADD UNIQUE (user_id, film_id), "
+        f"ADD FOREIGN KEY (user_id) REFERENCES {qn(user_table)} (id) DEFERRABLE INITIALLY DEFERRED, "
+        f"ADD FOREIGN KEY (film_id) REFERENCES {qn(film_table)} (id) DEFERRABLE INITIALLY DEFERRED"
+    )
+    # Per-film reads that can't use FilmStats (latest reviews of a film)
+    schema_editor.execute(
+        f"CREATE INDEX {qn(n['shadow'] + '_film_updated')} "
+        f"ON {qn(n['shadow'])} (film_id, updated_at)"
+    )
+    schema_editor.execute(
+        f"CREATE INDEX {qn(n['shadow'] + '_user_updated')} "
+        f"ON {qn(n['shadow'])} (user_id, updated_at)"
+    )
+
+    columns = _columns(n["table"], schema_editor.connection)
+    column_list = ", ".join(qn(c) for c in columns)
+    new_values = ", ".join(f"NEW.{qn(c)}" for c in columns)
+    updates = ", ".join(f"{qn(c)} = EXCLUDED.{qn(c)}" for c in columns if c not in ("id", "user_id"))
+    schema_editor.execute(f"""
+        CREATE FUNCTION {qn(n['function'])}() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('DELETE', 'UPDATE') THEN
+                DELETE FROM {qn(n['shadow'])} WHERE user_id = OLD.user_id AND id = OLD.id;
+            END IF;
+            IF TG_OP = 'DELETE' THEN
+                RETURN OLD;
+            END IF;
+            INSERT INTO {qn(n['shadow'])} ({column_list}) VALUES ({new_values})
+            ON CONFLICT (user_id, id) DO UPDATE SET {updates};
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    schema_editor.execute(
+        f"CREATE TRIGGER {qn(n['trigger'])} AFTER INSERT OR UPDATE OR DELETE "
+        f"ON {qn(n['table'])} FOR EACH ROW EXECUTE FUNCTION {qn(n['function'])}()"
+    )
+
+
+def _id_index_name(model):
+    return f"{_names(model)['shadow']}_id"
+
+
+def create_id_index(model, schema_editor):
+    """
+    Creates the index on id alone on the partitioned table (the shadow
+    table, or the live one if it was already swapped in) without blocking
+    writes: an invalid parent index ON ONLY the partitioned table, then one
+    CREATE INDEX CONCURRENTLY per partition attached to it. Safe to re-run
+    after a failure. Must run outside a transaction.
+    """
+    n = _names(model)
+    qn = schema_editor.quote_name
+    conn = schema_editor.connection
+    if _relkind(n["shadow"], conn) == "p":
+        table = n["shadow"]
+    elif _relkind(n["table"], conn) == "p":
+        table = n["table"]
+    else:
+        return  # not partitioned: id is the primary key
+    index = _id_index_name(model)
+
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.oid = to_regclass(%s)",
+            [index],
+        )
+        row = cursor.fetchone()
+        if row and row[0]:
+            return
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(%s) ORDER BY c.relname",
+            [table],
+        )
+        partitions = [row[0] for row in cursor.fetchall()]
+
+    schema_editor.execute(f"CREATE INDEX IF NOT EXISTS {qn(index)} ON ONLY {qn(table)} (id)")
+    for partition in partitions:
+        schema_editor.execute(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {qn(partition + '_id')} ON {qn(partition)} (id)"
+        )
+        # A no-op if it's already attached; the parent becomes valid with the last one
+        schema_editor.execute(f"ALTER INDEX {qn(index)} ATTACH PARTITION {qn(partition + '_id')}")
+
+
+def drop_id_index(model, schema_editor):
+    schema_editor.execute(f"DROP INDEX IF EXISTS {schema_editor.quote_name(_id_index_name(model))}")
+
+
+def drop_shadow_table(model, schema_editor):
+    n = _names(model)
+    qn = schema_editor.quote_name
+    schema_editor.execute(f"DROP TRIGGER IF EXISTS {qn(n['trigger'])} ON {qn(n['table'])}")
+    schema_editor.execute(f"DROP FUNCTION IF EXISTS {qn(n['function'])}()")
+    schema_editor.execute(f"DROP TABLE IF EXISTS {qn(n['shadow'])}")
+
+
+def copy_batch(model, after_id, batch_size):
+    """
+    Copies rows with after_id < id <= after_id + batch_size into the shadow
+    table (rows already mirrored by the trigger are left alone).
+    Returns the number of copied rows.
+    """
+    n = _names(model)
+    qn = connection.ops.quote_name
+    column_list = ", ".join(qn(c) for c in _columns(n["table"]))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {qn(n['shadow'])} ({column_list}) "
+            f"SELECT {column_list} FROM {qn(n['table'])} WHERE id > %s AND id <= %s "
+            f"ON CONFLICT DO NOTHING",
+            [after_id, after_id + batch_size],
+        )
+        return cursor.rowcount
+
+
+def max_id(model):
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {connection.ops.quote_name(model._meta.db_table)}")
+        return cursor.fetchone()[0]
+
+
+def swap_tables(model, copied_up_to, batch_size=10000):
+    """
+    Makes the shadow table the live one. Writes to the table wait for the
+    duration of the final catch-up copy (rows above copied_up_to).
+    """
+    n = _names(model)
+    qn = connection.ops.quote_name
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(f"LOCK TABLE {qn(n['table'])} IN ACCESS EXCLUSIVE MODE")
+            last_id = max_id(model)
+            while copied_up_to < last_id:
+                copy_batch(model, copied_up_to, batch_size)
+                copied_up_to += batch_size
+
+            cursor.execute(f"DROP TRIGGER {qn(n['trigger'])} ON {qn(n['table'])}")
+            cursor.execute(f"DROP FUNCTION {qn(n['function'])}()")
+            cursor.execute("SELECT setval(%s, %s)", [n["sequence"], max(last_id, 1)])
+            cursor.execute(f"ALTER TABLE {qn(n['table'])} RENAME TO {qn(n['old'])}")
+            cursor.execute(f"ALTER TABLE {qn(n['shadow'])} RENAME TO {qn(n['table'])}")
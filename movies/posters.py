@@ -0,0 +1,196 @@
+"""
+Local poster proxy.
+
+Posters are fetched from the TMDB image CDN once, stored on local disk and
+served by us, so pages don't hotlink full-size third-party images.
+
+Layout under settings.POSTER_ROOT (content-addressed by sha256 of the
+original image, so identical images are stored once):
+
+    original/ab/<sha256>.<ext>    - image as downloaded from TMDB (jpg/png/webp,
+                                    detected from its content)
+    card/ab/<sha256>.webp         - resized variants (see POSTER_VARIANTS)
+    detail/ab/<sha256>.webp
+    paths/<md5 of poster_path>    - poster_path -> "<sha256>.<ext>"
+
+TMDB poster paths never change their content, so responses can be cached
+by browsers forever. If Pillow is not installed, the original image is
+served for every variant. Pillow is imported on first use, not at startup.
+
+Poster URLs carry a signature of the poster path (see poster_url), so the
+proxy only downloads posters our own pages linked to and can't be used to
+fill the disk with arbitrary TMDB images.
+"""
+
+import hashlib
+import os
+import re
+import tempfile
+from io import BytesIO
+from pathlib import Path
+
+import requests
+from django.conf import settings
+from django.core.signing import Signer
+from django.urls import reverse
+from django.utils.crypto import constant_time_compare
+
+from .singleflight import singleflight
+
+TMDB_IMAGE_URL = "https://image.tmdb.org/t/p/{size}{poster_path}"
+SOURCE_SIZE = "w500"  # largest size we render
+FETCH_TIMEOUT = 10
+
+# variant -> width in pixels
+POSTER_VARIANTS = {
+    "card": 342,
+    "detail": 500,
+}
+WEBP_QUALITY = 80
+POSTER_MAX_AGE = 60 * 60 * 24 * 365
+
+_POSTER_PATH_RE = re.compile(r"^/[A-Za-z0-9_-]+\.(jpg|jpeg|png)$")
+
+# extension -> content type of stored originals
+CONTENT_TYPES = {
+    "jpg": "image/jpeg",
+    "png": "image/png",
+    "webp": "image/webp",
+}
+
+_signer = Signer(salt="movies.posters")
+
+
+class PosterNotFound(Exception):
+    """Unknown variant, malformed poster path or image not available at TMDB."""
+
+
+def _root():
+    return Path(settings.POSTER_ROOT)
+
+
+def _sharded(directory, digest, ext):
+    return _root() / directory / digest[:2] / f"{digest}.{ext}"
+
+
+def _atomic_write(path, data):
+    """Write data to path so readers never see a partial file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def _path_index(poster_path):
+    return _root() / "paths" / hashlib.md5(poster_path.encode()).hexdigest()
+
+
+def tmdb_poster_url(poster_path, size=SOURCE_SIZE):
+    return TMDB_IMAGE_URL.format(size=size, poster_path=poster_path)
+
+
+def sign_poster_path(poster_path):
+    return _signer.signature(poster_path)
+
+
+def _image_extension(data):
+    """File extension of a JPEG/PNG/WebP image by its magic bytes, None otherwise."""
+    if data.startswith(b"\xff\xd8\xff"):
+        return "jpg"
+    if data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+
+def _fetch_original(poster_path):
+    """Download the original poster and store it. Returns (sha256, extension)."""
+    response = requests.get(tmdb_poster_url(poster_path), timeout=FETCH_TIMEOUT)
+    if response.status_code == 404:
+        raise PosterNotFound(poster_path)
+    response.raise_for_status()
+
+    data = response.content
+    ext = _image_extension(data)
+    if ext is None:
+        # Not an image we know how to serve (e.g. an error page)
+        raise PosterNotFound(poster_path)
+    digest = hashlib.sha256(data).hexdigest()
+    original = _sharded("original", digest, ext)
+    if not original.exists():
+        _atomic_write(original, data)
+    _atomic_write(_path_index(poster_path), f"{digest}.{ext}".encode())
+    return digest, ext
+
+
+def _original(poster_path):
+    """(sha256, extension) of the stored original, downloading it on first use."""
+    index = _path_index(poster_path)
+    try:
+        digest, _, ext = index.read_text().partition(".")
+        # Indexes written before formats were detected hold only the digest
+        return digest, ext or "jpg"
+    except FileNotFoundError:
+        pass
+    return singleflight(f"poster:{poster_path}", lambda: _fetch_original(poster_path))
+
+
+def _pillow():
+    """PIL.Image, or None if Pillow is not installed."""
+    try:
+        from PIL import Image
+    except ImportError:  # pragma: no cover - Pillow is optional
+        return None
+    return Image
+
+
+def _render_variant(digest, ext, variant):
+    """Resize the original to the variant's width and store it as WebP."""
+    target = _sharded(variant, digest, "webp")
+    if target.exists():
+        return target
+
+    Image = _pillow()
+    with Image.open(_sharded("original", digest, ext)) as image:
+        width = POSTER_VARIANTS[variant]
+        if image.width > width:
+            height = round(image.height * width / image.width)
+            image = image.resize((width, height), Image.Resampling.LANCZOS)
+        buffer = BytesIO()
+        image.convert("RGB").save(buffer, "WEBP", quality=WEBP_QUALITY, method=4)
+    _atomic_write(target, buffer.getvalue())
+    return target
+
+
+def get_poster_file(poster_path, variant, signature):
+    """
+    Returns (path, content_type) of the local poster file, fetching and
+    resizing it on first use.
+
+    Raises PosterNotFound for bad input (including a wrong signature),
+    requests.RequestException if TMDB can't be reached.
+    """
+    if variant not in POSTER_VARIANTS or not _POSTER_PATH_RE.match(poster_path):
+        raise PosterNotFound(poster_path)
+    if not constant_time_compare(signature or "", sign_poster_path(poster_path)):
+        raise PosterNotFound(poster_path)
+
+    digest, ext = _original(poster_path)
+    if _pillow() is None:
+        return _sharded("original", digest, ext), CONTENT_TYPES[ext]
+    return _render_variant(digest, ext, variant), "image/webp"
+
+
+def poster_url(poster_path, variant="card"):
+    """URL of the proxied poster (empty string if the film has no poster)."""
+    if not poster_path:
+        return ""
+    url = reverse("poster", args=[variant, poster_path.lstrip("/")])
+    return f"{url}?s={sign_poster_path(poster_path)}"
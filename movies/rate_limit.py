@@ -0,0 +1,141 @@
+"""
+Distributed token-bucket rate limiter for outbound TMDB traffic.
+
+One bucket in Redis is shared by web workers, Celery workers and beat.
+Callers are split into priority lanes:
+
+- interactive (default): user-facing search/detail requests. May use every
+  token in the bucket and fail fast when it is empty.
+- background: refresh/import tasks. Can only take tokens above the reserve
+  kept for interactive traffic, and wait for a token instead of failing.
+
+Tokens consumed and rejected per lane are counted in a Redis hash,
+see get_rate_limit_stats().
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+
+BUCKET_KEY = "cinema_tracker:tmdb:ratelimit:bucket"
+STATS_KEY = "cinema_tracker:tmdb:ratelimit:stats"
+
+# KEYS: bucket, stats. ARGV: capacity, refill rate (tokens/s), reserve, lane.
+# Returns {allowed, seconds to wait until a token is available for this lane}.
+_TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local reserve = tonumber(ARGV[3])
+local lane = ARGV[4]
+
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+
+local allowed = 0
+local wait = 0
+if tokens - 1 >= reserve then
+    tokens = tokens - 1
+    allowed = 1
+    redis.call('HINCRBY', KEYS[2], lane .. ':consumed', 1)
+else
+    wait = (reserve + 1 - tokens) / rate
+    redis.call('HINCRBY', KEYS[2], lane .. ':rejected', 1)
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 60)
+return {allowed, tostring(wait)}
+"""
+
+_lane = ContextVar("tmdb_rate_limit_lane", default=INTERACTIVE)
+_script = None
+
+
+class RateLimited(Exception):
+    """No token available for the current lane."""
+
+
+@contextmanager
+def rate_limit_lane(lane):
+    """Run the block with outbound TMDB calls accounted to the given lane."""
+    token = _lane.set(lane)
+    try:
+        yield
+    finally:
+        _lane.reset(token)
+
+
+def _try_acquire(lane):
+    global _script
+    if _script is None:
+        _script = get_redis_connection("default").register_script(_TOKEN_BUCKET_SCRIPT)
+
+    reserve = settings.TMDB_RATE_LIMIT_INTERACTIVE_RESERVE if lane == BACKGROUND else 0
+    allowed, wait = _script(
+        keys=[BUCKET_KEY, STATS_KEY],
+        args=[
+            settings.TMDB_RATE_LIMIT_BURST,
+            settings.TMDB_RATE_LIMIT_PER_SECOND,
+            reserve,
+            lane,
+        ],
+    )
+    return bool(allowed), float(wait)
+
+
+def acquire():
+    """
+    Take one token for the current lane.
+
+    Interactive callers raise RateLimited immediately if the bucket is empty.
+    Background callers sleep until a token is available, up to
+    TMDB_RATE_LIMIT_MAX_WAIT seconds, then raise RateLimited.
+    If Redis is unreachable the call is allowed (fail open).
+    """
+    lane = _lane.get()
+    deadline = time.monotonic() + settings.TMDB_RATE_LIMIT_MAX_WAIT
+
+    while True:
+        try:
+            allowed, wait = _try_acquire(lane)
+        except RedisError:
+            return
+
+        if allowed:
+            return
+        if lane != BACKGROUND:
+            raise RateLimited("TMDB rate limit exceeded")
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise RateLimited("Timed out waiting for a TMDB rate limit token")
+        time.sleep(min(max(wait, 0.01), remaining))
+
+
+def get_rate_limit_stats():
+    """Return {lane: {"consumed": n, "rejected": n}} counters."""
+    raw = get_redis_connection("default").hgetall(STATS_KEY)
+    stats = {
+        lane: {"consumed": 0, "rejected": 0}
+        for lane in (INTERACTIVE, BACKGROUND)
+    }
+    for field, value in raw.items():
+        lane, _, counter = field.decode().partition(":")
+        stats.setdefault(lane, {"consumed": 0, "rejected": 0})[counter] = int(value)
+    return stats
+
+
+def reset_rate_limit_stats():
+    get_redis_connection("default").delete(STATS_KEY)
@@ -1,23 +1,318 @@
-from django.db.models import Avg, Count
-from .models import WatchStatus, Review, Film
-from .tmdb_client import tmdb_get_similar
+import logging
+
+from django.db import transaction
+from django.db.models import Avg, Count, Q
+from django.utils import timezone
+from django_redis.exceptions import ConnectionInterrupted
+from redis.exceptions import RedisError
+from .models import WatchStatus, Review, Film, Activity
+from .tasks import (
+    enqueue,
+    fan_out_activity,
+    import_library_items,
+    update_film_stats,
+    update_taste_profiles,
+)
+from .cache_versions import bump_versions, versioned_cache
+from .services_stats import get_film_stats
+from .services_taste import get_taste_profile, summarize_taste
+from . import leaderboards
+
+
+# Max activity ids per fan-out task
+FAN_OUT_BATCH = 1000
+# Max films per FilmStats refresh task
+FILM_STATS_BATCH = 500
+# Max bulk library items per background TMDB import task
+IMPORT_BATCH = 50
+
+logger = logging.getLogger(__name__)
+
+
+def record_activities(activities):
+    """
+    Saves activity events and schedules their fan-out to Redis timelines
+    after the transaction commits, so the request doesn't wait for it.
+    """
+    activities = Activity.objects.bulk_create(activities, batch_size=FAN_OUT_BATCH)
+    ids = [activity.id for activity in activities]
+
+    def schedule():
+        for i in range(0, len(ids), FAN_OUT_BATCH):
+            enqueue(fan_out_activity, ids[i:i + FAN_OUT_BATCH])
+
+    if ids:
+        transaction.on_commit(schedule)
+
+
+def _invalidate_caches(*, user_ids=(), film_ids=()):
+    """
+    Bumps cache versions of everything derived from these users/films and
+    schedules the refresh of their FilmStats and TasteProfiles.
+    """
+    def invalidate():
+        try:
+            bump_versions(users=user_ids, films=film_ids)
+        except (RedisError, ConnectionInterrupted):
+            # The write is committed; cached entries expire on their own
+            logger.warning("Could not bump cache versions", exc_info=True)
+        if user_ids:
+            enqueue(update_taste_profiles, sorted(set(user_ids)))
+        film_list = sorted(set(film_ids))
+        for i in range(0, len(film_list), FILM_STATS_BATCH):
+            enqueue(update_film_stats, film_list[i:i + FILM_STATS_BATCH])
+
+    transaction.on_commit(invalidate)
+
+
+def _record_leaderboard_event(metric, user, film, weight):
+    """Counts the event in the site-wide leaderboards after the transaction commits."""
+    def record():
+        try:
+            leaderboards.record_events([(metric, user.pk, film.pk, weight)])
+        except (RedisError, ConnectionInterrupted):
+            # Leaderboards are best-effort; they fade out anyway
+            logger.warning("Could not record leaderboard event", exc_info=True)
+
+    transaction.on_commit(record)
 
 
 def set_watch_status(*, user, film, status):
     """
     Creates or updates watch status for a user and a film.
 
+    Uses a single INSERT ... ON CONFLICT DO UPDATE statement.
+
     Returns:
         watch_status (WatchStatus): object that was created or updated
-        created (bool): True if created, False if updated
     """
-    watch_status, created = WatchStatus.objects.update_or_create(
-        user=user,
-        film=film,
-        defaults={"status": status},
+    (watch_status,) = WatchStatus.objects.bulk_create(
+        [WatchStatus(user=user, film=film, status=status)],
+        update_conflicts=True,
+        unique_fields=["user", "film"],
+        update_fields=["status", "updated_at"],
     )
+    record_activities([
+        Activity(user=user, film=film, verb=Activity.Verb.STATUS, status=status),
+    ])
+    _invalidate_caches(user_ids=[user.pk], film_ids=[film.pk])
+    if status != WatchStatus.Status.DROPPED:
+        _record_leaderboard_event(leaderboards.ADDED, user, film, 1)
 
-    return watch_status, created
+    return watch_status
+
+
+def save_review(*, user, film, rating, text=""):
+    """
+    Creates or updates user's rating and review for a film.
+
+    Uses a single INSERT ... ON CONFLICT DO UPDATE statement.
+
+    Returns:
+        review (Review): object that was created or updated
+    """
+    (review,) = Review.objects.bulk_create(
+        [Review(user=user, film=film, rating=rating, text=text)],
+        update_conflicts=True,
+        unique_fields=["user", "film"],
+        update_fields=["rating", "text", "updated_at"],
+    )
+    record_activities([
+        Activity(user=user, film=film, verb=Activity.Verb.REVIEW, rating=rating),
+    ])
+    _invalidate_caches(user_ids=[user.pk], film_ids=[film.pk])
+    _record_leaderboard_event(leaderboards.RATED, user, film, leaderboards.rating_weight(rating))
+
+    return review
+
+
+def update_watch_statuses(*, queryset, status):
+    """
+    Sets the status of all watch statuses in a queryset with one UPDATE
+    (admin bulk actions). No activity events are recorded.
+
+    Returns:
+        number of updated rows
+    """
+    # Distinct ids only (not every row), read before the UPDATE changes
+    # which rows a status-filtered queryset matches
+    queryset = queryset.order_by()
+    user_ids = list(queryset.values_list("user_id", flat=True).distinct())
+    film_ids = list(queryset.values_list("film_id", flat=True).distinct())
+    count = queryset.update(status=status, updated_at=timezone.now())
+    _invalidate_caches(user_ids=user_ids, film_ids=film_ids)
+    return count
+
+
+def _parse_bulk_item(item):
+    """
+    Validates one bulk library item.
+
+    Returns (film_ref, status, rating, text) where film_ref is
+    ("film_id", id) or ("tmdb_id", id). Raises ValueError on bad input.
+    """
+    if not isinstance(item, dict):
+        raise ValueError("Item must be an object")
+
+    if item.get("film_id"):
+        film_ref = ("film_id", int(item["film_id"]))
+    elif item.get("tmdb_id"):
+        film_ref = ("tmdb_id", int(item["tmdb_id"]))
+    else:
+        raise ValueError("Item must contain film_id or tmdb_id")
+
+    status = item.get("status") or None
+    if status is not None and status not in WatchStatus.Status.values:
+        raise ValueError(f"Invalid status: {status}")
+
+    rating = item.get("rating")
+    if rating in (None, ""):
+        rating = None
+    else:
+        rating = int(rating)
+        if rating < 1 or rating > 10:
+            raise ValueError("Rating must be between 1 and 10")
+
+    text = item.get("text")
+    if text is not None:
+        text = str(text).strip()
+        if rating is None:
+            raise ValueError("Review text requires a rating")
+
+    if status is None and rating is None:
+        raise ValueError("Item must contain status or rating")
+
+    return film_ref, status, rating, text
+
+
+def _tmdb_media_type(item):
+    """TMDB media type of a bulk item's optional "type" (Film.type or TMDB's)."""
+    if item.get("type") in (Film.TypeChoices.SERIES, "tv"):
+        return "tv"
+    return "movie"
+
+
+@transaction.atomic
+def bulk_upsert_library(*, user, items, batch_size=1000, import_missing=True):
+    """
+    Creates or updates watch statuses and reviews for many films at once.
+
+    Each item is a dict with film_id or tmdb_id, and optional status,
+    rating, text and type ("movie" or "series", used to import unknown
+    tmdb_ids). Films are resolved in one query; statuses and reviews
+    are written with batched INSERT ... ON CONFLICT DO UPDATE statements.
+    If a film appears several times, the last item wins.
+
+    Items with a tmdb_id that is not in our database are handed to the
+    import_library_items task (after commit), which imports the films from
+    TMDB and then writes these items; with import_missing=False they are
+    reported as missing instead. Unknown film_ids are always missing.
+
+    Returns:
+        dict with counts of written statuses/reviews and of items queued
+        for import, missing film references and per-item validation errors.
+    """
+    parsed = []
+    raw_items = []
+    errors = []
+    for index, item in enumerate(items):
+        try:
+            parsed.append(_parse_bulk_item(item))
+            raw_items.append(item)
+        except (TypeError, ValueError) as e:
+            errors.append({"index": index, "error": str(e)})
+
+    film_ids = {value for (kind, value), *_ in parsed if kind == "film_id"}
+    tmdb_ids = {value for (kind, value), *_ in parsed if kind == "tmdb_id"}
+    existing_ids = set()
+    by_tmdb_id = {}
+    if film_ids or tmdb_ids:
+        for film_id, tmdb_id in Film.objects.filter(
+            Q(id__in=film_ids) | Q(tmdb_id__in=tmdb_ids)
+        ).values_list("id", "tmdb_id"):
+            existing_ids.add(film_id)
+            if tmdb_id is not None:
+                by_tmdb_id[tmdb_id] = film_id
+
+    statuses = {}
+    reviews = {}  # film_id -> Review, rating only (existing text is kept)
+    reviews_with_text = {}  # film_id -> Review, rating and text
+    missing = []
+    to_import = []
+    for item, ((kind, value), status, rating, text) in zip(raw_items, parsed):
+        if kind == "film_id":
+            film_id = value if value in existing_ids else None
+        else:
+            film_id = by_tmdb_id.get(value)
+        if film_id is None:
+            if kind == "tmdb_id" and import_missing:
+                to_import.append({
+                    "tmdb_id": value,
+                    "type": _tmdb_media_type(item),
+                    **{k: item[k] for k in ("status", "rating", "text") if item.get(k) is not None},
+                })
+            else:
+                missing.append({kind: value})
+            continue
+
+        if status is not None:
+            statuses[film_id] = WatchStatus(user=user, film_id=film_id, status=status)
+        if rating is not None:
+            reviews.pop(film_id, None)
+            reviews_with_text.pop(film_id, None)
+            target = reviews if text is None else reviews_with_text
+            target[film_id] = Review(user=user, film_id=film_id, rating=rating, text=text or "")
+
+    WatchStatus.objects.bulk_create(
+        statuses.values(),
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=["user", "film"],
+        update_fields=["status", "updated_at"],
+    )
+    Review.objects.bulk_create(
+        reviews.values(),
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=["user", "film"],
+        update_fields=["rating", "updated_at"],
+    )
+    Review.objects.bulk_create(
+        reviews_with_text.values(),
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=["user", "film"],
+        update_fields=["rating", "text", "updated_at"],
+    )
+
+    record_activities(
+        [
+            Activity(user=user, film_id=ws.film_id, verb=Activity.Verb.STATUS, status=ws.status)
+            for ws in statuses.values()
+        ] + [
+            Activity(user=user, film_id=r.film_id, verb=Activity.Verb.REVIEW, rating=r.rating)
+            for r in (*reviews.values(), *reviews_with_text.values())
+        ]
+    )
+    _invalidate_caches(
+        user_ids=[user.pk],
+        film_ids={*statuses, *reviews, *reviews_with_text},
+    )
+
+    if to_import:
+        def schedule_import():
+            for i in range(0, len(to_import), IMPORT_BATCH):
+                enqueue(import_library_items, user.pk, to_import[i:i + IMPORT_BATCH])
+
+        transaction.on_commit(schedule_import)
+
+    return {
+        "statuses": len(statuses),
+        "reviews": len(reviews) + len(reviews_with_text),
+        "importing": len(to_import),
+        "missing": missing,
+        "errors": errors,
+    }
 
 
 def get_user_watchlist(*, user):
@@ -68,72 +363,106 @@ def get_user_dropped(*, user):
     )
 
 
+def get_user_statuses_by_tmdb_id(*, user, tmdb_ids):
+    """
+    Returns {tmdb_id: status} for the given TMDB ids in user's watchlist.
+    """
+    if not user.is_authenticated or not tmdb_ids:
+        return {}
+    return dict(
+        WatchStatus.objects.filter(
+            user=user,
+            film__tmdb_id__in=tmdb_ids,
+        ).values_list("film__tmdb_id", "status")
+    )
+
+
+@versioned_cache("status_counts")
+def get_user_status_counts(*, user):
+    """
+    Returns {status: count} for every watch status (missing statuses are 0).
+    """
+    counts = dict.fromkeys(WatchStatus.Status.values, 0)
+    counts.update(
+        WatchStatus.objects.filter(user=user)
+        .values_list("status")
+        .annotate(n=Count("id"))
+        .order_by()
+    )
+    return counts
+
+
+@versioned_cache("profile_stats")
+def get_user_profile_stats(*, user):
+    """
+    Returns status counts, average rating, number of reviews and the
+    taste summary (genres, decades, movie/series split).
+    """
+    stats = Review.objects.filter(user=user).aggregate(
+        avg_rating=Avg("rating"),
+        reviews_count=Count("id"),
+    )
+    counts = get_user_status_counts(user=user)
+    return {
+        "counts": counts,
+        "total_count": sum(counts.values()),
+        "avg_rating": stats["avg_rating"],
+        "reviews_count": stats["reviews_count"],
+        "taste": summarize_taste(get_taste_profile(user=user)),
+    }
+
+
 def get_film_rating_stats(*, film):
     """
     Returns average rating and rating count for a film.
+    Updated shortly after writes (see services_stats).
 
     If the film has no reviews, returns (None, 0).
     """
-    stats = Review.objects.filter(
-        film=film
-    ).aggregate(
-        avg_rating=Avg("rating"),
-        rating_count=Count("id"),
-    )
+    # From the per-film summary: Review is partitioned by user, not by film
+    stats = get_film_stats(film=film)
+    if stats is None:
+        return None, 0
 
-    return stats["avg_rating"], stats["rating_count"]
+    return stats.avg_rating, stats.reviews_count
 
 
+@versioned_cache("recommendations", timeout=60 * 60 * 6)
 def get_user_recommendations(*, user, limit=20):
     """
-    Generate personalized recommendations based on user's highly-rated films.
+    Personalized recommendations based on user's highly-rated films.
     
-    Algorithm:
+    Algorithm (see services_recommendations.build_recommendations):
     1. Find films user rated 8-10
     2. Get similar films from TMDB for each
     3. Filter out already watched/in watchlist
-    4. Remove duplicates, sort by TMDB rating
+    4. Remove duplicates, rank by TMDB rating and user's taste profile
     
-    Returns: List of dicts with TMDB movie data
-    """
-    # Get highly-rated films (rating >= 8)
-    highly_rated = Review.objects.filter(
-        user=user,
-        rating__gte=8
-    ).select_related('film').order_by('-rating')[:10]  # Top 10 to avoid too many API calls
+    Uses the set precomputed by the nightly pipeline while it is current,
+    otherwise computes it now.
     
-    if not highly_rated:
-        # Fallback: return empty list or popular movies
+    Returns: List of TMDBItem
+    """
+    # Imported on first use: most processes never compute recommendations
+    from .services_tmdb import get_genre_map
+    from .services_recommendations import (
+        build_recommendations,
+        get_owned_tmdb_ids,
+        get_similar_items,
+        get_stored_recommendations,
+        get_user_seeds,
+    )
+
+    owned = get_owned_tmdb_ids(user)
+
+    stored = get_stored_recommendations(user=user)
+    if stored is not None:
+        return [item for item in stored if item.id not in owned][:limit]
+
+    seeds = get_user_seeds(user)
+    if not seeds:
         return []
-    
-    # Get user's existing films (to filter out)
-    user_film_ids = set(
-        WatchStatus.objects.filter(user=user).values_list('film__tmdb_id', flat=True)
+    return build_recommendations(
+        seeds, owned, get_similar_items(seeds), limit,
+        taste=get_taste_profile(user=user), genre_map=get_genre_map(),
     )
-    
-    # Collect similar films
-    recommendations = {}  # Use dict to avoid duplicates: {tmdb_id: movie_data}
-    
-    for review in highly_rated:
-        film = review.film
-        if not film.tmdb_id:
-            continue
-        
-        # Get similar films from TMDB
-        similar = tmdb_get_similar(film.tmdb_id, media_type=film.type)
-        
-        for movie in similar:
-            tmdb_id = movie.get('id')
-            
-            # Skip if already in user's watchlist or already in recommendations
-            if tmdb_id in user_film_ids or tmdb_id in recommendations:
-                continue
-            
-            # Add to recommendations
-            recommendations[tmdb_id] = movie
-    
-    # Convert to list and sort by TMDB rating (vote_average)
-    rec_list = list(recommendations.values())
-    rec_list.sort(key=lambda x: x.get('vote_average', 0), reverse=True)
-    
-    return rec_list[:limit]
\ No newline at end of file
@@ -0,0 +1,175 @@
+"""
+Service layer for exporting and importing a user's library
+(watch statuses and reviews) as CSV or JSON Lines.
+
+- Export streams rows straight from a server-side cursor, so memory use
+  doesn't depend on library size.
+- Import parses files in chunks and writes each chunk with bulk upserts.
+"""
+
+import csv
+import json
+
+from django.db.models import CharField, OuterRef, Subquery, Value
+
+from .models import Review, WatchStatus
+from .services import bulk_upsert_library
+
+EXPORT_FIELDS = (
+    "tmdb_id",
+    "film_id",
+    "title",
+    "type",
+    "start_year",
+    "status",
+    "rating",
+    "text",
+    "updated_at",
+)
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "jsonl": "application/x-ndjson",
+}
+
+_FILM_FIELDS = ("film__tmdb_id", "film_id", "film__title", "film__type", "film__start_year")
+
+
+def iter_library_rows(*, user, chunk_size=2000):
+    """
+    Yields one tuple (in EXPORT_FIELDS order) per film in user's library:
+    every watch status with the matching review, then reviews of films
+    without a watch status.
+    """
+    user_review = Review.objects.filter(user=user, film_id=OuterRef("film_id"))
+    statuses = (
+        WatchStatus.objects.filter(user=user)
+        .annotate(
+            review_rating=Subquery(user_review.values("rating")[:1]),
+            review_text=Subquery(user_review.values("text")[:1]),
+        )
+        .order_by("id")
+        .values_list(*_FILM_FIELDS, "status", "review_rating", "review_text", "updated_at")
+    )
+    yield from statuses.iterator(chunk_size=chunk_size)
+
+    reviews_only = (
+        Review.objects.filter(user=user)
+        .exclude(film_id__in=WatchStatus.objects.filter(user=user).values("film_id"))
+        .annotate(no_status=Value(None, output_field=CharField()))
+        .order_by("id")
+        .values_list(*_FILM_FIELDS, "no_status", "rating", "text", "updated_at")
+    )
+    yield from reviews_only.iterator(chunk_size=chunk_size)
+
+
+class _Echo:
+    """File-like object that returns what is written (for csv.writer)."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def stream_jsonl(rows):
+    for row in rows:
+        yield json.dumps(dict(zip(EXPORT_FIELDS, row)), default=str, ensure_ascii=False) + "\n"
+
+
+def stream_library_export(*, user, fmt):
+    """Returns an iterator of text chunks with user's library in the given format."""
+    rows = iter_library_rows(user=user)
+    if fmt == "csv":
+        return stream_csv(rows)
+    if fmt == "jsonl":
+        return stream_jsonl(rows)
+    raise ValueError(f"Unknown export format: {fmt}")
+
+
+def _import_item(record):
+    """Maps an exported record to a bulk_upsert_library item."""
+    item = {}
+    # tmdb_id is stable across installations, film_id is only used as a fallback
+    if record.get("tmdb_id") not in (None, ""):
+        item["tmdb_id"] = record["tmdb_id"]
+    elif record.get("film_id") not in (None, ""):
+        item["film_id"] = record["film_id"]
+
+    for field in ("type", "status", "rating", "text"):
+        if record.get(field) not in (None, ""):
+            item[field] = record[field]
+    return item
+
+
+def _iter_records(lines, fmt):
+    """
+    Yields (line number, record, error) for every record; record is None
+    when the line can't be parsed into an object.
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(lines)
+        for record in reader:
+            yield reader.line_num, record, None
+    elif fmt == "jsonl":
+        for line_num, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield line_num, None, f"Invalid JSON: {e}"
+                continue
+            if not isinstance(record, dict):
+                yield line_num, None, "Record must be a JSON object"
+                continue
+            yield line_num, record, None
+    else:
+        raise ValueError(f"Unknown import format: {fmt}")
+
+
+def _import_chunk(user, chunk, line_nums, errors):
+    """
+    Writes one chunk; bulk_upsert_library reports errors by the item's
+    index in the chunk, which is mapped back to its line in the file.
+    """
+    result = bulk_upsert_library(user=user, items=chunk)
+    item_errors = [
+        {"line": line_nums[error["index"]], "error": error["error"]}
+        for error in result["errors"]
+    ]
+    result["errors"] = sorted(errors + item_errors, key=lambda error: error["line"])
+    return result
+
+
+def import_library(*, user, lines, fmt, chunk_size=1000):
+    """
+    Imports an exported library file (iterable of text lines) for a user.
+
+    Parses and writes chunk_size records at a time. Yields the
+    bulk_upsert_library result of every chunk, so callers can report progress.
+    Lines that can't be parsed or hold invalid items are reported in the
+    chunk's errors with their line number instead of aborting the import.
+    """
+    chunk = []
+    line_nums = []
+    errors = []
+    for line_num, record, error in _iter_records(lines, fmt):
+        if error is not None:
+            errors.append({"line": line_num, "error": error})
+            continue
+        chunk.append(_import_item(record))
+        line_nums.append(line_num)
+        if len(chunk) >= chunk_size:
+            yield _import_chunk(user, chunk, line_nums, errors)
+            chunk = []
+            line_nums = []
+            errors = []
+
+    if chunk or errors:
+        yield _import_chunk(user, chunk, line_nums, errors)
@@ -0,0 +1,255 @@
+"""
+Service layer for personalized recommendations.
+
+Recommendations are TMDB titles similar to films the user rated 8-10,
+minus films already in the user's library, ranked by TMDB rating and the
+user's TasteProfile (services_taste.rank_by_taste).
+
+- build_recommendations() is the algorithm itself, shared by the online
+  path (services.get_user_recommendations) and the nightly pipeline.
+- The pipeline splits users into shards (contiguous user_id ranges, so
+  shard queries use the user_id indexes). A shard loads everything it
+  needs in bulk: highly-rated reviews, libraries and taste profiles of
+  all its users in three queries, and each distinct similar-title list once
+  (lists are also cached, so shards share them). Results are written to
+  RecommendationSet with one bulk upsert per shard.
+"""
+
+import time
+
+from django.core.cache import cache
+from django.db.models import Max
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from requests import HTTPError, RequestException
+
+from .models import Film, RecommendationSet, Review, TasteProfile, WatchStatus
+from .services_taste import rank_by_taste
+from .services_tmdb import get_genre_map
+from .tmdb_client import TMDBUnavailable, tmdb_get_similar
+from .tmdb_types import TMDBItem, items_from_tmdb, pack_items, unpack_items
+
+HIGH_RATING = 8
+SEED_FILMS = 10  # top rated films per user used as seeds
+STORED_ITEMS = 48  # stored per user; owned films are filtered out on read
+SIMILAR_TIMEOUT = 60 * 60 * 24
+
+# State of the last pipeline run: {"ranges": [(lo, hi), ...], "completed": [shard, ...]}
+PIPELINE_RUN_KEY = "recommendations:pipeline_run"
+
+
+def _media_type(film_type):
+    return "tv" if film_type == Film.TypeChoices.SERIES else "movie"
+
+
+def get_similar_items(seeds, raise_errors=False):
+    """
+    Returns {(tmdb_id, media_type): [TMDBItem]} for the given seed films,
+    reading cached lists in one round trip and fetching only the misses.
+
+    Lists that can't be fetched (TMDB down, out of rate limit tokens) are
+    empty and not cached. With raise_errors, the other lists are still
+    fetched and cached, then TMDBUnavailable is raised, so a caller that
+    stores the results doesn't store truncated ones.
+    """
+    keys = {f"tmdb_similar:{media_type}:{tmdb_id}": (tmdb_id, media_type) for tmdb_id, media_type in seeds}
+    found = cache.get_many(keys)
+
+    similar = {keys[key]: unpack_items(packed) for key, packed in found.items()}
+    fetched = {}
+    failed = 0
+    for key, (tmdb_id, media_type) in keys.items():
+        if key in found:
+            continue
+        try:
+            results = tmdb_get_similar(tmdb_id, media_type=media_type)
+        except HTTPError as e:
+            # The seed film no longer exists at TMDB: nothing similar
+            if e.response is None or e.response.status_code != 404:
+                failed += 1
+            results = []
+        except RequestException:
+            failed += 1
+            results = []
+        items = items_from_tmdb(results, media_type=media_type)
+        similar[(tmdb_id, media_type)] = items
+        if items:
+            fetched[key] = pack_items(items)
+    if fetched:
+        cache.set_many(fetched, SIMILAR_TIMEOUT)
+    if failed and raise_errors:
+        raise TMDBUnavailable(f"{failed} of {len(keys)} similar lists could not be fetched")
+    return similar
+
+
+def build_recommendations(seeds, owned_tmdb_ids, similar, limit, taste=None, genre_map=None):
+    """
+    seeds: [(tmdb_id, media_type)] of highly-rated films, best first;
+    similar: {(tmdb_id, media_type): [TMDBItem]};
+    taste: the user's TasteProfile or None; genre_map: {TMDB genre id: name}.
+    Returns up to limit TMDBItems not in owned_tmdb_ids.
+    """
+    recommendations = {}
+    for seed in seeds:
+        for item in similar.get(seed, ()):
+            if item.id not in owned_tmdb_ids and item.id not in recommendations:
+                recommendations[item.id] = item
+
+    rec_list = rank_by_taste(list(recommendations.values()), taste, genre_map or {})
+    return rec_list[:limit]
+
+
+def _highly_rated(reviews):
+    return reviews.filter(rating__gte=HIGH_RATING, film__tmdb_id__isnull=False)
+
+
+def get_user_seeds(user):
+    return [
+        (tmdb_id, _media_type(film_type))
+        for tmdb_id, film_type in _highly_rated(Review.objects.filter(user=user))
+        .order_by("-rating")
+        .values_list("film__tmdb_id", "film__type")[:SEED_FILMS]
+    ]
+
+
+def get_owned_tmdb_ids(user):
+    return set(WatchStatus.objects.filter(user=user).values_list("film__tmdb_id", flat=True))
+
+
+def get_stored_recommendations(*, user):
+    """
+    Returns the user's precomputed TMDBItems, or None if there are none or
+    the user rated films highly after they were computed.
+    """
+    stored = RecommendationSet.objects.filter(user=user).only("items", "computed_at").first()
+    if stored is None:
+        return None
+    last_rated = _highly_rated(Review.objects.filter(user=user)).aggregate(last=Max("updated_at"))["last"]
+    if last_rated and last_rated > stored.computed_at:
+        return None
+    return [TMDBItem.from_tuple(values) for values in stored.items]
+
+
+def _in_range(queryset, lo, hi):
+    queryset = queryset.filter(user_id__gte=lo)
+    return queryset.filter(user_id__lt=hi) if hi is not None else queryset
+
+
+def compute_shard(shard, lo, hi):
+    """
+    Recomputes and stores recommendations of users with lo <= id < hi
+    (hi=None: no upper bound).
+
+    Returns {"shard", "users", "seconds"}. Raises TMDBUnavailable if any
+    similar list couldn't be fetched (TMDB down, rate limit budget spent),
+    so the shard can be retried as a whole; fetched lists stay cached.
+    """
+    started = time.monotonic()
+
+    # Seeds of all users in one query (rows ordered by user, best rating first)
+    seeds = {}
+    rows = (
+        _highly_rated(_in_range(Review.objects.all(), lo, hi))
+        .order_by("user_id", "-rating", "-updated_at")
+        .values_list("user_id", "film__tmdb_id", "film__type")
+    )
+    for user_id, tmdb_id, film_type in rows.iterator(chunk_size=5000):
+        user_seeds = seeds.setdefault(user_id, [])
+        if len(user_seeds) < SEED_FILMS:
+            user_seeds.append((tmdb_id, _media_type(film_type)))
+
+    owned = {}
+    rows = (
+        _in_range(WatchStatus.objects.all(), lo, hi)
+        .filter(film__tmdb_id__isnull=False)
+        .values_list("user_id", "film__tmdb_id")
+    )
+    for user_id, tmdb_id in rows.iterator(chunk_size=5000):
+        if user_id in seeds:
+            owned.setdefault(user_id, set()).add(tmdb_id)
+
+    tastes = {
+        profile.user_id: profile
+        for profile in _in_range(TasteProfile.objects.all(), lo, hi).filter(user_id__in=seeds)
+    }
+    genre_map = get_genre_map()
+
+    # Each distinct seed film is fetched once per shard at most. If any list
+    # is missing, keep yesterday's results instead of storing truncated ones
+    similar = get_similar_items(
+        {seed for user_seeds in seeds.values() for seed in user_seeds}, raise_errors=True,
+    )
+
+    now = timezone.now()
+    sets = [
+        RecommendationSet(
+            user_id=user_id,
+            items=[item.to_tuple() for item in build_recommendations(
+                user_seeds, owned.get(user_id, set()), similar, STORED_ITEMS,
+                taste=tastes.get(user_id), genre_map=genre_map,
+            )],
+            computed_at=now,
+        )
+        for user_id, user_seeds in seeds.items()
+    ]
+    RecommendationSet.objects.bulk_create(
+        sets,
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=["user"],
+        update_fields=["items", "computed_at"],
+    )
+    # Users of the shard that no longer have highly-rated films
+    _in_range(RecommendationSet.objects.all(), lo, hi).filter(computed_at__lt=now).delete()
+
+    mark_shard_completed(shard)
+    return {"shard": shard, "users": len(sets), "seconds": time.monotonic() - started}
+
+
+def start_pipeline_run(shard_count):
+    """
+    Splits users into shard_count id ranges and starts a new run.
+    Returns the ranges [(lo, hi), ...]; the last one is open-ended.
+    """
+    max_id = get_user_model().objects.aggregate(max_id=Max("id"))["max_id"] or 0
+    step = max_id // shard_count + 1
+    ranges = [(i * step, (i + 1) * step) for i in range(shard_count)]
+    ranges[-1] = (ranges[-1][0], None)  # users who sign up during the run
+    cache.set(PIPELINE_RUN_KEY, {"ranges": ranges, "completed": []}, None)
+    return ranges
+
+
+def get_pending_shards():
+    """
+    Shards of the last run that haven't completed, as {shard: (lo, hi)}
+    (for resuming). Empty if there is no run.
+    """
+    state = cache.get(PIPELINE_RUN_KEY)
+    if not state:
+        return {}
+    completed = set(state["completed"])
+    return {
+        shard: tuple(bounds)
+        for shard, bounds in enumerate(state["ranges"])
+        if shard not in completed
+    }
+
+
+def mark_shard_completed(shard):
+    # Not atomic across workers: a lost update only means recomputing a shard on resume
+    state = cache.get(PIPELINE_RUN_KEY)
+    if state:
+        state["completed"] = sorted(set(state["completed"]) | {shard})
+        cache.set(PIPELINE_RUN_KEY, state, None)
+
+
+def summarize_shards(results, started_at):
+    """Totals and throughput of a pipeline run from compute_shard() results."""
+    users = sum(result["users"] for result in results)
+    elapsed = max(time.time() - started_at, 0.001)
+    return {
+        "shards": len(results),
+        "users": users,
+        "seconds": round(elapsed, 1),
+        "users_per_second": round(users / elapsed, 1),
+    }
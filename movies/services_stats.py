@@ -0,0 +1,78 @@
+"""
+Service layer for per-film summaries (FilmStats).
+
+WatchStatus and Review are partitioned by user, so counting them by film
+scans every partition. FilmStats keeps those counts per film; it's
+refreshed by a deduplicated task after writes (services._invalidate_caches)
+and can be rebuilt with `manage.py partition_tables --film-stats`.
+"""
+
+from django.db.models import Count, Sum
+
+from .models import Film, FilmStats, Review, WatchStatus
+
+
+def refresh_film_stats(film_ids=None, batch_size=1000):
+    """
+    Recomputes FilmStats of the given films (all films if None) with two
+    GROUP BY queries and one bulk upsert per batch. Returns the number of films.
+    """
+    if film_ids is None:
+        film_ids = Film.objects.order_by("id").values_list("id", flat=True).iterator(chunk_size=batch_size)
+
+    count = 0
+    batch = []
+    for film_id in film_ids:
+        batch.append(film_id)
+        if len(batch) >= batch_size:
+            count += _refresh_batch(batch)
+            batch = []
+    if batch:
+        count += _refresh_batch(batch)
+    return count
+
+
+def _refresh_batch(film_ids):
+    watchers = dict(
+        WatchStatus.objects.filter(film_id__in=film_ids)
+        .values("film_id")
+        .annotate(n=Count("id"))
+        .values_list("film_id", "n")
+    )
+    reviews = {
+        row["film_id"]: row
+        for row in Review.objects.filter(film_id__in=film_ids)
+        .values("film_id")
+        .annotate(n=Count("id"), total=Sum("rating"))
+    }
+    existing = set(Film.objects.filter(id__in=film_ids).values_list("id", flat=True))
+    FilmStats.objects.bulk_create(
+        [
+            FilmStats(
+                film_id=film_id,
+                watchers_count=watchers.get(film_id, 0),
+                reviews_count=reviews[film_id]["n"] if film_id in reviews else 0,
+                rating_sum=reviews[film_id]["total"] if film_id in reviews else 0,
+            )
+            for film_id in existing
+        ],
+        update_conflicts=True,
+        unique_fields=["film"],
+        update_fields=["watchers_count", "reviews_count", "rating_sum", "updated_at"],
+    )
+    return len(existing)
+
+
+def get_film_stats(*, film):
+    """
+    Returns FilmStats of a film. If they don't exist yet, returns unsaved
+    zero counters and schedules update_film_stats: this runs in GET requests,
+    which must not write (that would also pin the user to the primary).
+    """
+    stats = FilmStats.objects.filter(film=film).first()
+    if stats is None:
+        from .tasks import enqueue, update_film_stats
+
+        enqueue(update_film_stats, [film.pk])
+        stats = FilmStats(film=film)
+    return stats
@@ -0,0 +1,178 @@
+"""
+Service layer for user taste profiles (TasteProfile).
+
+A profile is rebuilt for a batch of users with four GROUP BY queries over
+their WatchStatus/Review rows (by genre, decade and film type), so the cost
+doesn't grow with the number of films a user has. It's refreshed by the
+deduplicated update_taste_profiles task after writes (services._invalidate_caches)
+and can be rebuilt for everyone with `manage.py rebuild_taste_profiles`.
+
+Genre affinity: +1 for every film of the genre in the library, +-1 for a
+review of 10 / 1 (linear, 5.5 is neutral), -1 for a dropped film; scaled
+to [-1, 1] by the user's strongest genre.
+"""
+
+from django.db.models import Count, F, Q, Sum
+
+from .models import Film, Review, TasteProfile, WatchStatus
+
+NEUTRAL_RATING = 5.5
+RATING_SCALE = 4.5  # 10 and 1 are +-1 from neutral
+
+# Re-ranking of recommendation candidates: TMDB rating (0..1) plus these
+GENRE_WEIGHT = 0.5
+TYPE_WEIGHT = 0.2
+DECADE_WEIGHT = 0.2
+
+# Rows shown on the profile page
+PROFILE_GENRES = 8
+
+
+def _in_users(queryset, user_ids):
+    return queryset.filter(user_id__in=user_ids).order_by()
+
+
+def refresh_taste_profiles(user_ids, batch_size=500):
+    """
+    Recomputes TasteProfiles of the given users with one set of GROUP BY
+    queries and one bulk upsert per batch. Returns the number of profiles.
+    """
+    user_ids = list(user_ids)
+    count = 0
+    for i in range(0, len(user_ids), batch_size):
+        count += _refresh_batch(user_ids[i:i + batch_size])
+    return count
+
+
+def _refresh_batch(user_ids):
+    dropped = Q(status=WatchStatus.Status.DROPPED)
+    scores = {}
+    for user_id, genre, kept, dropped_count in (
+        _in_users(WatchStatus.objects, user_ids)
+        .filter(film__genres__isnull=False)
+        .values("user_id", "film__genres__name")
+        .annotate(kept=Count("id", filter=~dropped), dropped=Count("id", filter=dropped))
+        .values_list("user_id", "film__genres__name", "kept", "dropped")
+    ):
+        genres = scores.setdefault(user_id, {})
+        genres[genre] = genres.get(genre, 0) + kept - dropped_count
+
+    for user_id, genre, n, total in (
+        _in_users(Review.objects, user_ids)
+        .filter(film__genres__isnull=False)
+        .values("user_id", "film__genres__name")
+        .annotate(n=Count("id"), total=Sum("rating"))
+        .values_list("user_id", "film__genres__name", "n", "total")
+    ):
+        genres = scores.setdefault(user_id, {})
+        genres[genre] = genres.get(genre, 0) + (total - NEUTRAL_RATING * n) / RATING_SCALE
+
+    decades = {}
+    for user_id, decade, n in (
+        _in_users(WatchStatus.objects, user_ids)
+        .exclude(dropped)
+        .filter(film__start_year__isnull=False)
+        .values("user_id", decade=F("film__start_year") / 10 * 10)
+        .annotate(n=Count("id"))
+        .values_list("user_id", "decade", "n")
+    ):
+        decades.setdefault(user_id, {})[str(decade)] = n
+
+    types = {}
+    for user_id, film_type, n in (
+        _in_users(WatchStatus.objects, user_ids)
+        .exclude(dropped)
+        .values("user_id", "film__type")
+        .annotate(n=Count("id"))
+        .values_list("user_id", "film__type", "n")
+    ):
+        types.setdefault(user_id, {})[film_type] = n
+
+    profiles = []
+    for user_id in user_ids:
+        genres = scores.get(user_id, {})
+        strongest = max((abs(score) for score in genres.values()), default=0) or 1
+        user_types = types.get(user_id, {})
+        profiles.append(TasteProfile(
+            user_id=user_id,
+            genres={
+                genre: round(score / strongest, 3)
+                for genre, score in sorted(genres.items(), key=lambda kv: -kv[1])
+            },
+            decades=dict(sorted(decades.get(user_id, {}).items())),
+            movies_count=user_types.get(Film.TypeChoices.MOVIE, 0),
+            series_count=user_types.get(Film.TypeChoices.SERIES, 0),
+        ))
+    TasteProfile.objects.bulk_create(
+        profiles,
+        update_conflicts=True,
+        unique_fields=["user"],
+        update_fields=["genres", "decades", "movies_count", "series_count", "updated_at"],
+    )
+    return len(profiles)
+
+
+def get_taste_profile(*, user):
+    """Returns the user's TasteProfile, or None if it wasn't computed yet."""
+    return TasteProfile.objects.filter(user=user).first()
+
+
+def summarize_taste(profile):
+    """
+    Genre and decade breakdowns for the profile page:
+    {"genres": [(name, percent)], "decades": [(decade, percent)],
+    "movie_share": percent, "series_share": percent}.
+    Only liked genres are listed; percents are relative to the strongest one.
+    """
+    if profile is None:
+        return None
+    total = sum(profile.decades.values()) or 1
+    movie_share = profile.movie_share
+    return {
+        "genres": [
+            (genre, round(score * 100))
+            for genre, score in list(profile.genres.items())[:PROFILE_GENRES]
+            if score > 0
+        ],
+        "decades": [
+            (f"{decade}s", round(n * 100 / total))
+            for decade, n in profile.decades.items()
+        ],
+        "movie_share": round(movie_share * 100) if movie_share is not None else None,
+        "series_share": round((1 - movie_share) * 100) if movie_share is not None else None,
+    }
+
+
+def rank_by_taste(items, profile, genre_map):
+    """
+    Re-ranks TMDBItems: TMDB rating plus the user's affinity for the item's
+    genres, type and decade. Without a profile, ranks by TMDB rating only.
+
+    genre_map: {TMDB genre id: name}, see services_tmdb.get_genre_map.
+    """
+    if profile is None or not items:
+        return sorted(items, key=lambda x: x.vote_average or 0, reverse=True)
+
+    # Per-feature lookup tables, built once for the whole candidate list
+    genre_affinity = {
+        genre_id: profile.genres[name]
+        for genre_id, name in genre_map.items()
+        if name in profile.genres
+    }
+    movie_share = profile.movie_share
+    type_affinity = (
+        {"movie": movie_share, "tv": 1 - movie_share} if movie_share is not None else {}
+    )
+    decades_total = sum(profile.decades.values()) or 1
+    decade_affinity = {int(decade): n / decades_total for decade, n in profile.decades.items()}
+
+    def score(item):
+        genres = [genre_affinity.get(genre_id, 0) for genre_id in item.genre_ids]
+        return (
+            (item.vote_average or 0) / 10
+            + GENRE_WEIGHT * (sum(genres) / len(genres) if genres else 0)
+            + TYPE_WEIGHT * type_affinity.get(item.media_type, 0)
+            + DECADE_WEIGHT * decade_affinity.get((item.year or 0) // 10 * 10, 0)
+        )
+
+    return sorted(items, key=score, reverse=True)
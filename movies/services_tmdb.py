@@ -4,16 +4,81 @@ Service layer for importing data from TMDB into our Django Film and Genre models
 - Maps external JSON data to Django models.
 - Checks for duplicates.
 - Creates necessary genres.
+- Keeps last-known-good copies of TMDB data for degraded mode.
+- Finds and refreshes films changed at TMDB.
+- Fills in missing metadata of imported films in bulk.
+- Imports films straight from search/feed results, using a cached TMDB
+  genre map, so adding a film doesn't wait for a details request.
 """
 
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+from redis.exceptions import RedisError
+from requests import HTTPError, RequestException
 from .models import Film, Genre
+from .title_index import index_film, index_tmdb_items
+from .cache_versions import FEED, bump_versions, get_versions
+from .local_cache import local_cache
+from .tmdb_client import (
+    tmdb_get_changes,
+    tmdb_get_genres,
+    tmdb_get_movie_details,
+    tmdb_get_popular,
+    tmdb_get_trending,
+    tmdb_is_available,
+)
+from .tmdb_types import TMDBItem, items_from_tmdb, pack_items, unpack_items
+
+# How long to keep serving last-known-good data after TMDB stops answering
+LAST_GOOD_TIMEOUT = 60 * 60 * 24 * 7  # 1 week
+# How long an empty feed is cached before we try TMDB again
+EMPTY_FEED_RETRY = 60
+
+TRENDING_FEED_KEY = "feed:trending_week"
+TRENDING_FEED_TIMEOUT = 60 * 60  # 1 hour
+POPULAR_FEED_KEY = "feed:popular_movies"
+POPULAR_FEED_TIMEOUT = 60 * 60 * 6  # 6 hours
+FEED_SIZE = 12
+
+# Detail fields we render or import; the rest of the TMDB payload isn't cached
+DETAIL_FIELDS = (
+    "id", "title", "name", "release_date", "first_air_date", "overview",
+    "genres", "poster_path", "vote_average", "vote_count",
+)
+
+# {genre id: name} for movies and TV, refreshed daily by update_genre_map
+GENRE_MAP_KEY = "tmdb:genre_map"
+GENRE_MAP_TIMEOUT = 60 * 60 * 24 * 7
+# Search/feed results remembered per item, for importing them without TMDB
+TMDB_ITEM_TIMEOUT = 60 * 60 * 24
+
+# TMDB media type <-> Film.type
+FILM_MEDIA_TYPES = {
+    Film.TypeChoices.MOVIE: "movie",
+    Film.TypeChoices.SERIES: "tv",
+}
+# The /changes endpoints accept at most 14 days and 500 pages
+CHANGES_MAX_DAYS = 14
+CHANGES_MAX_PAGES = 500
+
+
+def _start_year(tmdb_data):
+    date = tmdb_data.get("release_date") or tmdb_data.get("first_air_date") or ""
+    return int(date[:4]) if date[:4].isdigit() else None
 
-def import_tmdb_movie(tmdb_data):
+
+def import_tmdb_movie(tmdb_data, update_existing=False):
     """
     Import a movie or series from TMDB into our database.
 
     Ensures no duplicates by TMDB ID. Handles missing fields gracefully.
     Creates related genres if they don't exist.
+    With update_existing, an already imported film is overwritten with tmdb_data.
     """
 
     tmdb_id = tmdb_data.get("id")
@@ -22,12 +87,7 @@ def import_tmdb_movie(tmdb_data):
 
     title = tmdb_data.get("title") or tmdb_data.get("name", "Unknown Title")
 
-    if "release_date" in tmdb_data and tmdb_data["release_date"]:
-        start_year = int(tmdb_data["release_date"][:4])
-    elif "first_air_date" in tmdb_data and tmdb_data["first_air_date"]:
-        start_year = int(tmdb_data["first_air_date"][:4])
-    else:
-        start_year = None
+    start_year = _start_year(tmdb_data)
 
     type_ = "movie" if "title" in tmdb_data else "series"
 
@@ -43,11 +103,400 @@ def import_tmdb_movie(tmdb_data):
         }
     )
 
+    if not created and update_existing:
+        film.title = title
+        film.type = type_
+        if start_year:
+            film.start_year = start_year
+        if description:
+            film.description = description
+
     tmdb_genres = tmdb_data.get("genres", [])
-    for g in tmdb_genres:
-        genre_obj, _ = Genre.objects.get_or_create(name=g["name"])
-        film.genres.add(genre_obj)
+    genre_objs = [Genre.objects.get_or_create(name=g["name"])[0] for g in tmdb_genres]
+    if not created and update_existing and "genres" in tmdb_data:
+        film.genres.set(genre_objs)
+    else:
+        film.genres.add(*genre_objs)
 
     film.save()
 
-    return film
\ No newline at end of file
+    try:
+        index_film(film)
+    except RedisError:
+        # Autocomplete index is rebuilt periodically anyway
+        pass
+
+    return film
+
+
+def store_feed(key, items, timeout):
+    """Cache a feed of TMDBItems (packed) and remember it as last-known-good."""
+    packed = pack_items(items)
+    cache.set(key, packed, timeout)
+    cache.set(f"{key}:last_good", packed, LAST_GOOD_TIMEOUT)
+    cache_tmdb_items(items)
+
+    try:
+        # New feed version makes cached card fragments of the old one unused
+        bump_versions(feeds=[key])
+        index_tmdb_items(items)
+    except RedisError:
+        pass
+    local_cache.invalidate(key, _feed_version_key(key))
+
+
+def get_cached_feed(key, fetch, timeout):
+    """
+    Return a cached TMDB feed (trending, popular, ...) as a list of TMDBItems.
+
+    Served from the in-process cache when possible. On a Redis miss calls
+    fetch() and caches the result. If TMDB returns nothing (outage or open
+    circuit), serves the last-known-good copy and retries upstream after a
+    short delay instead of on every request.
+    """
+    # Items are immutable; the list is copied so callers can't change the shared one
+    return list(local_cache.get_or_set(key, lambda: tuple(_load_feed(key, fetch, timeout))))
+
+
+def _load_feed(key, fetch, timeout):
+    packed = cache.get(key)
+    if packed is not None:
+        return unpack_items(packed)
+
+    items = fetch() if tmdb_is_available() else []
+    if items:
+        store_feed(key, items, timeout)
+        return items
+
+    packed = cache.get(f"{key}:last_good", ())
+    cache.set(key, packed, EMPTY_FEED_RETRY)
+    return unpack_items(packed)
+
+
+def fetch_trending_feed():
+    return items_from_tmdb(
+        tmdb_get_trending(media_type="all", time_window="week")[:FEED_SIZE]
+    )
+
+
+def fetch_popular_feed():
+    return items_from_tmdb(
+        tmdb_get_popular(media_type="movie")[:FEED_SIZE],
+        media_type="movie",
+    )
+
+
+def get_trending_feed():
+    return get_cached_feed(TRENDING_FEED_KEY, fetch_trending_feed, TRENDING_FEED_TIMEOUT)
+
+
+def get_popular_feed():
+    return get_cached_feed(POPULAR_FEED_KEY, fetch_popular_feed, POPULAR_FEED_TIMEOUT)
+
+
+def _feed_version_key(key):
+    return f"feed_version:{key}"
+
+
+def get_feed_versions(*keys):
+    """Returns {feed key: version}, for fragment cache keys of feed cards."""
+    return {
+        key: local_cache.get_or_set(_feed_version_key(key), lambda key=key: get_versions(FEED, [key])[key])
+        for key in keys
+    }
+
+
+def fetch_movie_details(tmdb_id, media_type="movie"):
+    """
+    Fetch fresh movie/series details from TMDB and remember them as
+    last-known-good.
+
+    Raises requests.RequestException if TMDB is unreachable or returns an error.
+    """
+    data = tmdb_get_movie_details(tmdb_id=tmdb_id, media_type=media_type)
+    cache.set(
+        f"tmdb_details:{media_type}:{tmdb_id}",
+        {k: data[k] for k in DETAIL_FIELDS if k in data},
+        LAST_GOOD_TIMEOUT,
+    )
+    return data
+
+
+def get_movie_details(tmdb_id, media_type="movie"):
+    """
+    Fetch movie/series details from TMDB, falling back to the last-known-good
+    copy while TMDB is unavailable.
+
+    Raises requests.RequestException if TMDB fails and nothing is cached.
+    """
+    try:
+        return fetch_movie_details(tmdb_id=tmdb_id, media_type=media_type)
+    except Exception:
+        data = cache.get(f"tmdb_details:{media_type}:{tmdb_id}")
+        if data is None:
+            raise
+        return data
+
+
+def iter_tmdb_changes(media_type, start_date, end_date):
+    """Yields TMDB ids of movies/series (media_type: movie/tv) changed in the date range."""
+    page = total_pages = 1
+    while page <= min(total_pages, CHANGES_MAX_PAGES):
+        data = tmdb_get_changes(media_type, start_date, end_date, page=page)
+        total_pages = data.get("total_pages") or 1
+        for entry in data.get("results", []):
+            if entry.get("id"):
+                yield entry["id"]
+        page += 1
+
+
+def get_tmdb_changes(start_date, end_date):
+    """
+    Returns {media_type: set of TMDB ids} changed in the date range.
+
+    If settings.TMDB_CHANGES_FIXTURE is set, ids are read from that JSON file
+    ({"movie": [...], "tv": [...]}) instead of TMDB, e.g. for local development.
+    Raises requests.RequestException if TMDB can't be read.
+    """
+    if settings.TMDB_CHANGES_FIXTURE:
+        with open(settings.TMDB_CHANGES_FIXTURE) as f:
+            data = json.load(f)
+        return {media_type: set(data.get(media_type, ())) for media_type in FILM_MEDIA_TYPES.values()}
+
+    return {
+        media_type: set(iter_tmdb_changes(media_type, start_date, end_date))
+        for media_type in FILM_MEDIA_TYPES.values()
+    }
+
+
+def find_changed_films(changes):
+    """Ids of our films whose TMDB ids are in changes ({media_type: ids}), in one query."""
+    condition = Q(pk__in=[])
+    for film_type, media_type in FILM_MEDIA_TYPES.items():
+        if changes.get(media_type):
+            condition |= Q(type=film_type, tmdb_id__in=list(changes[media_type]))
+    return list(Film.objects.filter(condition).order_by("id").values_list("id", flat=True))
+
+
+def refresh_films(film_ids):
+    """
+    Re-import films from fresh TMDB details.
+
+    Returns (number of refreshed films, ids that failed and should be retried).
+    Films that no longer exist at TMDB are skipped.
+    """
+    refreshed, failed = 0, []
+    for film in Film.objects.filter(id__in=film_ids, tmdb_id__isnull=False).only("id", "tmdb_id", "type"):
+        try:
+            data = fetch_movie_details(film.tmdb_id, FILM_MEDIA_TYPES[film.type])
+        except HTTPError as e:
+            if e.response is None or e.response.status_code != 404:
+                failed.append(film.id)
+            continue
+        except RequestException:
+            failed.append(film.id)
+            continue
+        import_tmdb_movie(data, update_existing=True)
+        refreshed += 1
+    return refreshed, failed
+
+
+def import_films_by_tmdb_id(refs):
+    """
+    Import films that are not in our database yet from TMDB details.
+
+    refs: iterable of (tmdb_id, media_type). Returns the refs that failed
+    and should be retried; films that don't exist at TMDB are skipped.
+    """
+    refs = set(refs)
+    existing = set(
+        Film.objects.filter(tmdb_id__in={tmdb_id for tmdb_id, _ in refs})
+        .values_list("tmdb_id", flat=True)
+    )
+    failed = []
+    for tmdb_id, media_type in sorted(refs):
+        if tmdb_id in existing:
+            continue
+        try:
+            data = fetch_movie_details(tmdb_id, media_type)
+        except HTTPError as e:
+            if e.response is None or e.response.status_code != 404:
+                failed.append((tmdb_id, media_type))
+            continue
+        except RequestException:
+            failed.append((tmdb_id, media_type))
+            continue
+        import_tmdb_movie(data)
+        existing.add(tmdb_id)
+    return failed
+
+
+def get_incomplete_films():
+    """TMDB films with unknown year, no description or no genres, ordered by id."""
+    has_genres = Film.genres.through.objects.filter(film_id=OuterRef("pk"))
+    return (
+        Film.objects.filter(tmdb_id__isnull=False)
+        .filter(Q(start_year__isnull=True) | Q(description="") | ~Exists(has_genres))
+        .order_by("id")
+    )
+
+
+def fill_missing_details(details):
+    """
+    Fill in missing year, description and genres of films from TMDB details.
+
+    details: list of (film, tmdb_data). Existing values are kept. Writes with
+    bulk_update / bulk_create, so a batch costs a handful of queries.
+    Returns the number of films that changed.
+    """
+    now = timezone.now()
+    changed = {}
+    film_genres = []
+    for film, data in details:
+        year = _start_year(data)
+        if film.start_year is None and year:
+            film.start_year = year
+            changed[film.pk] = film
+        if not film.description and data.get("overview"):
+            film.description = data["overview"]
+            changed[film.pk] = film
+        for genre in data.get("genres", ()):
+            film_genres.append((film, genre["name"]))
+
+    if film_genres:
+        names = {name for _, name in film_genres}
+        Genre.objects.bulk_create([Genre(name=name) for name in names], ignore_conflicts=True)
+        genre_ids = dict(Genre.objects.filter(name__in=names).values_list("name", "id"))
+        Through = Film.genres.through
+        existing = set(
+            Through.objects.filter(film_id__in=[film.pk for film, _ in details])
+            .values_list("film_id", "genre_id")
+        )
+        links = {(film.pk, genre_ids[name]) for film, name in film_genres} - existing
+        Through.objects.bulk_create(
+            [Through(film_id=film_id, genre_id=genre_id) for film_id, genre_id in links],
+            ignore_conflicts=True,
+        )
+        changed.update({film_id: None for film_id, _ in links})
+
+    if not changed:
+        return 0
+
+    # bulk_update skips auto_now and signals: set updated_at and bump versions here
+    films = [film for film, _ in details if film.pk in changed]
+    for film in films:
+        film.updated_at = now
+    Film.objects.bulk_update(films, ["start_year", "description", "updated_at"])
+    try:
+        bump_versions(films=[film.pk for film in films])
+    except RedisError:
+        pass
+    return len(films)
+
+
+def fetch_genre_map():
+    """Fetch {genre id: name} for movies and TV from TMDB (raises on error)."""
+    genre_map = {}
+    for media_type in FILM_MEDIA_TYPES.values():
+        for genre in tmdb_get_genres(media_type):
+            genre_map[genre["id"]] = genre["name"]
+    return genre_map
+
+
+def store_genre_map(genre_map):
+    cache.set(GENRE_MAP_KEY, genre_map, GENRE_MAP_TIMEOUT)
+    local_cache.invalidate(GENRE_MAP_KEY)
+
+
+def get_genre_map():
+    """
+    Cached {genre id: name} (in-process, then Redis); fetched from TMDB on
+    a miss, {} if TMDB is down. Callers must not modify it.
+    """
+    return local_cache.get_or_set(GENRE_MAP_KEY, _load_genre_map)
+
+
+def get_cached_genre_map():
+    """
+    Cached {genre id: name} without ever calling TMDB; {} if it isn't
+    cached yet (update_genre_map fills it). Callers must not modify it.
+    """
+    return local_cache.get_or_set(GENRE_MAP_KEY, lambda: cache.get(GENRE_MAP_KEY)) or {}
+
+
+def _load_genre_map():
+    genre_map = cache.get(GENRE_MAP_KEY)
+    if genre_map is None:
+        try:
+            genre_map = fetch_genre_map()
+        except RequestException:
+            return {}
+        store_genre_map(genre_map)
+    return genre_map
+
+
+def _tmdb_item_key(tmdb_id, media_type):
+    return f"tmdb_item:{media_type}:{tmdb_id}"
+
+
+def cache_tmdb_items(items):
+    """Remember search/feed results so they can be imported without TMDB."""
+    cache.set_many(
+        {_tmdb_item_key(item.id, item.media_type): item.to_tuple() for item in items},
+        TMDB_ITEM_TIMEOUT,
+    )
+
+
+def get_cached_tmdb_item(tmdb_id, media_type):
+    values = cache.get(_tmdb_item_key(tmdb_id, media_type))
+    return TMDBItem.from_tuple(values) if values is not None else None
+
+
+def get_cached_tmdb_items(keys):
+    """{(tmdb_id, media_type): TMDBItem} of cached results for the given keys (one round trip)."""
+    cache_keys = {_tmdb_item_key(tmdb_id, media_type): (tmdb_id, media_type) for tmdb_id, media_type in keys}
+    return {
+        cache_keys[key]: TMDBItem.from_tuple(values)
+        for key, values in cache.get_many(cache_keys).items()
+    }
+
+
+def import_tmdb_item(item):
+    """
+    Import a movie or series from a search/feed result without calling TMDB.
+
+    Genres come from the cached genre map (read before the transaction;
+    none if it isn't cached). The result has no full details (e.g. the
+    overview may be shortened), so callers should schedule a refresh of
+    the film, which also fills in missing genres. Returns (film, created).
+    """
+    return _import_tmdb_item(item, get_cached_genre_map())
+
+
+@transaction.atomic
+def _import_tmdb_item(item, genre_map):
+    film, created = Film.objects.get_or_create(
+        tmdb_id=item.id,
+        defaults={
+            "title": item.title or "Unknown Title",
+            "start_year": item.year,
+            "type": Film.TypeChoices.SERIES if item.media_type == "tv" else Film.TypeChoices.MOVIE,
+            "description": item.overview,
+        },
+    )
+    if not created:
+        return film, False
+
+    names = {genre_map[genre_id] for genre_id in item.genre_ids if genre_id in genre_map}
+    if names:
+        Genre.objects.bulk_create([Genre(name=name) for name in names], ignore_conflicts=True)
+        film.genres.add(*Genre.objects.filter(name__in=names))
+
+    def index():
+        try:
+            index_film(film)
+        except RedisError:
+            pass
+
+    transaction.on_commit(index)
+    return film, True
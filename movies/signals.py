@@ -0,0 +1,43 @@
+import logging
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django_redis.exceptions import ConnectionInterrupted
+from redis.exceptions import RedisError
+
+from .cache_versions import bump_versions
+from .models import Film, Review, WatchStatus
+from .tasks import enqueue, update_film_stats, update_taste_profiles
+
+logger = logging.getLogger(__name__)
+
+
+def _bump_versions_on_commit(**scopes):
+    """
+    Bumps versions after commit (a rollback must not throw caches away, and
+    a reader between bump and commit would re-cache the old data); a cache
+    outage must not fail a write that is already committed.
+    """
+    def bump():
+        try:
+            bump_versions(**scopes)
+        except (RedisError, ConnectionInterrupted):
+            # Cached entries expire on their own
+            logger.warning("Could not bump cache versions", exc_info=True)
+
+    transaction.on_commit(bump)
+
+
+@receiver([post_save, post_delete], sender=WatchStatus)
+@receiver([post_save, post_delete], sender=Review)
+def invalidate_user_film_caches(sender, instance, **kwargs):
+    """Admin/ORM writes; service-layer bulk writes bump versions themselves."""
+    _bump_versions_on_commit(users=[instance.user_id], films=[instance.film_id])
+    transaction.on_commit(lambda: enqueue(update_film_stats, [instance.film_id]))
+    transaction.on_commit(lambda: enqueue(update_taste_profiles, [instance.user_id]))
+
+
+@receiver([post_save, post_delete], sender=Film)
+def invalidate_film_caches(sender, instance, **kwargs):
+    _bump_versions_on_commit(films=[instance.pk])
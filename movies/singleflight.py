@@ -0,0 +1,180 @@
+"""
+Single-flight coalescing of identical in-flight calls.
+
+singleflight(key, fn) guarantees that for a given key only one fn() runs at a
+time, and everyone else waiting on the same key gets its result:
+
+- within a process, concurrent threads wait on the leader's threading.Event;
+- across processes, the leader holds a short-lived lock in the shared cache
+  (Redis) and publishes its result under a result key that lives for a few
+  seconds. Other processes poll the result key while the lock is held.
+
+If the leader fails, the error is raised in the threads of its own process;
+other processes see the lock disappear without a result and call fn()
+themselves.
+
+asingleflight(key, fn) is the same for asyncio callers (async views): fn is
+an async callable, callers in the same event loop await the leader's future,
+and the cache is polled with the async cache API and asyncio.sleep(), so
+waiting never blocks the event loop. Sync and async callers of the same key
+share results through the cache.
+"""
+
+import asyncio
+import hashlib
+import threading
+import time
+import uuid
+import weakref
+
+from django.core.cache import cache
+
+LOCK_TIMEOUT = 10  # seconds; upper bound for one upstream call
+RESULT_TIMEOUT = 3  # seconds; how long late arrivals can reuse a result
+POLL_INTERVAL = 0.05
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+_calls = {}
+_calls_lock = threading.Lock()
+
+# event loop -> {key: asyncio.Future}; futures belong to one loop
+_async_calls = weakref.WeakKeyDictionary()
+
+
+def _cache_keys(key):
+    digest = hashlib.md5(key.encode()).hexdigest()
+    return f"singleflight:{digest}:lock", f"singleflight:{digest}:result"
+
+
+def _call_shared(key, fn):
+    """Coalesce fn() across processes through the shared cache."""
+    lock_key, result_key = _cache_keys(key)
+
+    deadline = time.monotonic() + LOCK_TIMEOUT
+    while True:
+        cached = cache.get(result_key)
+        if cached is not None:
+            return cached[0]
+
+        token = uuid.uuid4().hex
+        if cache.add(lock_key, token, LOCK_TIMEOUT):
+            try:
+                result = fn()
+                cache.set(result_key, (result,), RESULT_TIMEOUT)
+                return result
+            finally:
+                if cache.get(lock_key) == token:
+                    cache.delete(lock_key)
+
+        # Another process is already calling upstream - wait for its result
+        while cache.get(lock_key) is not None and time.monotonic() < deadline:
+            cached = cache.get(result_key)
+            if cached is not None:
+                return cached[0]
+            time.sleep(POLL_INTERVAL)
+
+        if time.monotonic() >= deadline:
+            return fn()
+
+
+def singleflight(key, fn):
+    """Call fn() once per key for all concurrent callers and return its result."""
+    with _calls_lock:
+        call = _calls.get(key)
+        leader = call is None
+        if leader:
+            call = _calls[key] = _Call()
+
+    if not leader:
+        call.event.wait(LOCK_TIMEOUT)
+        if not call.event.is_set():
+            return fn()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    try:
+        call.result = _call_shared(key, fn)
+    except Exception as e:
+        call.error = e
+        raise
+    finally:
+        with _calls_lock:
+            del _calls[key]
+        call.event.set()
+
+    return call.result
+
+
+async def _acall_shared(key, fn):
+    """_call_shared() for async fn, without blocking the event loop."""
+    lock_key, result_key = _cache_keys(key)
+
+    deadline = time.monotonic() + LOCK_TIMEOUT
+    while True:
+        cached = await cache.aget(result_key)
+        if cached is not None:
+            return cached[0]
+
+        token = uuid.uuid4().hex
+        if await cache.aadd(lock_key, token, LOCK_TIMEOUT):
+            try:
+                result = await fn()
+                await cache.aset(result_key, (result,), RESULT_TIMEOUT)
+                return result
+            finally:
+                if await cache.aget(lock_key) == token:
+                    await cache.adelete(lock_key)
+
+        while await cache.aget(lock_key) is not None and time.monotonic() < deadline:
+            cached = await cache.aget(result_key)
+            if cached is not None:
+                return cached[0]
+            await asyncio.sleep(POLL_INTERVAL)
+
+        if time.monotonic() >= deadline:
+            return await fn()
+
+
+async def asingleflight(key, fn):
+    """Await fn() once per key for all concurrent callers and return its result."""
+    loop = asyncio.get_running_loop()
+    calls = _async_calls.setdefault(loop, {})
+    call = calls.get(key)
+
+    if call is not None:
+        try:
+            return await asyncio.wait_for(asyncio.shield(call), LOCK_TIMEOUT)
+        except TimeoutError:
+            return await fn()
+        except asyncio.CancelledError:
+            # The leader was cancelled, not us: make the call ourselves
+            if call.cancelled() and not asyncio.current_task().cancelling():
+                return await fn()
+            raise
+
+    call = calls[key] = loop.create_future()
+    try:
+        result = await _acall_shared(key, fn)
+    except asyncio.CancelledError:
+        call.cancel()
+        raise
+    except Exception as e:
+        call.set_exception(e)
+        # Retrieved here, so a leader without followers doesn't log it as lost
+        call.exception()
+        raise
+    else:
+        call.set_result(result)
+    finally:
+        del calls[key]
+    return result
@@ -1,19 +1,246 @@
-from celery import shared_task
+import logging
+import time
+from datetime import timedelta
+
+from celery import chord, shared_task
+from django.conf import settings
 from django.core.cache import cache
-from .tmdb_client import tmdb_get_trending, tmdb_get_popular
+from django.utils import timezone
+from django_redis.exceptions import ConnectionInterrupted
+from kombu.exceptions import OperationalError
+from redis.exceptions import RedisError
+from requests import RequestException
+from .tmdb_client import TMDBUnavailable, tmdb_background
+from .unique_tasks import UniqueTask
+from .tmdb_types import unpack_items
+from .title_index import rebuild_title_index
+from .models import Activity
+from .timelines import push_to_timelines
+from . import leaderboards
+from .services_tmdb import (
+    store_feed,
+    fetch_trending_feed,
+    fetch_popular_feed,
+    TRENDING_FEED_KEY,
+    TRENDING_FEED_TIMEOUT,
+    POPULAR_FEED_KEY,
+    POPULAR_FEED_TIMEOUT,
+    CHANGES_MAX_DAYS,
+    get_tmdb_changes,
+    find_changed_films,
+    refresh_films,
+    import_films_by_tmdb_id,
+    fetch_genre_map,
+    store_genre_map,
+)
 
+from .services_stats import refresh_film_stats
+from .services_taste import refresh_taste_profiles
+from .cache_versions import bump_versions
 
-@shared_task
+# Last date processed by sync_tmdb_changes
+CHANGES_CHECKPOINT_KEY = "tmdb:changes:checkpoint"
+REFRESH_BATCH_SIZE = 50
+# Summary of the last recommendations pipeline run
+RECOMMENDATIONS_REPORT_KEY = "recommendations:last_report"
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue(task, *args):
+    """
+    task.delay(*args) for best-effort background work triggered by a write
+    that has already been committed: if the broker (or the cache used by
+    UniqueTask) is down, logs and returns None instead of failing the request.
+    """
+    try:
+        return task.delay(*args)
+    except (OperationalError, RedisError, ConnectionInterrupted):
+        logger.warning("Could not enqueue %s", task.name, exc_info=True)
+        return None
+
+
+@shared_task(base=UniqueTask)
 def update_trending_cache():
     """Обновление кэша trending фильмов (раз в час)"""
-    trending = tmdb_get_trending(media_type="all", time_window="week")[:12]
-    cache.set('trending_week', trending, 60 * 60)  # 1 hour
+    with tmdb_background():
+        trending = fetch_trending_feed()
+    if not trending:
+        # TMDB недоступен - оставляем в кэше последние рабочие данные
+        return "TMDB unavailable, trending cache kept"
+    store_feed(TRENDING_FEED_KEY, trending, TRENDING_FEED_TIMEOUT)
     return f"Updated trending cache: {len(trending)} items"
 
 
-@shared_task
+@shared_task(base=UniqueTask)
 def update_popular_cache():
     """Обновление кэша popular фильмов (раз в 6 часов)"""
-    popular = tmdb_get_popular(media_type="movie")[:12]
-    cache.set('popular_movies', popular, 60 * 60 * 6)  # 6 hours
+    with tmdb_background():
+        popular = fetch_popular_feed()
+    if not popular:
+        return "TMDB unavailable, popular cache kept"
+    store_feed(POPULAR_FEED_KEY, popular, POPULAR_FEED_TIMEOUT)
     return f"Updated popular cache: {len(popular)} items"
+
+
+@shared_task(base=UniqueTask)
+def update_title_index():
+    """Перестроение индекса названий для автодополнения (раз в час)"""
+    feed_items = []
+    for key in (TRENDING_FEED_KEY, POPULAR_FEED_KEY):
+        feed_items += unpack_items(cache.get(key, ()))
+    count = rebuild_title_index(extra_items=feed_items)
+    return f"Rebuilt title index: {count} titles"
+
+
+@shared_task
+def fan_out_activity(activity_ids):
+    """Раскладка событий активности по лентам пользователей и общей ленте"""
+    activities = (
+        Activity.objects.filter(id__in=activity_ids)
+        .order_by("id")
+        .values_list("id", "user_id")
+    )
+    push_to_timelines(activities)
+    return f"Fanned out {len(activity_ids)} activities"
+
+
+@shared_task(base=UniqueTask)
+def sync_tmdb_changes():
+    """Обновление фильмов, изменившихся в TMDB с прошлой синхронизации (раз в сутки)"""
+    end_date = timezone.now().date()
+    start_date = cache.get(CHANGES_CHECKPOINT_KEY) or end_date - timedelta(days=1)
+    start_date = max(start_date, end_date - timedelta(days=CHANGES_MAX_DAYS - 1))
+
+    try:
+        with tmdb_background():
+            changes = get_tmdb_changes(start_date, end_date)
+    except RequestException:
+        # Чекпоинт не двигаем - в следующий раз заберём этот же период
+        return "TMDB unavailable, changes sync postponed"
+
+    film_ids = find_changed_films(changes)
+    for i in range(0, len(film_ids), REFRESH_BATCH_SIZE):
+        refresh_films_batch.delay(film_ids[i:i + REFRESH_BATCH_SIZE])
+
+    cache.set(CHANGES_CHECKPOINT_KEY, end_date, timeout=None)
+    changed = sum(len(ids) for ids in changes.values())
+    return f"TMDB changes since {start_date}: {changed}, ours: {len(film_ids)}"
+
+
+@shared_task(base=UniqueTask, bind=True, max_retries=3, default_retry_delay=5 * 60)
+def refresh_films_batch(self, film_ids):
+    """Повторный импорт пачки фильмов из TMDB (лимит запросов - фоновая полоса)"""
+    with tmdb_background():
+        refreshed, failed = refresh_films(film_ids)
+    if failed:
+        # Повторяем только те, что не удалось обновить
+        raise self.retry(args=(failed,))
+    return f"Refreshed {refreshed} films"
+
+
+@shared_task(bind=True, max_retries=5, default_retry_delay=60)
+def import_library_items(self, user_id, items):
+    """
+    Импорт из TMDB фильмов, которых не было в базе при массовом обновлении
+    библиотеки, и запись статусов/отзывов пользователя по ним
+    """
+    from django.contrib.auth import get_user_model
+    from .services import bulk_upsert_library
+
+    user = get_user_model().objects.filter(pk=user_id).first()
+    if user is None:
+        return "User not found"
+
+    with tmdb_background():
+        failed = import_films_by_tmdb_id({(item["tmdb_id"], item["type"]) for item in items})
+    failed_ids = {tmdb_id for tmdb_id, _ in failed}
+    result = bulk_upsert_library(
+        user=user,
+        items=[item for item in items if item["tmdb_id"] not in failed_ids],
+        import_missing=False,
+    )
+    if failed:
+        # Повторяем только те, что не удалось импортировать
+        raise self.retry(args=(user_id, [item for item in items if item["tmdb_id"] in failed_ids]))
+    return f"Imported {result['statuses']} statuses, {result['reviews']} reviews"
+
+
+@shared_task(base=UniqueTask)
+def recompute_recommendations(shard_count=None, resume=False):
+    """Ночной пересчёт рекомендаций всех пользователей (шарды параллельно, chord)"""
+    from .services_recommendations import get_pending_shards, start_pipeline_run
+
+    if resume:
+        # Только шарды прошлого запуска, которые не завершились
+        shards = get_pending_shards()
+    else:
+        shards = dict(enumerate(start_pipeline_run(shard_count or settings.RECOMMENDATION_SHARDS)))
+    if not shards:
+        return "Nothing to recompute"
+
+    chord(
+        recompute_recommendations_shard.s(shard, lo, hi)
+        for shard, (lo, hi) in shards.items()
+    )(recommendations_report.s(time.time()))
+    return f"Started {len(shards)} recommendation shards"
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=10 * 60)
+def recompute_recommendations_shard(self, shard, lo, hi):
+    """Пересчёт рекомендаций пользователей одного шарда (id в [lo, hi))"""
+    from .services_recommendations import compute_shard
+
+    try:
+        with tmdb_background():
+            return compute_shard(shard, lo, hi)
+    except TMDBUnavailable as e:
+        raise self.retry(exc=e)
+
+
+@shared_task
+def recommendations_report(results, started_at):
+    """Итог пересчёта рекомендаций: число пользователей и пропускная способность"""
+    from .services_recommendations import summarize_shards
+
+    summary = summarize_shards(results, started_at)
+    cache.set(RECOMMENDATIONS_REPORT_KEY, summary, None)
+    return (
+        f"Recomputed recommendations: {summary['users']} users in {summary['shards']} shards, "
+        f"{summary['seconds']}s ({summary['users_per_second']} users/s)"
+    )
+
+
+@shared_task(base=UniqueTask)
+def update_film_stats(film_ids):
+    """Пересчёт сводки по фильмам (число зрителей, оценок) после изменений"""
+    count = refresh_film_stats(film_ids)
+    return f"Updated stats of {count} films"
+
+
+@shared_task(base=UniqueTask)
+def update_genre_map():
+    """Обновление справочника жанров TMDB (id -> название), раз в сутки"""
+    try:
+        with tmdb_background():
+            genre_map = fetch_genre_map()
+    except RequestException:
+        return "TMDB unavailable, genre map kept"
+    store_genre_map(genre_map)
+    return f"Updated genre map: {len(genre_map)} genres"
+
+
+@shared_task(base=UniqueTask)
+def update_taste_profiles(user_ids):
+    """Пересчёт вкусового профиля пользователей (жанры, десятилетия) после изменений"""
+    count = refresh_taste_profiles(user_ids)
+    # Профиль и рекомендации закешированы по версии пользователя
+    bump_versions(users=user_ids)
+    return f"Updated taste profiles of {count} users"
+
+
+@shared_task(base=UniqueTask)
+def compact_leaderboards():
+    """Сжатие рейтингов фильмов: пересчёт к новой эпохе, удаление угасших записей (раз в час)"""
+    removed = leaderboards.compact_leaderboards()
+    return f"Compacted leaderboards: {removed} entries removed"
@@ -0,0 +1,16 @@
+from django import template
+
+from movies.cache_versions import get_version
+
+register = template.Library()
+
+
+@register.simple_tag
+def cache_version(scope, obj):
+    """
+    Current cache generation of a user/film/feed, for use in {% cache %} keys:
+
+        {% cache_version "user" request.user as user_version %}
+        {% cache 600 sidebar request.user.pk user_version %}...{% endcache %}
+    """
+    return get_version(scope, getattr(obj, "pk", obj))
@@ -0,0 +1,15 @@
+from django import template
+
+from movies.posters import poster_url as _poster_url
+
+register = template.Library()
+
+
+@register.filter
+def poster_url(poster_path, variant="card"):
+    """
+    URL of a locally proxied TMDB poster:
+
+        <img src="{{ movie.poster_path|poster_url:"card" }}">
+    """
+    return _poster_url(poster_path, variant)
@@ -0,0 +1,35 @@
+"""
+Tests of the movies app. They run against the PostgreSQL database and the
+Redis instance from settings (see README); tests that need Redis itself,
+not just the cache API, are skipped when it's unreachable.
+"""
+
+from unittest import skipUnless
+
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+
+# For tests of code that only uses the cache API (no Redis-specific calls)
+LOCMEM_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "fragments": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+}
+
+
+def _redis_available():
+    try:
+        get_redis_connection("default").ping()
+    except (RedisError, OSError):
+        return False
+    return True
+
+
+requires_redis = skipUnless(_redis_available(), "Redis is not available")
+
+
+def make_user(username="user"):
+    from django.contrib.auth import get_user_model
+
+    return get_user_model().objects.create_user(
+        username, email=f"{username}@example.com", password="password",
+    )
@@ -0,0 +1,115 @@
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+from django_redis import get_redis_connection
+from kombu.exceptions import OperationalError
+from redis.exceptions import RedisError
+
+from movies import timelines
+from movies.models import Activity, Film
+from movies.services import save_review, set_watch_status
+from movies.tasks import enqueue, fan_out_activity
+
+from . import make_user, requires_redis
+
+PREFIX = "cinema_tracker:test:timeline"
+
+
+class EnqueueTests(SimpleTestCase):
+    def test_broker_errors_are_logged_not_raised(self):
+        task = mock.Mock()
+        task.name = "movies.tasks.test"
+        for error in (OperationalError("broker down"), RedisError("cache down")):
+            task.delay.side_effect = error
+            with self.subTest(error=error), self.assertLogs("movies.tasks", "WARNING"):
+                self.assertIsNone(enqueue(task, 1))
+
+    def test_returns_the_async_result(self):
+        task = mock.Mock()
+        self.assertIs(enqueue(task, 1, 2), task.delay.return_value)
+        task.delay.assert_called_once_with(1, 2)
+
+
+@mock.patch("movies.services.enqueue")
+class RecordActivitiesTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.film = Film.objects.create(title="Film")
+
+    def test_writes_schedule_fan_out_after_commit(self, enqueue):
+        with self.captureOnCommitCallbacks() as callbacks:
+            set_watch_status(user=self.user, film=self.film, status="watched")
+            save_review(user=self.user, film=self.film, rating=8)
+            enqueue.assert_not_called()
+
+        for callback in callbacks:
+            callback()
+        activity_ids = list(Activity.objects.order_by("id").values_list("id", flat=True))
+        self.assertEqual(
+            [call.args[1] for call in enqueue.call_args_list if call.args[0] is fan_out_activity],
+            [[activity_ids[0]], [activity_ids[1]]],
+        )
+        self.assertEqual(
+            list(Activity.objects.order_by("id").values_list("verb", "status", "rating")),
+            [("status", "watched", None), ("review", "", 8)],
+        )
+
+
+@requires_redis
+class TimelineTests(TestCase):
+    def setUp(self):
+        patchers = [
+            mock.patch.object(timelines, "USER_TIMELINE_KEY", PREFIX + ":user:{user_id}"),
+            mock.patch.object(timelines, "GLOBAL_TIMELINE_KEY", PREFIX + ":global"),
+            mock.patch.object(timelines, "USER_TIMELINE_LENGTH", 3),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(self._delete_keys)
+
+        self.alice = make_user("alice")
+        self.bob = make_user("bob")
+        film = Film.objects.create(title="Film")
+        self.activities = [
+            Activity.objects.create(user=user, film=film, verb="status", status="planned")
+            for user in (self.alice, self.bob, self.alice, self.alice, self.alice)
+        ]
+
+    def _delete_keys(self):
+        conn = get_redis_connection("default")
+        keys = list(conn.scan_iter(match=PREFIX + ":*"))
+        if keys:
+            conn.delete(*keys)
+
+    def test_fan_out_builds_capped_timelines_newest_first(self):
+        fan_out_activity([activity.id for activity in self.activities])
+
+        alice = [a for a in self.activities if a.user_id == self.alice.pk]
+        self.assertEqual(timelines.get_user_activity(user=self.alice), alice[::-1][:3])
+        self.assertEqual(
+            timelines.get_user_activity(user=self.alice, page=2, per_page=2), alice[::-1][2:3],
+        )
+        self.assertEqual(timelines.get_user_activity(user=self.bob), [self.activities[1]])
+        self.assertEqual(timelines.get_recent_activity(per_page=2), self.activities[::-1][:2])
+
+    def test_deleted_activities_are_skipped(self):
+        fan_out_activity([activity.id for activity in self.activities])
+        self.activities[-1].delete()
+        self.assertEqual(timelines.get_recent_activity(per_page=1), [])
+        self.assertEqual(timelines.get_recent_activity(per_page=2), [self.activities[3]])
+
+    def test_missing_timeline_falls_back_to_database(self):
+        self.assertEqual(timelines.get_user_activity(user=self.bob), [self.activities[1]])
+        self.assertEqual(len(timelines.get_recent_activity()), 5)
+
+
+class TimelineFallbackTests(TestCase):
+    @mock.patch("movies.timelines.get_redis_connection", side_effect=RedisError)
+    def test_redis_errors_fall_back_to_database(self, get_connection):
+        user = make_user()
+        activity = Activity.objects.create(
+            user=user, film=Film.objects.create(title="Film"), verb="review", rating=5,
+        )
+        self.assertEqual(timelines.get_user_activity(user=user), [activity])
+        self.assertEqual(timelines.get_recent_activity(), [activity])
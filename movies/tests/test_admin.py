@@ -0,0 +1,116 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from movies.admin import EXACT_COUNT_THRESHOLD, EstimatedCountPaginator
+from movies.models import Activity, Film, Review, WatchStatus
+from movies.services import update_watch_statuses
+from movies.tasks import update_film_stats
+
+from . import LOCMEM_CACHES, make_user
+
+
+class EstimatedCountPaginatorTests(TestCase):
+    def setUp(self):
+        Film.objects.bulk_create([Film(title=f"Film {i}") for i in range(3)])
+
+    @mock.patch("movies.admin._estimate_rows", return_value=EXACT_COUNT_THRESHOLD * 5)
+    def test_unfiltered_lists_use_the_estimate(self, estimate_rows):
+        self.assertEqual(EstimatedCountPaginator(Film.objects.all(), 10).count, EXACT_COUNT_THRESHOLD * 5)
+        estimate_rows.assert_called_once_with("default", Film._meta.db_table)
+
+    @mock.patch("movies.admin._estimate_rows", return_value=EXACT_COUNT_THRESHOLD * 5)
+    def test_filtered_lists_are_counted(self, estimate_rows):
+        self.assertEqual(EstimatedCountPaginator(Film.objects.filter(title="Film 1"), 10).count, 1)
+        estimate_rows.assert_not_called()
+
+    @mock.patch("movies.admin._estimate_rows")
+    def test_small_or_unknown_estimates_are_counted(self, estimate_rows):
+        for estimate in (None, EXACT_COUNT_THRESHOLD - 1):
+            estimate_rows.return_value = estimate
+            with self.subTest(estimate=estimate):
+                self.assertEqual(EstimatedCountPaginator(Film.objects.all(), 10).count, 3)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+@mock.patch("movies.services.enqueue")
+@mock.patch("movies.services.bump_versions")
+class UpdateWatchStatusesTests(TestCase):
+    def setUp(self):
+        self.alice, self.bob = make_user("alice"), make_user("bob")
+        self.film, self.other = Film.objects.create(title="Film"), Film.objects.create(title="Other")
+        WatchStatus.objects.create(user=self.alice, film=self.film, status="planned")
+        WatchStatus.objects.create(user=self.bob, film=self.film, status="planned")
+        WatchStatus.objects.create(user=self.bob, film=self.other, status="watching")
+
+    def test_updates_and_invalidates_the_matched_rows(self, bump_versions, enqueue):
+        with self.captureOnCommitCallbacks(execute=True):
+            count = update_watch_statuses(
+                queryset=WatchStatus.objects.filter(status="planned"), status="watched",
+            )
+
+        self.assertEqual(count, 2)
+        self.assertEqual(
+            sorted(WatchStatus.objects.values_list("user__username", "film__title", "status")),
+            [("alice", "Film", "watched"), ("bob", "Film", "watched"), ("bob", "Other", "watching")],
+        )
+        self.assertEqual(sorted(bump_versions.call_args.kwargs["users"]), sorted([self.alice.pk, self.bob.pk]))
+        self.assertEqual(bump_versions.call_args.kwargs["films"], [self.film.pk])
+        enqueue.assert_any_call(update_film_stats, [self.film.pk])
+        self.assertFalse(Activity.objects.exists())
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class AdminTests(TestCase):
+    def setUp(self):
+        self.admin = get_user_model().objects.create_superuser("admin", "admin@example.com", "password")
+        self.client.force_login(self.admin)
+        self.user = make_user()
+        self.film = Film.objects.create(title="Matrix", tmdb_id=603)
+        Film.objects.create(title="The Matrix Reloaded", tmdb_id=604)
+        self.status = WatchStatus.objects.create(user=self.user, film=self.film, status="planned")
+        Review.objects.create(user=self.user, film=self.film, rating=9)
+        Activity.objects.create(user=self.user, film=self.film, verb=Activity.Verb.REVIEW, rating=9)
+
+    def changelist(self, model, **params):
+        return self.client.get(reverse(f"admin:movies_{model}_changelist"), params)
+
+    def test_changelists_load(self):
+        for model in ("film", "watchstatus", "review", "activity"):
+            with self.subTest(model=model):
+                self.assertContains(self.changelist(model), "Matrix")
+        self.assertEqual(self.changelist("review", rating="9").context["cl"].result_count, 1)
+
+    def test_film_search_by_title_prefix_or_tmdb_id(self):
+        for term, expected in (("matr", ["Matrix"]), ("604", ["The Matrix Reloaded"]), ("", None)):
+            with self.subTest(term=term):
+                titles = [film.title for film in self.changelist("film", q=term).context["cl"].result_list]
+                if expected is None:
+                    self.assertEqual(len(titles), 2)
+                else:
+                    self.assertEqual(titles, expected)
+
+    @mock.patch("movies.services.enqueue")
+    @mock.patch("movies.services.bump_versions")
+    def test_status_action(self, bump_versions, enqueue):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse("admin:movies_watchstatus_changelist"), {
+                "action": "mark_watched", "_selected_action": [self.status.pk],
+            }, follow=True)
+
+        self.assertContains(response, "Updated 1 watch statuses.")
+        self.status.refresh_from_db()
+        self.assertEqual(self.status.status, "watched")
+
+    @mock.patch("movies.admin.refresh_films_batch")
+    def test_resync_action_queues_films(self, refresh_films_batch):
+        untracked = Film.objects.create(title="Local")
+        response = self.client.post(reverse("admin:movies_film_changelist"), {
+            "action": "resync_from_tmdb",
+            "_selected_action": [self.film.pk, untracked.pk],
+        }, follow=True)
+
+        self.assertContains(response, "Queued 1 films for re-sync from TMDB.")
+        refresh_films_batch.delay.assert_called_once_with([self.film.pk])
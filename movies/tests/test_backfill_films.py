@@ -0,0 +1,81 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import TransactionTestCase, override_settings
+from requests import HTTPError, Response
+
+from movies.management.commands.backfill_films import CHECKPOINT_KEY
+from movies.models import Film
+from movies.tmdb_client import TMDBRateLimited, TMDBUnavailable
+
+from . import LOCMEM_CACHES
+
+
+def _http_error(status_code):
+    response = Response()
+    response.status_code = status_code
+    return HTTPError(response=response)
+
+
+# Worker threads use their own database connections, so the data has to be committed
+@override_settings(CACHES=LOCMEM_CACHES)
+@mock.patch("movies.management.commands.backfill_films.fetch_movie_details")
+class BackfillFilmsTests(TransactionTestCase):
+    def setUp(self):
+        # Version counters live in Redis, not in the cache API
+        for target in ("movies.signals.bump_versions", "movies.services_tmdb.bump_versions"):
+            patcher = mock.patch(target)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.films = [Film.objects.create(title=f"Film {i}", tmdb_id=i) for i in range(1, 4)]
+        self.addCleanup(cache.clear)
+
+    def backfill(self, *args):
+        out = StringIO()
+        call_command("backfill_films", "--batch-size=1", "--workers=1", *args, stdout=out)
+        return out.getvalue()
+
+    def details(self, tmdb_id, media_type):
+        return {"id": tmdb_id, "release_date": "1999-05-01", "overview": f"About {tmdb_id}"}
+
+    def test_fills_missing_details_and_skips_films_gone_from_tmdb(self, fetch):
+        def fake_fetch(tmdb_id, media_type):
+            if tmdb_id == 2:
+                raise _http_error(404)
+            return self.details(tmdb_id, media_type)
+
+        fetch.side_effect = fake_fetch
+        output = self.backfill()
+
+        self.assertIn("Done: 3 films checked, 2 updated, 1 not found at TMDB", output)
+        self.assertEqual(
+            list(Film.objects.order_by("id").values_list("start_year", flat=True)), [1999, None, 1999],
+        )
+        self.assertIsNone(cache.get(CHECKPOINT_KEY))
+
+    def test_stops_without_passing_films_when_tmdb_fails(self, fetch):
+        for error in (TMDBUnavailable("circuit open"), TMDBRateLimited("budget"), _http_error(503)):
+            cache.delete(CHECKPOINT_KEY)
+            Film.objects.update(start_year=None, description="")
+
+            def fake_fetch(tmdb_id, media_type):
+                if tmdb_id == 2:
+                    raise error
+                return self.details(tmdb_id, media_type)
+
+            fetch.side_effect = fake_fetch
+            with self.subTest(error=error), self.assertRaisesMessage(CommandError, "stopped after 1 films"):
+                self.backfill()
+            self.assertEqual(cache.get(CHECKPOINT_KEY), self.films[0].id)
+            self.assertIsNone(Film.objects.get(pk=self.films[2].pk).start_year)
+
+    def test_next_run_resumes_after_the_checkpoint(self, fetch):
+        cache.set(CHECKPOINT_KEY, self.films[0].id)
+        fetch.side_effect = self.details
+
+        output = self.backfill()
+
+        self.assertIn(f"Resuming after film id {self.films[0].id}", output)
+        self.assertEqual([call.args[0] for call in fetch.call_args_list], [2, 3])
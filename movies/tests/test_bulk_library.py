@@ -0,0 +1,201 @@
+import json
+from unittest import mock
+
+from celery.exceptions import Retry
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from requests import HTTPError, RequestException, Response
+
+from movies import services_tmdb
+from movies.models import Activity, Film, Review, WatchStatus
+from movies.services import _parse_bulk_item, bulk_upsert_library
+from movies.tasks import import_library_items
+
+from . import make_user
+
+
+def _http_error(status_code):
+    response = Response()
+    response.status_code = status_code
+    return HTTPError(response=response)
+
+
+class ParseBulkItemTests(SimpleTestCase):
+    def test_film_id_takes_precedence(self):
+        self.assertEqual(
+            _parse_bulk_item({"film_id": "3", "tmdb_id": 7, "status": "watched"}),
+            (("film_id", 3), "watched", None, None),
+        )
+
+    def test_tmdb_id_with_review(self):
+        self.assertEqual(
+            _parse_bulk_item({"tmdb_id": 7, "rating": "8", "text": "  Good  "}),
+            (("tmdb_id", 7), None, 8, "Good"),
+        )
+
+    def test_empty_status_and_rating_are_missing(self):
+        with self.assertRaisesMessage(ValueError, "status or rating"):
+            _parse_bulk_item({"tmdb_id": 7, "status": "", "rating": ""})
+
+    def test_invalid_items(self):
+        for item in (
+            [7],
+            {"status": "watched"},
+            {"tmdb_id": 7, "status": "finished"},
+            {"tmdb_id": 7, "rating": 11},
+            {"tmdb_id": 7, "rating": "good"},
+            {"tmdb_id": 7, "status": "watched", "text": "No rating"},
+        ):
+            with self.subTest(item=item), self.assertRaises(ValueError):
+                _parse_bulk_item(item)
+
+
+@mock.patch("movies.services.enqueue")
+class BulkUpsertLibraryTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.film = Film.objects.create(title="Film", tmdb_id=100)
+        self.other = Film.objects.create(title="Other")
+
+    def test_writes_statuses_and_reviews(self, enqueue):
+        WatchStatus.objects.create(user=self.user, film=self.film, status="planned")
+        Review.objects.create(user=self.user, film=self.film, rating=3, text="Kept")
+
+        result = bulk_upsert_library(user=self.user, items=[
+            {"tmdb_id": 100, "status": "watched", "rating": 9},
+            {"film_id": self.other.id, "rating": 7, "text": "Nice"},
+        ])
+
+        self.assertEqual(result, {
+            "statuses": 1, "reviews": 2, "importing": 0, "missing": [], "errors": [],
+        })
+        self.assertEqual(WatchStatus.objects.get(user=self.user, film=self.film).status, "watched")
+        review = Review.objects.get(user=self.user, film=self.film)
+        # Rating-only items keep the existing text
+        self.assertEqual((review.rating, review.text), (9, "Kept"))
+        self.assertEqual(Review.objects.get(user=self.user, film=self.other).text, "Nice")
+        self.assertEqual(Activity.objects.filter(user=self.user).count(), 3)
+
+    def test_last_item_for_a_film_wins(self, enqueue):
+        bulk_upsert_library(user=self.user, items=[
+            {"film_id": self.film.id, "status": "planned"},
+            {"tmdb_id": 100, "status": "dropped"},
+        ])
+        self.assertEqual(WatchStatus.objects.get(user=self.user, film=self.film).status, "dropped")
+
+    def test_reports_errors_and_unknown_film_ids(self, enqueue):
+        result = bulk_upsert_library(user=self.user, items=[
+            {"film_id": 999999, "status": "watched"},
+            {"film_id": self.film.id, "rating": 0},
+        ])
+        self.assertEqual(result["missing"], [{"film_id": 999999}])
+        self.assertEqual([e["index"] for e in result["errors"]], [1])
+        self.assertFalse(WatchStatus.objects.exists())
+
+    def test_unknown_tmdb_ids_are_queued_for_import(self, enqueue):
+        with self.captureOnCommitCallbacks(execute=True):
+            result = bulk_upsert_library(user=self.user, items=[
+                {"tmdb_id": 200, "type": "series", "status": "watching"},
+                {"tmdb_id": 201, "rating": "8"},
+            ])
+
+        self.assertEqual((result["importing"], result["missing"]), (2, []))
+        enqueue.assert_any_call(import_library_items, self.user.pk, [
+            {"tmdb_id": 200, "type": "tv", "status": "watching"},
+            {"tmdb_id": 201, "type": "movie", "rating": "8"},
+        ])
+
+    def test_without_import_unknown_tmdb_ids_are_missing(self, enqueue):
+        with self.captureOnCommitCallbacks(execute=True):
+            result = bulk_upsert_library(
+                user=self.user, items=[{"tmdb_id": 200, "status": "watched"}], import_missing=False,
+            )
+        self.assertEqual(result["missing"], [{"tmdb_id": 200}])
+        self.assertNotIn(import_library_items, [c.args[0] for c in enqueue.call_args_list])
+
+
+class ImportLibraryItemsTaskTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+
+    def _import(self, refs):
+        # 301 fails at TMDB, everything else is imported
+        Film.objects.create(title="Film", tmdb_id=300)
+        return [(301, "movie")]
+
+    @mock.patch("movies.services.enqueue")
+    @mock.patch("movies.tasks.import_films_by_tmdb_id")
+    def test_writes_items_of_imported_films_and_retries_failures(self, import_films, enqueue):
+        import_films.side_effect = self._import
+        items = [
+            {"tmdb_id": 300, "type": "movie", "status": "watched"},
+            {"tmdb_id": 301, "type": "movie", "rating": 7},
+        ]
+        with self.assertRaises(Retry):
+            import_library_items(self.user.pk, items)
+
+        self.assertEqual(
+            list(WatchStatus.objects.values_list("film__tmdb_id", "status")), [(300, "watched")],
+        )
+        self.assertFalse(Review.objects.exists())
+
+    @mock.patch("movies.tasks.import_films_by_tmdb_id")
+    def test_unknown_user_is_skipped(self, import_films):
+        self.assertEqual(import_library_items(0, [{"tmdb_id": 1, "type": "movie", "status": "watched"}]), "User not found")
+        import_films.assert_not_called()
+
+
+class ImportFilmsByTMDBIdTests(TestCase):
+    @mock.patch("movies.services_tmdb.fetch_movie_details")
+    def test_imports_missing_films_and_reports_transient_failures(self, fetch):
+        Film.objects.create(title="Known", tmdb_id=1)
+        details = {2: {"id": 2, "title": "Film", "release_date": "2001-01-01", "genres": []}}
+
+        def fake_fetch(tmdb_id, media_type):
+            if tmdb_id == 3:
+                raise _http_error(404)
+            if tmdb_id == 4:
+                raise RequestException("timeout")
+            return details[tmdb_id]
+
+        fetch.side_effect = fake_fetch
+        failed = services_tmdb.import_films_by_tmdb_id(
+            [(1, "movie"), (2, "movie"), (3, "movie"), (4, "tv")],
+        )
+
+        self.assertEqual(failed, [(4, "tv")])
+        self.assertEqual(Film.objects.get(tmdb_id=2).start_year, 2001)
+        self.assertFalse(Film.objects.filter(tmdb_id__in=[3, 4]).exists())
+        self.assertNotIn(1, [call.args[0] for call in fetch.call_args_list])
+
+
+class BulkUpdateLibraryViewTests(TestCase):
+    url = reverse("bulk_update_library")
+
+    def setUp(self):
+        self.user = make_user()
+        self.client.force_login(self.user)
+
+    def post(self, body):
+        return self.client.post(self.url, body, content_type="application/json")
+
+    def test_requires_login(self):
+        self.client.logout()
+        self.assertEqual(self.post({"items": []}).status_code, 302)
+
+    def test_rejects_malformed_bodies(self):
+        for body in ("not json", {"other": []}, {"items": {"tmdb_id": 1}}):
+            with self.subTest(body=body):
+                self.assertEqual(self.post(body).status_code, 400)
+
+    @mock.patch("movies.views.MAX_BULK_ITEMS", 1)
+    def test_rejects_too_many_items(self):
+        self.assertEqual(self.post({"items": [{}, {}]}).status_code, 400)
+
+    @mock.patch("movies.services.enqueue")
+    def test_returns_the_service_result(self, enqueue):
+        film = Film.objects.create(title="Film")
+        response = self.post({"items": [{"film_id": film.id, "status": "watched"}, {}]})
+        self.assertEqual(response.status_code, 200)
+        result = json.loads(response.content)
+        self.assertEqual((result["statuses"], len(result["errors"])), (1, 1))
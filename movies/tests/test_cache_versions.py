@@ -0,0 +1,95 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from redis.exceptions import RedisError
+
+from movies import cache_versions
+from movies.cache_versions import FILM, USER, bump_versions, get_version, get_versions
+from movies.models import Film, Review
+
+from . import LOCMEM_CACHES, make_user, requires_redis
+
+# Far above real primary keys, so the counters don't touch real entries
+PKS = [10**12 + 1, 10**12 + 2]
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class GetVersionsTests(SimpleTestCase):
+    def tearDown(self):
+        cache.clear()
+
+    @mock.patch("movies.cache_versions._initial_version", return_value=1000)
+    def test_missing_counters_are_initialised_once(self, initial):
+        self.assertEqual(get_versions(USER, PKS), {PKS[0]: 1000, PKS[1]: 1000})
+        initial.return_value = 2000
+        self.assertEqual(get_version(USER, PKS[0]), 1000)
+        # Scopes don't share counters
+        self.assertEqual(get_version(FILM, PKS[0]), 2000)
+
+
+@requires_redis
+class BumpVersionsTests(SimpleTestCase):
+    def tearDown(self):
+        cache.delete_many([
+            cache_versions._version_key(scope, pk) for scope in (USER, FILM) for pk in PKS
+        ])
+
+    def test_bump_increments_counters(self):
+        before = get_versions(USER, PKS)
+        bump_versions(users=[PKS[0], PKS[0]], films=[PKS[1]])
+        self.assertEqual(get_versions(USER, PKS), {PKS[0]: before[PKS[0]] + 1, PKS[1]: before[PKS[1]]})
+
+    def test_bump_of_missing_counter_moves_past_initial_version(self):
+        with mock.patch("movies.cache_versions._initial_version", return_value=5000):
+            bump_versions(films=[PKS[0]])
+        self.assertEqual(get_version(FILM, PKS[0]), 5001)
+
+    def test_versioned_cache_is_invalidated_by_bump(self):
+        load = mock.Mock(side_effect=["first", "second"])
+
+        @cache_versions.versioned_cache("test-versioned")
+        def cached(*, user, limit):
+            return load(user, limit)
+
+        self.assertEqual(cached(user=PKS[0], limit=5), "first")
+        self.assertEqual(cached(user=PKS[0], limit=5), "first")
+        bump_versions(users=[PKS[0]])
+        self.assertEqual(cached(user=PKS[0], limit=5), "second")
+        self.assertEqual(cached.uncached(user=PKS[0], limit=5), "second")
+        load.assert_called_with(PKS[0], 5)
+
+
+@mock.patch("movies.signals.enqueue")
+@mock.patch("movies.signals.bump_versions")
+class InvalidationSignalTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+
+    def test_versions_are_bumped_after_commit(self, bump, enqueue):
+        with self.captureOnCommitCallbacks(execute=True):
+            film = Film.objects.create(title="Film")
+            review = Review.objects.create(user=self.user, film=film, rating=7)
+            bump.assert_not_called()
+
+        bump.assert_any_call(films=[film.pk])
+        bump.assert_any_call(users=[self.user.pk], films=[film.pk])
+        self.assertEqual(enqueue.call_count, 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            review.delete()
+        bump.assert_called_with(users=[self.user.pk], films=[film.pk])
+
+    def test_nothing_is_bumped_until_commit(self, bump, enqueue):
+        with self.captureOnCommitCallbacks() as callbacks:
+            Film.objects.create(title="Film")
+        self.assertEqual(len(callbacks), 1)
+        bump.assert_not_called()
+
+    def test_cache_errors_do_not_fail_the_write(self, bump, enqueue):
+        bump.side_effect = RedisError("down")
+        with self.assertLogs("movies.signals", "WARNING"):
+            with self.captureOnCommitCallbacks(execute=True):
+                film = Film.objects.create(title="Film")
+                Review.objects.create(user=self.user, film=film, rating=7)
+        self.assertEqual(enqueue.call_count, 2)
@@ -0,0 +1,137 @@
+from unittest import mock
+
+import requests
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from movies import services_tmdb, tmdb_client
+from movies.circuit_breaker import CircuitBreaker
+from movies.rate_limit import RateLimited
+from movies.tmdb_types import TMDBItem, pack_items
+
+from . import LOCMEM_CACHES
+
+
+def _response(status_code, data=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = b"{}" if data is None else data
+    return response
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.breaker = CircuitBreaker("test", failure_threshold=3, cooldown=30)
+
+    def end_cooldown(self):
+        cache.delete(self.breaker._open_key)
+
+    def test_opens_after_threshold_failures(self):
+        for _ in range(2):
+            self.breaker.record_failure()
+        self.assertTrue(self.breaker.allow_request())
+        self.breaker.record_failure()
+        self.assertTrue(self.breaker.is_open())
+        self.assertFalse(self.breaker.allow_request())
+
+    def test_success_resets_the_failure_count(self):
+        for _ in range(2):
+            self.breaker.record_failure()
+        self.breaker.record_success()
+        self.breaker.record_failure()
+        self.assertFalse(self.breaker.is_open())
+
+    def test_half_open_lets_one_probe_through(self):
+        for _ in range(3):
+            self.breaker.record_failure()
+        self.end_cooldown()
+        self.assertTrue(self.breaker.allow_request())
+        self.assertFalse(self.breaker.allow_request())
+
+        self.breaker.record_success()
+        self.assertTrue(self.breaker.allow_request())
+        self.assertTrue(self.breaker.allow_request())
+
+    def test_failed_probe_reopens_the_circuit(self):
+        for _ in range(3):
+            self.breaker.record_failure()
+        self.end_cooldown()
+        self.assertTrue(self.breaker.allow_request())
+        self.breaker.record_failure()
+        self.assertTrue(self.breaker.is_open())
+
+        # After the next cooldown there is a new probe
+        self.end_cooldown()
+        self.assertTrue(self.breaker.allow_request())
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+@mock.patch("movies.tmdb_client.acquire")
+class TMDBClientCircuitTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        breaker = CircuitBreaker("tmdb-test", failure_threshold=2, cooldown=30)
+        patcher = mock.patch("movies.tmdb_client.tmdb_breaker", breaker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = breaker
+
+    @mock.patch("movies.tmdb_client.requests.get")
+    def test_throttling_and_server_errors_count_as_failures(self, get, acquire):
+        get.side_effect = [_response(429), _response(503)]
+        for _ in range(2):
+            with self.assertRaises(requests.HTTPError):
+                tmdb_client._tmdb_get("/movie/1")
+        self.assertTrue(self.breaker.is_open())
+
+    @mock.patch("movies.tmdb_client.requests.get")
+    def test_not_found_is_not_a_failure(self, get, acquire):
+        get.return_value = _response(404)
+        for _ in range(3):
+            with self.assertRaises(requests.HTTPError):
+                tmdb_client._tmdb_get("/movie/1")
+        self.assertFalse(self.breaker.is_open())
+
+    @mock.patch("movies.tmdb_client.requests.get")
+    def test_open_circuit_short_circuits(self, get, acquire):
+        cache.set(self.breaker._open_key, True, 30)
+        with self.assertRaises(tmdb_client.TMDBUnavailable):
+            tmdb_client._tmdb_get("/movie/1")
+        get.assert_not_called()
+        acquire.assert_not_called()
+
+    @mock.patch("movies.tmdb_client.requests.get")
+    def test_rate_limited_caller_does_not_take_the_probe(self, get, acquire):
+        for _ in range(2):
+            self.breaker.record_failure()
+        cache.delete(self.breaker._open_key)
+
+        acquire.side_effect = RateLimited("empty")
+        with self.assertRaises(tmdb_client.TMDBRateLimited):
+            tmdb_client._tmdb_get("/movie/1")
+
+        acquire.side_effect = None
+        get.return_value = _response(200, b'{"id": 1}')
+        self.assertEqual(tmdb_client._tmdb_get("/movie/1"), {"id": 1})
+        self.assertTrue(self.breaker.allow_request())
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class DegradedFeedTests(SimpleTestCase):
+    key = "feed:test"
+
+    def setUp(self):
+        cache.clear()
+
+    @mock.patch("movies.services_tmdb.tmdb_is_available", return_value=False)
+    def test_serves_last_known_good_while_tmdb_is_down(self, is_available):
+        items = [TMDBItem(1, "movie", "Film")]
+        cache.set(f"{self.key}:last_good", pack_items(items))
+        fetch = mock.Mock()
+
+        self.assertEqual(services_tmdb._load_feed(self.key, fetch, 60), items)
+        fetch.assert_not_called()
+        # The fallback is cached briefly, so TMDB isn't retried on every request
+        self.assertEqual(cache.get(self.key), pack_items(items))
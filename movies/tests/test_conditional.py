@@ -0,0 +1,69 @@
+from django.test import TestCase
+from django.urls import reverse
+
+from movies.models import Activity, Film, TasteProfile, WatchStatus
+
+from . import make_user
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.client.force_login(self.user)
+        self.film = Film.objects.create(title="Film")
+        WatchStatus.objects.create(user=self.user, film=self.film, status="watched")
+
+    def assertNotModified(self, url, etag):
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def etag(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response["ETag"]
+
+    def test_watchlist_changes_with_film_metadata(self):
+        url = reverse("watchlist", args=["watched"])
+        etag = self.etag(url)
+        self.assertNotModified(url, etag)
+
+        self.film.title = "Renamed"
+        self.film.save()
+        self.assertNotEqual(self.etag(url), etag)
+
+    def test_watchlist_ignores_other_statuses(self):
+        url = reverse("watchlist", args=["watched"])
+        etag = self.etag(url)
+        WatchStatus.objects.create(
+            user=self.user, film=Film.objects.create(title="Other"), status="planned",
+        )
+        self.assertNotModified(url, etag)
+
+    def test_profile_changes_with_activity_and_taste(self):
+        url = reverse("profile")
+        etag = self.etag(url)
+        self.assertNotModified(url, etag)
+
+        Activity.objects.create(user=self.user, film=self.film, verb="status", status="watched")
+        changed = self.etag(url)
+        self.assertNotEqual(changed, etag)
+
+        TasteProfile.objects.create(user=self.user, movies_count=1)
+        self.assertNotEqual(self.etag(url), changed)
+
+    def test_profile_of_another_user(self):
+        other = make_user("other")
+        url = reverse("profile_user", args=["other"])
+        etag = self.etag(url)
+        self.assertNotEqual(etag, self.etag(reverse("profile")))
+
+        Activity.objects.create(user=other, film=self.film, verb="review", rating=5)
+        self.assertNotEqual(self.etag(url), etag)
+
+    def test_pending_messages_disable_304(self):
+        url = reverse("profile")
+        etag = self.etag(url)
+        # An invalid status redirects to the profile with an error message
+        self.client.get(reverse("watchlist", args=["finished"]))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Invalid status")
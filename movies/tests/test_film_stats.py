@@ -0,0 +1,72 @@
+from importlib import import_module
+from unittest import mock
+
+from django.apps import apps
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from movies.models import Film, FilmStats, Genre, Review, WatchStatus
+from movies.services_stats import get_film_stats, refresh_film_stats
+
+from . import LOCMEM_CACHES, make_user
+
+backfill_migration = import_module("movies.migrations.0012_backfill_filmstats")
+
+
+class FilmStatsTests(TestCase):
+    def setUp(self):
+        self.alice, self.bob = make_user("alice"), make_user("bob")
+        self.film = Film.objects.create(title="Film")
+        self.unwatched = Film.objects.create(title="Unwatched")
+        WatchStatus.objects.create(user=self.alice, film=self.film, status="watched")
+        WatchStatus.objects.create(user=self.bob, film=self.film, status="planned")
+        Review.objects.create(user=self.alice, film=self.film, rating=9)
+        Review.objects.create(user=self.bob, film=self.film, rating=6)
+
+    def assertStats(self):
+        stats = FilmStats.objects.get(film=self.film)
+        self.assertEqual((stats.watchers_count, stats.reviews_count, stats.rating_sum), (2, 2, 15))
+        self.assertEqual(stats.avg_rating, 7.5)
+        self.assertIsNone(FilmStats.objects.get(film=self.unwatched).avg_rating)
+
+    def test_refresh(self):
+        FilmStats.objects.create(film=self.film, reviews_count=7, rating_sum=70)
+        self.assertEqual(refresh_film_stats(batch_size=1), 2)
+        self.assertStats()
+
+    def test_backfill_migration(self):
+        backfill_migration.backfill_film_stats(apps, None)
+        self.assertStats()
+
+    @mock.patch("movies.tasks.enqueue")
+    def test_missing_stats_are_scheduled_not_written(self, enqueue):
+        stats = get_film_stats(film=self.film)
+
+        self.assertEqual((stats.pk, stats.reviews_count, stats.avg_rating), (self.film.pk, 0, None))
+        self.assertFalse(FilmStats.objects.exists())
+        self.assertEqual(enqueue.call_args.args[1], [self.film.pk])
+
+        refresh_film_stats([self.film.pk])
+        self.assertEqual(get_film_stats(film=self.film).reviews_count, 2)
+        enqueue.assert_called_once()
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+@mock.patch("movies.tasks.enqueue")
+class FilmDetailRecommendationsTests(TestCase):
+    def test_similar_films_are_ordered_by_average_rating(self, enqueue):
+        drama = Genre.objects.create(name="Drama")
+        film, good, best, unrated, no_stats = [
+            Film.objects.create(title=title) for title in ("Film", "Good", "Best", "Unrated", "No stats")
+        ]
+        for f in (film, good, best, unrated, no_stats):
+            f.genres.add(drama)
+        FilmStats.objects.create(film=good, reviews_count=2, rating_sum=13)
+        FilmStats.objects.create(film=best, reviews_count=1, rating_sum=9)
+        FilmStats.objects.create(film=unrated, watchers_count=3)
+
+        response = self.client.get(reverse("film_detail", args=[film.id]))
+
+        recommendations = list(response.context["recommendations"])
+        self.assertEqual(recommendations, [best, good, no_stats, unrated])
+        self.assertEqual([rec.avg_rating for rec in recommendations[:2]], [9.0, 6.5])
@@ -0,0 +1,79 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from movies.models import Film, Genre, WatchStatus
+from movies.tmdb_types import TMDBItem
+
+from . import LOCMEM_CACHES, make_user
+
+
+def _item(title):
+    return TMDBItem.from_tmdb({"id": 100, "title": title, "vote_average": 7.5}, media_type="movie")
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class FeedCardFragmentTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.client.force_login(self.user)
+        self.feed = mock.Mock(return_value=[_item("First title")])
+        self.version = {"feed": 1}
+        for patcher in (
+            mock.patch.dict("users.views.DASHBOARD_RAILS", {"trending": (self.feed, "feed")}),
+            mock.patch("users.views.get_feed_versions", side_effect=lambda key: {key: self.version[key]}),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def rail(self):
+        return self.client.get(reverse("dashboard_rail", args=["trending"]))
+
+    def test_cards_are_cached_per_feed_version(self):
+        self.assertContains(self.rail(), "First title")
+
+        self.feed.return_value = [_item("Second title")]
+        self.assertContains(self.rail(), "First title")
+
+        self.version["feed"] = 2
+        self.assertContains(self.rail(), "Second title")
+
+    def test_status_badge_is_not_cached(self):
+        self.assertNotContains(self.rail(), "In Watching")
+
+        film = Film.objects.create(title="Film", tmdb_id=100)
+        WatchStatus.objects.create(user=self.user, film=film, status="watching")
+        self.assertContains(self.rail(), "In Watching")
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+@mock.patch("movies.tasks.enqueue")
+class FilmDetailFragmentTests(TestCase):
+    def setUp(self):
+        self.film = Film.objects.create(title="Film", description="First description")
+        self.film.genres.add(Genre.objects.create(name="Drama"))
+        self.url = reverse("film_detail", args=[self.film.id])
+
+    def test_sections_are_cached_until_the_film_changes(self, enqueue):
+        self.assertContains(self.client.get(self.url), "Drama")
+
+        self.film.genres.add(Genre.objects.create(name="Comedy"))
+        Film.objects.filter(pk=self.film.pk).update(description="Second description")
+        response = self.client.get(self.url)
+        self.assertNotContains(response, "Comedy")
+        self.assertContains(response, "First description")
+
+        Film.objects.filter(pk=self.film.pk).update(updated_at=self.film.updated_at + timedelta(seconds=1))
+        response = self.client.get(self.url)
+        self.assertContains(response, "Comedy")
+        self.assertContains(response, "Second description")
+
+    def test_cached_sections_do_not_query_genres(self, enqueue):
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url)
+        self.assertFalse([q for q in queries if q["sql"].startswith('SELECT "movies_genre"')])
@@ -0,0 +1,107 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from requests import ConnectionError
+
+from movies import services_tmdb
+from movies.local_cache import LocalCache
+from movies.models import Film, WatchStatus
+from movies.services_tmdb import GENRE_MAP_KEY, cache_tmdb_items, get_cached_genre_map, import_tmdb_item
+from movies.tasks import refresh_films_batch
+from movies.tmdb_types import TMDBItem
+
+from . import LOCMEM_CACHES, make_user
+
+
+def _item(tmdb_id=100, media_type="tv", genre_ids=(18, 99)):
+    return TMDBItem(
+        id=tmdb_id, media_type=media_type, title="Series", year=2010,
+        overview="Short overview", genre_ids=genre_ids,
+    )
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+@mock.patch("movies.services_tmdb.fetch_genre_map", side_effect=AssertionError("TMDB was called"))
+class ImportTMDBItemTests(TestCase):
+    def setUp(self):
+        self.addCleanup(cache.clear)
+        for patcher in (
+            mock.patch.object(services_tmdb, "local_cache", LocalCache(max_entries=10, timeout=60)),
+            mock.patch.object(LocalCache, "_ensure_listener"),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_genres_come_from_the_cached_map(self, fetch_genre_map):
+        cache.set(GENRE_MAP_KEY, {18: "Drama", 35: "Comedy"})
+
+        film, created = import_tmdb_item(_item())
+
+        self.assertTrue(created)
+        self.assertEqual(
+            (film.tmdb_id, film.title, film.type, film.start_year, film.description),
+            (100, "Series", "series", 2010, "Short overview"),
+        )
+        self.assertEqual(list(film.genres.values_list("name", flat=True)), ["Drama"])
+
+    def test_without_cached_map_the_film_has_no_genres(self, fetch_genre_map):
+        self.assertEqual(get_cached_genre_map(), {})
+        film, created = import_tmdb_item(_item())
+        self.assertTrue(created)
+        self.assertFalse(film.genres.exists())
+
+    def test_existing_film_is_returned_unchanged(self, fetch_genre_map):
+        existing = Film.objects.create(title="Known", tmdb_id=100, type="series")
+        self.assertEqual(import_tmdb_item(_item()), (existing, False))
+        existing.refresh_from_db()
+        self.assertEqual(existing.title, "Known")
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+@mock.patch("movies.services.enqueue")
+@mock.patch("movies.views.enqueue")
+@mock.patch("movies.views.get_movie_details")
+class QuickAddTests(TestCase):
+    url = reverse("quick_add_movie")
+
+    def setUp(self):
+        self.addCleanup(cache.clear)
+        self.user = make_user()
+        self.client.force_login(self.user)
+        for patcher in (
+            mock.patch("movies.services_tmdb.get_cached_genre_map", return_value={}),
+            # The title index lives in Redis, not in the cache API
+            mock.patch("movies.services_tmdb.index_film"),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def quick_add(self, tmdb_id=100):
+        return self.client.post(self.url, {
+            "tmdb_id": tmdb_id, "media_type": "tv", "status": "planned", "query": "series",
+        })
+
+    def test_cached_search_result_is_imported_without_tmdb(self, get_details, views_enqueue, enqueue):
+        cache_tmdb_items([_item()])
+
+        self.assertRedirects(self.quick_add(), "/search/?q=series", fetch_redirect_response=False)
+
+        film = Film.objects.get(tmdb_id=100)
+        self.assertEqual(WatchStatus.objects.get(user=self.user).film, film)
+        get_details.assert_not_called()
+        views_enqueue.assert_called_once_with(refresh_films_batch, [film.id])
+
+    def test_uncached_film_is_imported_from_details(self, get_details, views_enqueue, enqueue):
+        get_details.return_value = {"id": 101, "name": "Other series", "first_air_date": "2001-01-01"}
+        self.quick_add(101)
+        self.assertEqual(WatchStatus.objects.get(user=self.user).film.title, "Other series")
+        get_details.assert_called_once_with(tmdb_id=101, media_type="tv")
+
+    def test_tmdb_unavailable(self, get_details, views_enqueue, enqueue):
+        get_details.side_effect = ConnectionError
+        response = self.quick_add()
+        self.assertRedirects(response, "/search/?q=series", fetch_redirect_response=False)
+        self.assertFalse(Film.objects.exists())
+        self.assertFalse(WatchStatus.objects.exists())
@@ -0,0 +1,150 @@
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, override_settings
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+
+from movies import leaderboards
+from movies.models import Film
+from movies.services import save_review, set_watch_status
+
+from . import LOCMEM_CACHES, make_user, requires_redis
+
+PREFIX = "cinema_tracker:test:leaderboard"
+
+
+class RatingWeightTests(SimpleTestCase):
+    def test_rating_weight(self):
+        self.assertEqual(leaderboards.rating_weight(10), 1)
+        self.assertEqual(leaderboards.rating_weight(1), -1)
+        self.assertEqual(leaderboards.rating_weight(5.5), 0)
+
+
+@requires_redis
+class LeaderboardTests(TestCase):
+    NOW = 1_700_000_000.0
+    HALF_LIFE = leaderboards.WINDOWS["week"]
+
+    def setUp(self):
+        for name, template in (
+            ("BOARD_KEY", PREFIX + ":{metric}:{window}:{dimension}"),
+            ("EPOCH_KEY", PREFIX + ":epoch:{window}"),
+            ("SEEN_KEY", PREFIX + "_seen:{metric}:{window}:{user_id}:{film_id}"),
+        ):
+            patcher = mock.patch.object(leaderboards, name, template)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.conn = get_redis_connection("default")
+        self.addCleanup(self._delete_keys)
+        self.film = Film.objects.create(title="Film")
+
+    def _delete_keys(self):
+        keys = list(self.conn.scan_iter(match=PREFIX + "*"))
+        if keys:
+            self.conn.delete(*keys)
+
+    def record(self, metric, user_id, weight, now):
+        leaderboards.record_events([(metric, user_id, self.film.id, weight)], now=now)
+
+    def rate(self, user_id, rating, now):
+        self.record(leaderboards.RATED, user_id, leaderboards.rating_weight(rating), now)
+
+    def score(self, metric=leaderboards.ADDED, now=None):
+        entries = leaderboards.get_leaderboard(metric, "week", now=now or self.NOW)
+        return entries[0][1] if entries else None
+
+    def raw_score(self, metric=leaderboards.RATED):
+        key = leaderboards.BOARD_KEY.format(metric=metric, window="week", dimension=leaderboards.ALL)
+        return self.conn.zscore(key, self.film.id)
+
+    def test_events_decay_with_half_life(self):
+        later = self.NOW + self.HALF_LIFE
+        self.record(leaderboards.ADDED, 1, 1, self.NOW)
+        self.record(leaderboards.ADDED, 2, 1, later)
+        # The first event has faded to one half
+        self.assertAlmostEqual(self.score(now=later), 1.5)
+        self.assertAlmostEqual(self.score(now=later + self.HALF_LIFE), 0.75)
+
+    def test_film_is_on_type_and_genre_boards(self):
+        genre = self.film.genres.create(name="Drama")
+        self.record(leaderboards.ADDED, 1, 1, self.NOW)
+        for kwargs in ({"media_type": self.film.type}, {"genre_id": genre.id}):
+            entries = leaderboards.get_leaderboard(leaderboards.ADDED, "week", now=self.NOW, **kwargs)
+            self.assertEqual([(film, round(score, 6)) for film, score in entries], [(self.film, 1)])
+
+    def test_compaction_keeps_scores_and_drops_faded_entries(self):
+        later = self.NOW + self.HALF_LIFE
+        self.record(leaderboards.ADDED, 1, 1, self.NOW)
+        leaderboards.compact_leaderboards(now=later)
+        self.assertAlmostEqual(self.score(now=later), 0.5)
+
+        self.assertGreater(leaderboards.compact_leaderboards(now=self.NOW + 10 * self.HALF_LIFE), 0)
+        self.assertIsNone(self.score(now=self.NOW + 10 * self.HALF_LIFE))
+
+    def test_compaction_keeps_negative_entries(self):
+        self.rate(1, 1, self.NOW)
+        leaderboards.compact_leaderboards(now=self.NOW + self.HALF_LIFE)
+        self.assertAlmostEqual(self.raw_score(), -0.5)
+
+        # Once it fades, a negative entry is dropped as well
+        leaderboards.compact_leaderboards(now=self.NOW + 10 * self.HALF_LIFE)
+        self.assertIsNone(self.raw_score())
+
+    def test_user_counts_once_per_film(self):
+        for _ in range(3):
+            self.record(leaderboards.ADDED, 1, 1, self.NOW)
+        self.assertAlmostEqual(self.score(), 1)
+
+    def test_new_rating_replaces_the_old_one(self):
+        for rating in (10, 8):
+            self.rate(1, rating, self.NOW)
+        self.assertAlmostEqual(self.score(leaderboards.RATED), leaderboards.rating_weight(8))
+
+    def test_rerating_later_takes_back_what_was_added(self):
+        later = self.NOW + self.HALF_LIFE
+        self.rate(1, 10, self.NOW)
+        self.rate(1, 1, later)
+        # Only the latest rating counts: -1 at its own time, not 1/2 - 2
+        self.assertAlmostEqual(self.raw_score() * 2 ** ((self.NOW - later) / self.HALF_LIFE), -1)
+
+    def test_rerating_after_compaction(self):
+        later = self.NOW + self.HALF_LIFE
+        self.rate(1, 10, self.NOW)
+        leaderboards.compact_leaderboards(now=later)
+        self.rate(1, 8, later)
+        self.assertAlmostEqual(self.score(leaderboards.RATED, now=later), leaderboards.rating_weight(8))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+@mock.patch("movies.services.bump_versions")
+@mock.patch("movies.services.enqueue")
+@mock.patch("movies.leaderboards.record_events")
+class RecordLeaderboardEventTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.film = Film.objects.create(title="Film")
+
+    def test_events_are_recorded_on_commit(self, record_events, enqueue, bump_versions):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            set_watch_status(user=self.user, film=self.film, status="planned")
+            save_review(user=self.user, film=self.film, rating=1)
+        record_events.assert_not_called()
+
+        for callback in callbacks:
+            callback()
+        record_events.assert_has_calls([
+            mock.call([(leaderboards.ADDED, self.user.pk, self.film.pk, 1)]),
+            mock.call([(leaderboards.RATED, self.user.pk, self.film.pk, -1)]),
+        ])
+
+    def test_dropped_films_are_not_counted(self, record_events, enqueue, bump_versions):
+        with self.captureOnCommitCallbacks(execute=True):
+            set_watch_status(user=self.user, film=self.film, status="dropped")
+        record_events.assert_not_called()
+
+    def test_redis_errors_are_logged(self, record_events, enqueue, bump_versions):
+        record_events.side_effect = RedisError
+        with self.assertLogs("movies.services", "WARNING"):
+            with self.captureOnCommitCallbacks(execute=True):
+                review = save_review(user=self.user, film=self.film, rating=9)
+        self.assertEqual(review.rating, 9)
@@ -0,0 +1,146 @@
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from movies.models import Film, Review, WatchStatus
+from movies.services_export import (
+    EXPORT_FIELDS,
+    _iter_records,
+    import_library,
+    iter_library_rows,
+    stream_library_export,
+)
+
+from . import make_user
+
+
+class ImportRecordsTests(SimpleTestCase):
+    def test_malformed_jsonl_lines_are_row_errors(self):
+        lines = ['{"tmdb_id": 1}\n', "\n", "[1, 2]\n", "{oops\n"]
+        records = list(_iter_records(lines, "jsonl"))
+        self.assertEqual(records[0], (1, {"tmdb_id": 1}, None))
+        self.assertEqual([(line, record) for line, record, _ in records[1:]], [(3, None), (4, None)])
+        self.assertTrue(all(error for _, _, error in records[1:]))
+
+    def test_csv_records_keep_their_line_numbers(self):
+        lines = ["tmdb_id,status\n", "1,watched\n", "2,planned\n"]
+        self.assertEqual(
+            [(line, record["tmdb_id"]) for line, record, _ in _iter_records(lines, "csv")],
+            [(2, "1"), (3, "2")],
+        )
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            list(_iter_records([], "xml"))
+
+
+@mock.patch("movies.services.enqueue")
+class ImportLibraryTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.film = Film.objects.create(title="Film", tmdb_id=100)
+        self.other = Film.objects.create(title="Other")
+
+    def test_errors_are_reported_with_file_line_numbers(self, enqueue):
+        lines = [
+            '{"tmdb_id": 100, "status": "watched"}\n',
+            '{"tmdb_id": 100, "rating": 11}\n',
+            "{oops\n",
+            f'{{"film_id": {self.other.id}, "status": "finished"}}\n',
+            f'{{"film_id": {self.other.id}, "rating": 6}}\n',
+        ]
+        results = list(import_library(user=self.user, lines=lines, fmt="jsonl", chunk_size=2))
+
+        self.assertEqual(
+            [[error["line"] for error in result["errors"]] for result in results],
+            [[2], [3, 4]],
+        )
+        self.assertEqual([result["statuses"] for result in results], [1, 0])
+        self.assertEqual(Review.objects.get(user=self.user, film=self.other).rating, 6)
+
+    def test_csv_export_round_trip(self, enqueue):
+        owner = make_user("owner")
+        WatchStatus.objects.create(user=owner, film=self.film, status="watching")
+        Review.objects.create(user=owner, film=self.other, rating=8, text="Again, \"really\"")
+
+        exported = "".join(stream_library_export(user=owner, fmt="csv"))
+        results = list(import_library(user=self.user, lines=exported.splitlines(True), fmt="csv"))
+
+        self.assertEqual(results[0]["errors"], [])
+        self.assertEqual(WatchStatus.objects.get(user=self.user, film=self.film).status, "watching")
+        review = Review.objects.get(user=self.user, film=self.other)
+        self.assertEqual((review.rating, review.text), (8, "Again, \"really\""))
+
+
+class ExportLibraryTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.film = Film.objects.create(title="Film", tmdb_id=100, start_year=2000)
+        self.other = Film.objects.create(title="Other")
+        WatchStatus.objects.create(user=self.user, film=self.film, status="watched")
+        Review.objects.create(user=self.user, film=self.film, rating=9, text="Great")
+        Review.objects.create(user=self.user, film=self.other, rating=4)
+        WatchStatus.objects.create(user=make_user("other"), film=self.other, status="planned")
+
+    def test_rows_cover_statuses_and_reviews_without_status(self):
+        rows = [row[:-1] for row in iter_library_rows(user=self.user, chunk_size=1)]
+        self.assertEqual(rows, [
+            (100, self.film.id, "Film", "movie", 2000, "watched", 9, "Great"),
+            (None, self.other.id, "Other", "movie", None, None, 4, ""),
+        ])
+
+    def test_jsonl_export(self):
+        records = [json.loads(line) for line in stream_library_export(user=self.user, fmt="jsonl")]
+        self.assertEqual([list(record) for record in records], [list(EXPORT_FIELDS)] * 2)
+        self.assertEqual(records[0]["status"], "watched")
+
+    def test_view_streams_attachment(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("export_library", args=["csv"]))
+
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertIn('filename="cinema-tracker-user.csv"', response["Content-Disposition"])
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], ",".join(EXPORT_FIELDS))
+        self.assertEqual(len(lines), 3)
+
+    def test_view_rejects_unknown_format(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse("export_library", args=["xml"])).status_code, 404)
+
+
+@mock.patch("movies.services.enqueue")
+class ImportLibraryCommandTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.film = Film.objects.create(title="Film", tmdb_id=100)
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+
+    def _write(self, name, content):
+        path = Path(self.dir.name) / name
+        path.write_text(content, encoding="utf-8")
+        return str(path)
+
+    def test_imports_file_and_reports_totals(self, enqueue):
+        path = self._write("library.csv", "tmdb_id,status,rating\n100,watched,7\n,planned,\n")
+        out = StringIO()
+        call_command("import_library", "user", path, stdout=out)
+
+        output = out.getvalue()
+        self.assertIn("Done: 1 statuses, 1 reviews", output)
+        self.assertIn("1 invalid rows", output)
+        self.assertEqual(WatchStatus.objects.get(user=self.user).status, "watched")
+
+    def test_unknown_user_and_format(self, enqueue):
+        path = self._write("library.txt", "")
+        with self.assertRaisesMessage(CommandError, "does not exist"):
+            call_command("import_library", "nobody", path)
+        with self.assertRaisesMessage(CommandError, "--format"):
+            call_command("import_library", "user", path)
@@ -0,0 +1,124 @@
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+
+from movies import local_cache as local_cache_module
+from movies import services_tmdb
+from movies.local_cache import LocalCache
+from movies.tmdb_types import TMDBItem
+
+from . import LOCMEM_CACHES, requires_redis
+
+
+@mock.patch.object(LocalCache, "_ensure_listener")
+class LocalCacheTests(SimpleTestCase):
+    def test_least_recently_used_entry_is_evicted(self, ensure_listener):
+        cache = LocalCache(max_entries=2, timeout=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertEqual((cache.get("a"), cache.get("b"), cache.get("c")), (1, None, 3))
+
+    def test_entries_expire(self, ensure_listener):
+        cache = LocalCache(max_entries=10, timeout=60)
+        with mock.patch("movies.local_cache.time.monotonic", return_value=100.0):
+            cache.set("a", 1)
+            cache.set("b", 2, timeout=120)
+        with mock.patch("movies.local_cache.time.monotonic", return_value=161.0):
+            self.assertIsNone(cache.get("a"))
+            self.assertEqual(cache.get("b"), 2)
+        self.assertEqual(cache.stats()["entries"], 1)
+
+    def test_get_or_set_does_not_keep_none(self, ensure_listener):
+        cache = LocalCache(max_entries=10, timeout=60)
+        load = mock.Mock(side_effect=[None, "value"])
+        self.assertIsNone(cache.get_or_set("key", load))
+        self.assertEqual(cache.get_or_set("key", load), "value")
+        self.assertEqual(cache.get_or_set("key", load), "value")
+        self.assertEqual(load.call_count, 2)
+        self.assertEqual(cache.stats()["hits"], 1)
+
+    @mock.patch("movies.local_cache.get_redis_connection")
+    def test_invalidate_publishes_keys(self, get_redis_connection, ensure_listener):
+        cache = LocalCache(max_entries=10, timeout=60)
+        cache.set("a", 1)
+        cache.invalidate("a", "b")
+        self.assertIsNone(cache.get("a"))
+        get_redis_connection.return_value.publish.assert_has_calls([
+            mock.call(local_cache_module.INVALIDATION_CHANNEL, "a"),
+            mock.call(local_cache_module.INVALIDATION_CHANNEL, "b"),
+        ])
+
+    @mock.patch("movies.local_cache.get_redis_connection", side_effect=RedisError)
+    def test_invalidate_survives_redis_errors(self, get_redis_connection, ensure_listener):
+        cache = LocalCache(max_entries=10, timeout=60)
+        cache.set("a", 1)
+        with self.assertLogs("movies.local_cache", "WARNING"):
+            cache.invalidate("a")
+        self.assertIsNone(cache.get("a"))
+
+    def test_forked_process_starts_empty(self, ensure_listener):
+        cache = LocalCache(max_entries=10, timeout=60)
+        cache.set("a", 1)
+        with mock.patch("movies.local_cache.os.getpid", return_value=-1):
+            self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["misses"], 1)
+
+
+@requires_redis
+@mock.patch.object(local_cache_module, "INVALIDATION_CHANNEL", "cinema_tracker:test:local_cache:invalidate")
+class InvalidationListenerTests(SimpleTestCase):
+    def wait_for(self, condition, timeout=5):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            if time.monotonic() > deadline:
+                self.fail("Timed out")
+            time.sleep(0.01)
+
+    def test_other_process_drops_invalidated_keys(self):
+        conn = get_redis_connection("default")
+        channel = local_cache_module.INVALIDATION_CHANNEL
+        here, there = LocalCache(max_entries=10, timeout=60), LocalCache(max_entries=10, timeout=60)
+        here.set("warm-up", 1)
+        there.set("warm-up", 1)
+        self.wait_for(lambda: conn.pubsub_numsub(channel)[0][1] >= 2)
+
+        there.set("key", "old")
+        here.invalidate("key")
+        self.wait_for(lambda: there.get("key") is None)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+@mock.patch("movies.services_tmdb.tmdb_is_available", return_value=True)
+class CachedFeedTests(SimpleTestCase):
+    KEY = "test:feed"
+
+    def setUp(self):
+        self.addCleanup(cache.clear)
+        for patcher in (
+            mock.patch.object(services_tmdb, "local_cache", LocalCache(max_entries=10, timeout=60)),
+            mock.patch.object(LocalCache, "_ensure_listener"),
+            mock.patch("movies.local_cache.get_redis_connection"),
+            mock.patch("movies.services_tmdb.bump_versions"),
+            mock.patch("movies.services_tmdb.index_tmdb_items"),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_feed_is_served_locally_until_invalidated(self, tmdb_is_available):
+        old, new = [TMDBItem(1, "movie", "Old")], [TMDBItem(2, "movie", "New")]
+        fetch = mock.Mock(return_value=old)
+
+        self.assertEqual(services_tmdb.get_cached_feed(self.KEY, fetch, 60), old)
+        cache.delete(self.KEY)
+        self.assertEqual(services_tmdb.get_cached_feed(self.KEY, fetch, 60), old)
+        fetch.assert_called_once_with()
+
+        services_tmdb.store_feed(self.KEY, new, 60)
+        self.assertEqual(services_tmdb.get_cached_feed(self.KEY, fetch, 60), new)
+        fetch.assert_called_once_with()
@@ -0,0 +1,60 @@
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase
+
+from movies import partitioning
+from movies.models import Film, Review, WatchStatus
+
+from . import make_user
+
+
+def _shadow_rows(model):
+    table = connection.ops.quote_name(f"{model._meta.db_table}_part")
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT id, status FROM {table} ORDER BY id")
+        return cursor.fetchall()
+
+
+@skipUnless(connection.vendor == "postgresql", "Table partitioning requires PostgreSQL")
+class PartitioningTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.film = Film.objects.create(title="Film")
+
+    def test_shadow_tables_are_hash_partitioned_and_indexed_on_id(self):
+        for model in partitioning.partitioned_models():
+            table = f"{model._meta.db_table}_part"
+            with self.subTest(table=table), connection.cursor() as cursor:
+                self.assertEqual(partitioning._relkind(table), "p")
+                cursor.execute(
+                    "SELECT count(*) FROM pg_inherits WHERE inhparent = to_regclass(%s)", [table],
+                )
+                self.assertEqual(cursor.fetchone()[0], partitioning.PARTITION_COUNT)
+                cursor.execute(
+                    "SELECT i.indisvalid FROM pg_index i WHERE i.indexrelid = to_regclass(%s)",
+                    [partitioning._id_index_name(model)],
+                )
+                self.assertEqual(cursor.fetchone(), (True,))
+
+    def test_writes_are_mirrored_into_the_shadow_table(self):
+        status = WatchStatus.objects.create(user=self.user, film=self.film, status="planned")
+        self.assertEqual(_shadow_rows(WatchStatus), [(status.id, "planned")])
+
+        status.status = "watched"
+        status.save()
+        self.assertEqual(_shadow_rows(WatchStatus), [(status.id, "watched")])
+
+        status.delete()
+        self.assertEqual(_shadow_rows(WatchStatus), [])
+
+    def test_swap_keeps_rows_and_ids(self):
+        old = Review.objects.create(user=self.user, film=self.film, rating=7)
+        self.assertFalse(partitioning.is_partitioned(Review))
+
+        partitioning.swap_tables(Review, copied_up_to=0)
+
+        self.assertTrue(partitioning.is_partitioned(Review))
+        self.assertEqual(Review.objects.get(pk=old.pk).rating, 7)
+        new = Review.objects.create(user=make_user("other"), film=self.film, rating=3)
+        self.assertGreater(new.pk, old.pk)
@@ -0,0 +1,134 @@
+import tempfile
+from io import BytesIO
+from pathlib import Path
+from unittest import mock, skipIf
+
+from django.test import SimpleTestCase, override_settings
+from requests import ConnectionError
+
+from movies import posters
+from movies.posters import PosterNotFound, _image_extension, get_poster_file, poster_url
+
+from . import LOCMEM_CACHES
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"image data"
+POSTER_PATH = "/abc_123.jpg"
+
+
+def _response(status_code=200, content=PNG):
+    return mock.Mock(status_code=status_code, content=content)
+
+
+class PosterFormatTests(SimpleTestCase):
+    def test_image_extension(self):
+        self.assertEqual(_image_extension(b"\xff\xd8\xff\xe0rest"), "jpg")
+        self.assertEqual(_image_extension(b"\x89PNG\r\n\x1a\nrest"), "png")
+        self.assertEqual(_image_extension(b"RIFF\x00\x00\x00\x00WEBPVP8 "), "webp")
+        self.assertIsNone(_image_extension(b"<html>"))
+
+
+class PosterTestCase(SimpleTestCase):
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        self.root = Path(root.name)
+        settings = override_settings(POSTER_ROOT=self.root, POSTER_ACCEL_REDIRECT="", CACHES=LOCMEM_CACHES)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        patcher = mock.patch("movies.posters.requests.get", return_value=_response())
+        self.get = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def signature(self, poster_path=POSTER_PATH):
+        return posters.sign_poster_path(poster_path)
+
+
+@mock.patch("movies.posters._pillow", return_value=None)
+class GetPosterFileTests(PosterTestCase):
+    def test_original_is_downloaded_once_and_stored_in_its_format(self, pillow):
+        path, content_type = get_poster_file(POSTER_PATH, "card", self.signature())
+
+        self.assertEqual(content_type, "image/png")
+        self.assertEqual(path.suffix, ".png")
+        self.assertEqual(path.read_bytes(), PNG)
+        self.assertTrue(path.is_relative_to(self.root / "original"))
+
+        self.assertEqual(get_poster_file(POSTER_PATH, "detail", self.signature()), (path, content_type))
+        self.get.assert_called_once_with(posters.tmdb_poster_url(POSTER_PATH), timeout=posters.FETCH_TIMEOUT)
+
+    def test_bad_requests_are_rejected_without_fetching(self, pillow):
+        for poster_path, variant, signature in (
+            (POSTER_PATH, "card", "forged"),
+            (POSTER_PATH, "card", None),
+            (POSTER_PATH, "huge", self.signature()),
+            ("/../settings.py", "card", self.signature("/../settings.py")),
+        ):
+            with self.subTest(poster_path=poster_path, variant=variant, signature=signature):
+                with self.assertRaises(PosterNotFound):
+                    get_poster_file(poster_path, variant, signature)
+        self.get.assert_not_called()
+
+    def test_missing_or_non_image_posters(self, pillow):
+        for response in (_response(404), _response(content=b"<html>error</html>")):
+            self.get.return_value = response
+            with self.subTest(status=response.status_code), self.assertRaises(PosterNotFound):
+                get_poster_file(POSTER_PATH, "card", self.signature())
+        self.assertFalse((self.root / "original").exists())
+
+
+def _has_pillow():
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+@skipIf(not _has_pillow(), "Pillow is not installed")
+class PosterVariantTests(PosterTestCase):
+    def test_variants_are_resized_webp(self):
+        from PIL import Image
+
+        buffer = BytesIO()
+        Image.new("RGB", (1000, 1500), "red").save(buffer, "PNG")
+        self.get.return_value = _response(content=buffer.getvalue())
+
+        path, content_type = get_poster_file(POSTER_PATH, "card", self.signature())
+
+        self.assertEqual((path.suffix, content_type), (".webp", "image/webp"))
+        with Image.open(path) as image:
+            self.assertEqual(image.size, (342, 513))
+
+
+@mock.patch("movies.posters._pillow", return_value=None)
+class PosterViewTests(PosterTestCase):
+    def test_serves_file_with_long_lived_cache_headers(self, pillow):
+        response = self.client.get(poster_url(POSTER_PATH, "card"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "image/png")
+        self.assertEqual(b"".join(response.streaming_content), PNG)
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertIn(f"max-age={posters.POSTER_MAX_AGE}", response["Cache-Control"])
+
+    def test_accel_redirect(self, pillow):
+        with override_settings(POSTER_ACCEL_REDIRECT="/protected-posters/"):
+            response = self.client.get(poster_url(POSTER_PATH, "detail"))
+        self.assertTrue(response["X-Accel-Redirect"].startswith("/protected-posters/original/"))
+        self.assertEqual(response.content, b"")
+
+    def test_unsigned_urls_are_not_found(self, pillow):
+        url = poster_url(POSTER_PATH, "card").partition("?")[0]
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertEqual(self.client.get(url + "?s=forged").status_code, 404)
+        self.get.assert_not_called()
+
+    def test_unreachable_cdn_redirects_to_tmdb(self, pillow):
+        self.get.side_effect = ConnectionError
+        response = self.client.get(poster_url(POSTER_PATH, "card"))
+        self.assertRedirects(response, posters.tmdb_poster_url(POSTER_PATH), fetch_redirect_response=False)
+        self.assertIn("max-age=60", response["Cache-Control"])
+
+    def test_poster_url_of_film_without_poster(self, pillow):
+        self.assertEqual(poster_url(None), "")
@@ -0,0 +1,70 @@
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+from redis.exceptions import RedisError
+
+from movies import rate_limit, tmdb_client
+
+
+class RateLimitLaneTests(SimpleTestCase):
+    @mock.patch("movies.rate_limit._try_acquire", return_value=(False, 1.0))
+    def test_interactive_fails_fast(self, try_acquire):
+        with self.assertRaises(rate_limit.RateLimited):
+            rate_limit.acquire()
+        try_acquire.assert_called_once_with(rate_limit.INTERACTIVE)
+
+    @mock.patch("movies.rate_limit.time.sleep")
+    @mock.patch("movies.rate_limit._try_acquire", side_effect=[(False, 0.5), (True, 0.0)])
+    def test_background_waits_for_a_token(self, try_acquire, sleep):
+        with rate_limit.rate_limit_lane(rate_limit.BACKGROUND):
+            rate_limit.acquire()
+        self.assertEqual(try_acquire.call_args_list, [mock.call(rate_limit.BACKGROUND)] * 2)
+        sleep.assert_called_once_with(0.5)
+
+    @override_settings(TMDB_RATE_LIMIT_MAX_WAIT=0)
+    @mock.patch("movies.rate_limit._try_acquire", return_value=(False, 0.5))
+    def test_background_gives_up_after_max_wait(self, try_acquire):
+        with rate_limit.rate_limit_lane(rate_limit.BACKGROUND):
+            with self.assertRaises(rate_limit.RateLimited):
+                rate_limit.acquire()
+
+    @mock.patch("movies.rate_limit._try_acquire", side_effect=RedisError)
+    def test_fails_open_without_redis(self, try_acquire):
+        rate_limit.acquire()
+
+    @mock.patch("movies.rate_limit._try_acquire", return_value=(True, 0.0))
+    def test_lane_is_restored_after_the_block(self, try_acquire):
+        with tmdb_client.tmdb_background():
+            rate_limit.acquire()
+        rate_limit.acquire()
+        self.assertEqual(
+            try_acquire.call_args_list,
+            [mock.call(rate_limit.BACKGROUND), mock.call(rate_limit.INTERACTIVE)],
+        )
+
+    @override_settings(TMDB_RATE_LIMIT_INTERACTIVE_RESERVE=10)
+    def test_only_background_keeps_the_reserve(self):
+        script = mock.Mock(return_value=[1, "0"])
+        with mock.patch("movies.rate_limit._script", script):
+            rate_limit._try_acquire(rate_limit.BACKGROUND)
+            rate_limit._try_acquire(rate_limit.INTERACTIVE)
+        reserves = [call.kwargs["args"][2] for call in script.call_args_list]
+        self.assertEqual(reserves, [10, 0])
+
+
+class TMDBClientRateLimitTests(SimpleTestCase):
+    @mock.patch("movies.tmdb_client.requests.get")
+    @mock.patch("movies.tmdb_client.tmdb_breaker")
+    @mock.patch("movies.tmdb_client.acquire", side_effect=rate_limit.RateLimited("empty"))
+    def test_no_request_without_a_token(self, acquire, breaker, get):
+        breaker.allow_request.return_value = True
+        with self.assertRaises(tmdb_client.TMDBRateLimited):
+            tmdb_client._tmdb_get("/movie/1")
+        get.assert_not_called()
+        breaker.record_failure.assert_not_called()
+
+    @mock.patch("movies.tmdb_client.tmdb_breaker")
+    @mock.patch("movies.tmdb_client.acquire", side_effect=rate_limit.RateLimited("empty"))
+    def test_list_endpoints_degrade_to_empty(self, acquire, breaker):
+        breaker.allow_request.return_value = True
+        self.assertEqual(tmdb_client.tmdb_get_popular(), [])
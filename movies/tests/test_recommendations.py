@@ -0,0 +1,171 @@
+from unittest import mock
+
+from celery.exceptions import Retry
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from requests import ConnectionError, HTTPError, Response
+
+from config.warmup import close_connections_before_fork
+from movies import services_recommendations as recommendations
+from movies.models import Film, RecommendationSet, Review, WatchStatus
+from movies.tasks import recompute_recommendations_shard
+from movies.tmdb_client import TMDBUnavailable
+from movies.tmdb_types import TMDBItem
+
+from . import LOCMEM_CACHES, make_user
+
+
+def _http_error(status_code):
+    response = Response()
+    response.status_code = status_code
+    return HTTPError(response=response)
+
+
+def _results(*ids):
+    return [{"id": i, "title": f"Similar {i}", "vote_average": i} for i in ids]
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+@mock.patch("movies.services_recommendations.tmdb_get_similar")
+class SimilarItemsTests(SimpleTestCase):
+    def tearDown(self):
+        cache.clear()
+
+    def test_only_uncached_lists_are_fetched(self, get_similar):
+        get_similar.return_value = _results(10, 11)
+        first = recommendations.get_similar_items({(1, "movie")})
+        second = recommendations.get_similar_items({(1, "movie"), (2, "tv")})
+
+        self.assertEqual([item.id for item in first[(1, "movie")]], [10, 11])
+        self.assertEqual(second[(1, "movie")], first[(1, "movie")])
+        self.assertEqual(
+            [call.args for call in get_similar.call_args_list], [(1,), (2,)],
+        )
+        self.assertEqual(get_similar.call_args.kwargs, {"media_type": "tv"})
+
+    def test_failed_lists_are_empty_and_not_cached(self, get_similar):
+        get_similar.side_effect = [ConnectionError(), _http_error(404)]
+        similar = recommendations.get_similar_items({(1, "movie")})
+        self.assertEqual(similar, {(1, "movie"): []})
+
+        # A film gone from TMDB is not an error
+        similar = recommendations.get_similar_items({(1, "movie")}, raise_errors=True)
+        self.assertEqual(similar, {(1, "movie"): []})
+
+    def test_raise_errors_caches_the_lists_that_were_fetched(self, get_similar):
+        def fake_get_similar(tmdb_id, media_type):
+            if tmdb_id == 2:
+                raise ConnectionError()
+            return _results(10)
+
+        get_similar.side_effect = fake_get_similar
+        with self.assertRaises(TMDBUnavailable):
+            recommendations.get_similar_items({(1, "movie"), (2, "movie")}, raise_errors=True)
+
+        get_similar.reset_mock()
+        recommendations.get_similar_items({(1, "movie")}, raise_errors=True)
+        get_similar.assert_not_called()
+
+
+class BuildRecommendationsTests(SimpleTestCase):
+    def test_owned_and_duplicate_items_are_skipped(self):
+        items = {data["id"]: TMDBItem.from_tmdb(data, media_type="movie") for data in _results(10, 11, 12)}
+        similar = {(1, "movie"): [items[10], items[11]], (2, "movie"): [items[11], items[12]]}
+
+        result = recommendations.build_recommendations([(1, "movie"), (2, "movie")], {10}, similar, limit=5)
+
+        # Without a taste profile, ranked by TMDB rating
+        self.assertEqual([item.id for item in result], [12, 11])
+        self.assertEqual(
+            recommendations.build_recommendations([(1, "movie"), (2, "movie")], set(), similar, limit=1),
+            [items[12]],
+        )
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+@mock.patch("movies.services_recommendations.get_genre_map", return_value={})
+@mock.patch("movies.services_recommendations.tmdb_get_similar")
+class ComputeShardTests(TestCase):
+    def setUp(self):
+        self.addCleanup(cache.clear)
+        self.alice, self.bob, self.carol = make_user("alice"), make_user("bob"), make_user("carol")
+        self.seed = Film.objects.create(title="Seed", tmdb_id=1)
+        owned = Film.objects.create(title="Owned", tmdb_id=11)
+        Review.objects.create(user=self.alice, film=self.seed, rating=9)
+        Review.objects.create(user=self.bob, film=self.seed, rating=5)
+        WatchStatus.objects.create(user=self.alice, film=owned, status="watched")
+        # Bob's ratings dropped below the threshold since the last run
+        RecommendationSet.objects.create(user=self.bob, items=[], computed_at=timezone.now())
+
+    def test_stores_recommendations_of_users_in_range(self, get_similar, genre_map):
+        get_similar.return_value = _results(10, 11, 12)
+        recommendations.start_pipeline_run(1)
+
+        result = recommendations.compute_shard(0, self.alice.pk, None)
+
+        self.assertEqual((result["shard"], result["users"]), (0, 1))
+        stored = RecommendationSet.objects.get(user=self.alice)
+        self.assertEqual([values[0] for values in stored.items], [12, 10])
+        self.assertFalse(RecommendationSet.objects.filter(user=self.bob).exists())
+        self.assertEqual(recommendations.get_stored_recommendations(user=self.alice)[0].id, 12)
+        self.assertEqual(recommendations.get_pending_shards(), {})
+
+    def test_users_outside_range_are_untouched(self, get_similar, genre_map):
+        get_similar.return_value = _results(10)
+        recommendations.compute_shard(0, self.carol.pk, None)
+        self.assertFalse(RecommendationSet.objects.filter(user=self.alice).exists())
+        self.assertTrue(RecommendationSet.objects.filter(user=self.bob).exists())
+
+    def test_tmdb_failure_keeps_previous_results(self, get_similar, genre_map):
+        get_similar.side_effect = ConnectionError
+        recommendations.start_pipeline_run(1)
+
+        with self.assertRaises(TMDBUnavailable):
+            recommendations.compute_shard(0, self.alice.pk, None)
+
+        self.assertTrue(RecommendationSet.objects.filter(user=self.bob).exists())
+        self.assertEqual(recommendations.get_pending_shards(), {0: (0, None)})
+
+    def test_shard_task_retries_on_tmdb_failure(self, get_similar, genre_map):
+        get_similar.side_effect = ConnectionError
+        with mock.patch.object(recompute_recommendations_shard, "retry", side_effect=Retry) as retry:
+            with self.assertRaises(Retry):
+                recompute_recommendations_shard(0, self.alice.pk, None)
+        self.assertIsInstance(retry.call_args.kwargs["exc"], TMDBUnavailable)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class PipelineRunTests(TestCase):
+    def tearDown(self):
+        cache.clear()
+
+    def test_ranges_cover_all_users_and_track_completed_shards(self):
+        users = [make_user(f"user{i}") for i in range(3)]
+        ranges = recommendations.start_pipeline_run(2)
+
+        self.assertEqual(ranges[0][0], 0)
+        self.assertEqual(ranges[-1][1], None)
+        self.assertEqual(ranges[0][1], ranges[1][0])
+        for user in users:
+            self.assertTrue(any(lo <= user.pk and (hi is None or user.pk < hi) for lo, hi in ranges))
+
+        recommendations.mark_shard_completed(1)
+        self.assertEqual(recommendations.get_pending_shards(), {0: tuple(ranges[0])})
+
+    def test_no_run(self):
+        self.assertEqual(recommendations.get_pending_shards(), {})
+
+
+class CloseConnectionsBeforeForkTests(SimpleTestCase):
+    @mock.patch("config.warmup.connections")
+    def test_pools_are_closed_too(self, connections):
+        pooled, plain = mock.Mock(), mock.Mock(spec=["close"])
+        connections.all.return_value = [pooled, plain]
+
+        close_connections_before_fork()
+
+        connections.all.assert_called_once_with(initialized_only=True)
+        pooled.close.assert_called_once_with()
+        pooled.close_pool.assert_called_once_with()
+        plain.close.assert_called_once_with()
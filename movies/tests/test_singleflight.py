@@ -0,0 +1,102 @@
+import asyncio
+import threading
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from movies.singleflight import _cache_keys, asingleflight, singleflight
+
+from . import LOCMEM_CACHES
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class SingleflightTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_concurrent_threads_share_one_call(self):
+        started, release = threading.Event(), threading.Event()
+        calls, results = [], []
+
+        def fetch():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return "value"
+
+        def run():
+            results.append(singleflight("key", fetch))
+
+        threads = [threading.Thread(target=run) for _ in range(3)]
+        threads[0].start()
+        started.wait(5)
+        for thread in threads[1:]:
+            thread.start()
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(calls, [1])
+        self.assertEqual(results, ["value"] * 3)
+
+    def test_result_of_another_process_is_reused(self):
+        lock_key, result_key = _cache_keys("key")
+        cache.set(lock_key, "other", 10)
+        cache.set(result_key, ("value",), 10)
+        fetch = mock.Mock()
+        self.assertEqual(singleflight("key", fetch), "value")
+        fetch.assert_not_called()
+
+    def test_error_is_raised_and_not_cached(self):
+        fetch = mock.Mock(side_effect=[ValueError("boom"), "value"])
+        with self.assertRaises(ValueError):
+            singleflight("key", fetch)
+        self.assertEqual(singleflight("key", fetch), "value")
+
+    def test_different_keys_are_independent(self):
+        self.assertEqual(singleflight("a", lambda: 1), 1)
+        self.assertEqual(singleflight("b", lambda: 2), 2)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class AsyncSingleflightTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    async def test_concurrent_tasks_share_one_call(self):
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "value"
+
+        results = await asyncio.gather(*(asingleflight("key", fetch) for _ in range(3)))
+        self.assertEqual(calls, [1])
+        self.assertEqual(results, ["value"] * 3)
+
+    async def test_waiting_for_another_process_does_not_block_the_loop(self):
+        lock_key, result_key = _cache_keys("key")
+        await cache.aset(lock_key, "other", 10)
+
+        async def other_process():
+            await asyncio.sleep(0.1)
+            await cache.aset(result_key, ("value",), 10)
+
+        async def fetch():
+            raise AssertionError("the other process' result should be used")
+
+        # other_process only finishes if the waiting caller yields to the loop
+        result, _ = await asyncio.gather(asingleflight("key", fetch), other_process())
+        self.assertEqual(result, "value")
+
+    async def test_error_reaches_every_waiting_task(self):
+        async def fetch():
+            await asyncio.sleep(0.05)
+            raise ValueError("boom")
+
+        results = await asyncio.gather(
+            *(asingleflight("key", fetch) for _ in range(2)), return_exceptions=True,
+        )
+        self.assertTrue(all(isinstance(result, ValueError) for result in results))
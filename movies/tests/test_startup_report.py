@@ -0,0 +1,44 @@
+import subprocess
+from io import StringIO
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase
+
+IMPORTTIME = """\
+import time: self [us] | cumulative | imported package
+import time:       300 |        300 |   django.utils
+import time:       700 |       1000 | django
+import time:      1000 |       1000 |     requests.models
+import time:       500 |       1500 |   requests
+"""
+
+
+@mock.patch("movies.management.commands.startup_report.subprocess.run")
+class StartupReportTests(SimpleTestCase):
+    def report(self, *args):
+        out = StringIO()
+        call_command("startup_report", *args, stdout=out)
+        return out.getvalue().splitlines()
+
+    def test_self_time_is_grouped_by_package(self, run):
+        run.return_value = subprocess.CompletedProcess([], 0, stdout="", stderr=IMPORTTIME)
+
+        lines = self.report("--target=celery")
+
+        self.assertEqual([line.split()[:2] for line in lines[1:3]], [["requests", "1.5"], ["django", "1.0"]])
+        self.assertIn("celery: 4 modules, imports 2 ms", lines[-1])
+        self.assertEqual(run.call_args.args[0][1:3], ["-X", "importtime"])
+
+    def test_modules_and_top(self, run):
+        run.return_value = subprocess.CompletedProcess([], 0, stdout="", stderr=IMPORTTIME)
+        lines = self.report("--group-by=module", "--top=1")
+        self.assertEqual(lines[1].split()[0], "requests.models")
+        self.assertEqual(len(lines), 3)
+
+    def test_failed_target(self, run):
+        run.return_value = subprocess.CompletedProcess(
+            [], 1, stdout="", stderr=IMPORTTIME + "ImportError: no module named x\n",
+        )
+        with self.assertRaisesMessage(CommandError, "ImportError"):
+            self.report()
@@ -0,0 +1,79 @@
+from django.test import SimpleTestCase, TestCase
+
+from movies.models import Film, Genre, Review, TasteProfile, WatchStatus
+from movies.services_taste import rank_by_taste, refresh_taste_profiles, summarize_taste
+from movies.tmdb_types import TMDBItem
+
+from . import make_user
+
+
+class RankByTasteTests(SimpleTestCase):
+    genre_map = {1: "Drama", 2: "Comedy"}
+
+    def item(self, id, vote_average, media_type="movie", year=2000, genre_ids=()):
+        return TMDBItem(id, media_type, f"Title {id}", vote_average=vote_average,
+                        year=year, genre_ids=genre_ids)
+
+    def profile(self, genres=None, decades=None, movies_count=0, series_count=0):
+        return TasteProfile(genres=genres or {}, decades=decades or {},
+                            movies_count=movies_count, series_count=series_count)
+
+    def test_without_profile_ranks_by_rating(self):
+        items = [self.item(1, 6.0), self.item(2, None), self.item(3, 8.0)]
+        self.assertEqual([i.id for i in rank_by_taste(items, None, self.genre_map)], [3, 1, 2])
+
+    def test_liked_genre_beats_higher_rating(self):
+        items = [self.item(1, 9.0, genre_ids=[1]), self.item(2, 7.0, genre_ids=[2])]
+        profile = self.profile(genres={"Comedy": 1.0, "Drama": -1.0})
+        self.assertEqual([i.id for i in rank_by_taste(items, profile, self.genre_map)], [2, 1])
+
+    def test_preferred_type_and_decade(self):
+        profile = self.profile(decades={"1990": 3, "2010": 1}, movies_count=1, series_count=3)
+        by_type = [self.item(1, 7.0, "movie"), self.item(2, 7.0, "tv")]
+        self.assertEqual([i.id for i in rank_by_taste(by_type, profile, self.genre_map)], [2, 1])
+        by_decade = [self.item(1, 7.0, year=2015), self.item(2, 7.0, year=1994)]
+        self.assertEqual([i.id for i in rank_by_taste(by_decade, profile, self.genre_map)], [2, 1])
+
+
+class RefreshTasteProfilesTests(TestCase):
+    def setUp(self):
+        self.alice, self.bob = make_user("alice"), make_user("bob")
+        drama, comedy = Genre.objects.create(name="Drama"), Genre.objects.create(name="Comedy")
+
+        loved = Film.objects.create(title="Loved", start_year=1994)
+        loved.genres.add(drama)
+        dropped = Film.objects.create(title="Dropped", start_year=2015, type="series")
+        dropped.genres.add(comedy)
+        hated = Film.objects.create(title="Hated", start_year=1999)
+        hated.genres.add(drama, comedy)
+
+        WatchStatus.objects.create(user=self.alice, film=loved, status="watched")
+        WatchStatus.objects.create(user=self.alice, film=dropped, status="dropped")
+        WatchStatus.objects.create(user=self.alice, film=hated, status="planned")
+        Review.objects.create(user=self.alice, film=loved, rating=10)
+        Review.objects.create(user=self.alice, film=hated, rating=1)
+
+    def test_profiles_are_rebuilt_from_library(self):
+        TasteProfile.objects.create(user=self.bob, genres={"Drama": 1.0}, movies_count=5)
+
+        self.assertEqual(refresh_taste_profiles([self.alice.pk, self.bob.pk], batch_size=1), 2)
+
+        alice = TasteProfile.objects.get(user=self.alice)
+        # Drama: two films in the library, reviews 10 and 1 cancel out;
+        # Comedy: one kept, one dropped, one review of 1
+        self.assertEqual(list(alice.genres.items()), [("Drama", 1.0), ("Comedy", -0.5)])
+        self.assertEqual(alice.decades, {"1990": 2})
+        self.assertEqual((alice.movies_count, alice.series_count), (2, 0))
+
+        bob = TasteProfile.objects.get(user=self.bob)
+        self.assertEqual((bob.genres, bob.decades, bob.movies_count), ({}, {}, 0))
+
+    def test_summary_lists_liked_genres_and_shares(self):
+        refresh_taste_profiles([self.alice.pk])
+        self.assertEqual(summarize_taste(TasteProfile.objects.get(user=self.alice)), {
+            "genres": [("Drama", 100)],
+            "decades": [("1990s", 100)],
+            "movie_share": 100,
+            "series_share": 0,
+        })
+        self.assertIsNone(summarize_taste(None))
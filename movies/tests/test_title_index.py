@@ -0,0 +1,113 @@
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+
+from movies import title_index
+from movies.models import Film, FilmStats
+from movies.tmdb_types import TMDBItem
+
+from . import requires_redis
+
+PREFIX = "cinema_tracker:test:titles"
+
+
+class NormalizeTitleTests(SimpleTestCase):
+    def test_strips_accents_punctuation_and_case(self):
+        self.assertEqual(title_index.normalize_title("  Amélie: Le Fabuleux  Destin! "),
+                         "amelie le fabuleux destin")
+
+
+@requires_redis
+class TitleIndexTests(TestCase):
+    def setUp(self):
+        for name in ("LEX_KEY", "META_KEY", "POPULARITY_KEY", "TOP_KEY"):
+            patcher = mock.patch.object(title_index, name, f"{PREFIX}:{name.lower()}")
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(self._delete_keys)
+
+    def _delete_keys(self):
+        conn = get_redis_connection("default")
+        keys = list(conn.scan_iter(match=PREFIX + ":*"))
+        if keys:
+            conn.delete(*keys)
+
+    def film(self, title, watchers=0, tmdb_id=None):
+        film = Film.objects.create(title=title, tmdb_id=tmdb_id, start_year=2000)
+        if watchers:
+            FilmStats.objects.create(film=film, watchers_count=watchers)
+        return film
+
+    def titles(self, query, limit=10):
+        return [entry["title"] for entry in title_index.search_titles(query, limit=limit)]
+
+    def test_search_ranks_by_popularity_and_matches_any_word(self):
+        self.film("Gods of Egypt")
+        self.film("Godzilla", watchers=1)
+        self.film("The Godfather", watchers=10)
+        title_index.rebuild_title_index()
+
+        self.assertEqual(self.titles("god"), ["The Godfather", "Godzilla", "Gods of Egypt"])
+        self.assertEqual(self.titles("GODF"), ["The Godfather"])
+        self.assertEqual(self.titles("g"), [])
+
+    def test_short_prefix_finds_popular_titles_beyond_the_lex_candidates(self):
+        for title in ("Star A", "Star B", "Star C"):
+            self.film(title)
+        self.film("Star Z", watchers=5)
+        title_index.rebuild_title_index()
+
+        with mock.patch.object(title_index, "CANDIDATES", 2):
+            self.assertEqual(self.titles("sta", limit=1), ["Star Z"])
+
+    def test_feed_items_do_not_replace_imported_films(self):
+        film = self.film("Alien", tmdb_id=348)
+        title_index.index_film(film)
+        title_index.index_tmdb_items([
+            TMDBItem(348, "movie", "Alien (feed)", year=1979),
+            TMDBItem(349, "movie", "Aliens", year=1986),
+        ])
+        entries = {e["title"]: e for e in title_index.search_titles("alien")}
+        self.assertEqual(entries["Alien"]["film_id"], film.id)
+        self.assertIsNone(entries["Aliens"]["film_id"])
+        self.assertNotIn("Alien (feed)", entries)
+
+    def test_rebuild_drops_stale_entries(self):
+        film = self.film("Heat")
+        title_index.index_film(film)
+        film.delete()
+        title_index.rebuild_title_index()
+        self.assertEqual(self.titles("heat"), [])
+
+
+class AutocompleteViewTests(TestCase):
+    url = reverse("search_autocomplete")
+
+    @mock.patch("movies.views.search_titles", return_value=[])
+    def test_limit_is_clamped(self, search_titles):
+        self.client.get(self.url, {"q": "god", "limit": "-5"})
+        self.client.get(self.url, {"q": "god", "limit": "500"})
+        self.client.get(self.url, {"q": "god", "limit": "many"})
+        self.assertEqual(
+            [call.kwargs["limit"] for call in search_titles.call_args_list], [1, 20, 10],
+        )
+
+    @mock.patch("movies.views.search_titles", side_effect=RedisError)
+    def test_no_suggestions_without_redis(self, search_titles):
+        response = self.client.get(self.url, {"q": "god"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"query": "god", "results": []})
+
+    @mock.patch("movies.views.search_titles")
+    def test_returns_public_fields_only(self, search_titles):
+        search_titles.return_value = [{
+            "key": "1", "title": "Film", "year": 2000, "media_type": "movie",
+            "film_id": 7, "popularity": 3,
+        }]
+        response = self.client.get(self.url, {"q": "fil"})
+        self.assertEqual(response.json()["results"], [
+            {"title": "Film", "year": 2000, "media_type": "movie", "film_id": 7},
+        ])
@@ -0,0 +1,131 @@
+import json
+import tempfile
+from datetime import date, timedelta
+from pathlib import Path
+from unittest import mock
+
+from celery.exceptions import Retry
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from requests import ConnectionError, HTTPError, Response
+
+from movies import services_tmdb, tasks
+from movies.models import Film
+
+from . import LOCMEM_CACHES
+
+
+def _http_error(status_code):
+    response = Response()
+    response.status_code = status_code
+    return HTTPError(response=response)
+
+
+class TMDBChangesTests(TestCase):
+    @mock.patch("movies.services_tmdb.CHANGES_MAX_PAGES", 2)
+    @mock.patch("movies.services_tmdb.tmdb_get_changes")
+    def test_changes_are_paged_up_to_the_limit(self, get_changes):
+        get_changes.side_effect = [
+            {"total_pages": 3, "results": [{"id": 1}, {"id": None}]},
+            {"total_pages": 3, "results": [{"id": 2}]},
+        ]
+        start, end = date(2026, 1, 1), date(2026, 1, 2)
+
+        self.assertEqual(list(services_tmdb.iter_tmdb_changes("movie", start, end)), [1, 2])
+        get_changes.assert_called_with("movie", start, end, page=2)
+
+    def test_changes_from_fixture(self):
+        with tempfile.TemporaryDirectory() as directory:
+            fixture = Path(directory) / "changes.json"
+            fixture.write_text(json.dumps({"movie": [1, 2, 2], "tv": [3]}))
+            with override_settings(TMDB_CHANGES_FIXTURE=str(fixture)):
+                changes = services_tmdb.get_tmdb_changes(date(2026, 1, 1), date(2026, 1, 2))
+        self.assertEqual(changes, {"movie": {1, 2}, "tv": {3}})
+
+    def test_changed_films_match_tmdb_id_and_type(self):
+        movie = Film.objects.create(title="Movie", tmdb_id=1)
+        series = Film.objects.create(title="Series", tmdb_id=2, type="series")
+        Film.objects.create(title="Unchanged", tmdb_id=3)
+
+        self.assertEqual(
+            services_tmdb.find_changed_films({"movie": {1, 2, 99}, "tv": {2}}),
+            [movie.id, series.id],
+        )
+        self.assertEqual(services_tmdb.find_changed_films({"movie": set(), "tv": {1}}), [])
+
+    @mock.patch("movies.services_tmdb.fetch_movie_details")
+    def test_refresh_overwrites_films_and_reports_transient_failures(self, fetch):
+        refreshed = Film.objects.create(title="Old title", tmdb_id=1)
+        gone = Film.objects.create(title="Gone", tmdb_id=2)
+        unreachable = Film.objects.create(title="Unreachable", tmdb_id=3)
+
+        def fake_fetch(tmdb_id, media_type):
+            if tmdb_id == 2:
+                raise _http_error(404)
+            if tmdb_id == 3:
+                raise ConnectionError()
+            return {"id": 1, "title": "New title", "overview": "Updated", "genres": [{"id": 18, "name": "Drama"}]}
+
+        fetch.side_effect = fake_fetch
+        self.assertEqual(
+            services_tmdb.refresh_films([refreshed.id, gone.id, unreachable.id]), (1, [unreachable.id]),
+        )
+        refreshed.refresh_from_db()
+        self.assertEqual((refreshed.title, refreshed.description), ("New title", "Updated"))
+        self.assertEqual(list(refreshed.genres.values_list("name", flat=True)), ["Drama"])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+@mock.patch("movies.tasks.refresh_films_batch")
+@mock.patch("movies.tasks.get_tmdb_changes")
+class SyncTMDBChangesTaskTests(TestCase):
+    def tearDown(self):
+        cache.clear()
+
+    def test_changed_films_are_refreshed_in_batches(self, get_changes, refresh_batch):
+        films = [Film.objects.create(title=f"Film {i}", tmdb_id=i) for i in range(1, 4)]
+        get_changes.return_value = {"movie": {1, 2, 3, 4}, "tv": set()}
+
+        with mock.patch("movies.tasks.REFRESH_BATCH_SIZE", 2):
+            tasks.sync_tmdb_changes()
+
+        self.assertEqual(
+            [call.args[0] for call in refresh_batch.delay.call_args_list],
+            [[films[0].id, films[1].id], [films[2].id]],
+        )
+        today = timezone.now().date()
+        get_changes.assert_called_once_with(today - timedelta(days=1), today)
+        self.assertEqual(cache.get(tasks.CHANGES_CHECKPOINT_KEY), today)
+
+    def test_sync_starts_from_checkpoint_within_the_feed_window(self, get_changes, refresh_batch):
+        get_changes.return_value = {"movie": set(), "tv": set()}
+        today = timezone.now().date()
+
+        cache.set(tasks.CHANGES_CHECKPOINT_KEY, today - timedelta(days=3))
+        tasks.sync_tmdb_changes()
+        self.assertEqual(get_changes.call_args.args[0], today - timedelta(days=3))
+
+        cache.set(tasks.CHANGES_CHECKPOINT_KEY, today - timedelta(days=365))
+        tasks.sync_tmdb_changes()
+        self.assertEqual(
+            get_changes.call_args.args[0], today - timedelta(days=tasks.CHANGES_MAX_DAYS - 1),
+        )
+
+    def test_checkpoint_is_kept_when_tmdb_is_unavailable(self, get_changes, refresh_batch):
+        checkpoint = timezone.now().date() - timedelta(days=2)
+        cache.set(tasks.CHANGES_CHECKPOINT_KEY, checkpoint)
+        get_changes.side_effect = ConnectionError
+
+        tasks.sync_tmdb_changes()
+
+        self.assertEqual(cache.get(tasks.CHANGES_CHECKPOINT_KEY), checkpoint)
+        refresh_batch.delay.assert_not_called()
+
+
+class RefreshFilmsBatchTaskTests(TestCase):
+    @mock.patch("movies.tasks.refresh_films", return_value=(1, [7]))
+    def test_failed_films_are_retried(self, refresh):
+        with self.assertRaises(Retry):
+            tasks.refresh_films_batch([6, 7])
+        refresh.assert_called_once_with([6, 7])
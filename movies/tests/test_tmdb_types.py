@@ -0,0 +1,58 @@
+import pickle
+
+from django.test import SimpleTestCase
+
+from movies.tmdb_types import TMDBCard, TMDBItem, items_from_tmdb, pack_items, unpack_items
+
+
+class TMDBItemTests(SimpleTestCase):
+    def test_from_search_result(self):
+        item = TMDBItem.from_tmdb({
+            "id": 1, "media_type": "tv", "name": "Show", "first_air_date": "2019-05-01",
+            "vote_average": 8.1, "genre_ids": [18, 35], "extra": "dropped",
+        })
+        self.assertEqual(
+            item.to_tuple(), (1, "tv", "Show", None, 8.1, 2019, "", (18, 35)),
+        )
+
+    def test_from_details_uses_genres_and_given_media_type(self):
+        item = TMDBItem.from_tmdb(
+            {"id": 2, "title": "Film", "release_date": "", "genres": [{"id": 28, "name": "Action"}]},
+            media_type="movie",
+        )
+        self.assertEqual((item.media_type, item.year, item.genre_ids), ("movie", None, (28,)))
+
+    def test_is_immutable(self):
+        item = TMDBItem(1, "movie", "Film")
+        with self.assertRaises(AttributeError):
+            item.title = "Other"
+        with self.assertRaises(AttributeError):
+            del item.title
+
+    def test_pack_and_pickle_round_trip(self):
+        items = [TMDBItem(1, "movie", "Film", vote_average=7.0), TMDBItem(2, "tv", "Show")]
+        self.assertEqual(unpack_items(pack_items(items)), items)
+        self.assertEqual(pickle.loads(pickle.dumps(items[0])), items[0])
+
+    def test_fingerprint_changes_with_rendered_fields(self):
+        self.assertNotEqual(
+            TMDBItem(1, "movie", "Film").fingerprint,
+            TMDBItem(1, "movie", "Film (restored)").fingerprint,
+        )
+
+    def test_items_from_tmdb_skips_people_and_broken_entries(self):
+        items = items_from_tmdb([
+            {"id": 1, "media_type": "movie", "title": "Film"},
+            {"id": 2, "media_type": "person", "name": "Actor"},
+            {"title": "No id"},
+        ])
+        self.assertEqual([item.id for item in items], [1])
+
+
+class TMDBCardTests(SimpleTestCase):
+    def test_overlays_user_fields_on_the_shared_item(self):
+        item = TMDBItem(1, "movie", "Film")
+        card = TMDBCard(item, film_id=5, user_status="watched")
+        self.assertEqual((card.title, card.film_id, card.user_status), ("Film", 5, "watched"))
+        self.assertTrue(card.in_database)
+        self.assertFalse(TMDBCard(item).in_database)
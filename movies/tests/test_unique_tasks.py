@@ -0,0 +1,52 @@
+from unittest import mock
+
+from celery import Task
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from config.celery import app
+from movies.tasks import update_film_stats, update_trending_cache
+
+from . import LOCMEM_CACHES
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+@mock.patch.object(Task, "apply_async")
+class UniqueTaskTests(SimpleTestCase):
+    def tearDown(self):
+        cache.clear()
+
+    def test_repeated_triggers_return_the_queued_task(self, apply_async):
+        first = update_film_stats.delay([1, 2])
+        second = update_film_stats.delay([1, 2])
+
+        apply_async.assert_called_once()
+        task_id = apply_async.call_args.kwargs["task_id"]
+        self.assertIs(first, apply_async.return_value)
+        self.assertEqual(second.id, task_id)
+
+    def test_different_arguments_are_queued_separately(self, apply_async):
+        update_film_stats.delay([1])
+        update_film_stats.delay([2])
+        update_trending_cache.delay()
+        self.assertEqual(apply_async.call_count, 3)
+
+    def test_started_task_releases_the_lock(self, apply_async):
+        update_film_stats.delay([1])
+        update_film_stats.before_start("task-id", ([1],), {})
+        update_film_stats.delay([1])
+        self.assertEqual(apply_async.call_count, 2)
+
+
+class TaskRoutingTests(SimpleTestCase):
+    def test_routes_and_schedule_name_existing_tasks_and_queues(self):
+        app.loader.import_default_modules()
+        queues = {queue.name for queue in app.conf.task_queues}
+        for name, route in app.conf.task_routes.items():
+            with self.subTest(task=name):
+                self.assertIn(name, app.tasks)
+                self.assertIn(route["queue"], queues)
+        for entry in app.conf.beat_schedule.values():
+            with self.subTest(task=entry["task"]):
+                self.assertIn(entry["task"], app.tasks)
+        self.assertIn(app.conf.task_default_queue, queues)
@@ -0,0 +1,83 @@
+"""
+Activity timelines stored in Redis (fan-out on write).
+
+Every activity id is pushed to the timeline of its author and to the global
+"recent activity" timeline. Timelines are capped lists of ids, newest first,
+so reading a page is one LRANGE plus one query that hydrates the
+activities with their films.
+
+If a timeline is missing (Redis flushed, new user), reads fall back to the
+Activity table.
+"""
+
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+
+from .models import Activity
+
+USER_TIMELINE_KEY = "cinema_tracker:timeline:user:{user_id}"
+GLOBAL_TIMELINE_KEY = "cinema_tracker:timeline:global"
+USER_TIMELINE_LENGTH = 500
+GLOBAL_TIMELINE_LENGTH = 1000
+
+
+def push_to_timelines(activities):
+    """
+    Push activities to the author and global timelines.
+
+    activities: iterable of (activity_id, user_id), oldest first.
+    """
+    conn = get_redis_connection("default")
+    pipe = conn.pipeline(transaction=False)
+    user_keys = set()
+    global_ids = []
+    for activity_id, user_id in activities:
+        key = USER_TIMELINE_KEY.format(user_id=user_id)
+        pipe.lpush(key, activity_id)
+        user_keys.add(key)
+        global_ids.append(activity_id)
+
+    for key in user_keys:
+        pipe.ltrim(key, 0, USER_TIMELINE_LENGTH - 1)
+    if global_ids:
+        pipe.lpush(GLOBAL_TIMELINE_KEY, *global_ids)
+        pipe.ltrim(GLOBAL_TIMELINE_KEY, 0, GLOBAL_TIMELINE_LENGTH - 1)
+    pipe.execute()
+
+
+def _hydrate(activity_ids):
+    """Load activities with films in one query, keeping timeline order."""
+    by_id = Activity.objects.select_related("film", "user").in_bulk(activity_ids)
+    return [by_id[i] for i in activity_ids if i in by_id]
+
+
+def _read_timeline(key, page, per_page):
+    start = (page - 1) * per_page
+    try:
+        raw_ids = get_redis_connection("default").lrange(key, start, start + per_page - 1)
+    except RedisError:
+        return None
+    if not raw_ids and page == 1:
+        return None
+    return _hydrate([int(i) for i in raw_ids])
+
+
+def get_user_activity(*, user, page=1, per_page=20):
+    """Returns a page of user's activities (newest first)."""
+    activities = _read_timeline(USER_TIMELINE_KEY.format(user_id=user.pk), page, per_page)
+    if activities is None:
+        start = (page - 1) * per_page
+        activities = list(
+            Activity.objects.filter(user=user)
+            .select_related("film", "user")[start:start + per_page]
+        )
+    return activities
+
+
+def get_recent_activity(*, page=1, per_page=20):
+    """Returns a page of site-wide recent activities (newest first)."""
+    activities = _read_timeline(GLOBAL_TIMELINE_KEY, page, per_page)
+    if activities is None:
+        start = (page - 1) * per_page
+        activities = list(Activity.objects.select_related("film", "user")[start:start + per_page])
+    return activities
@@ -0,0 +1,258 @@
+"""
+Prefix index of film titles for search autocomplete.
+
+Lives in Redis so every worker shares it:
+
+- titles:lex - sorted set, all scores 0, members "<normalized prefix text>\\0<key>".
+  Every title is indexed from each word, so "godf" finds "The Godfather".
+  ZRANGEBYLEX answers prefix queries in O(log n + m).
+- titles:meta - hash key -> JSON with title, year, media_type, film_id.
+- titles:popularity - sorted set key -> number of watchers (FilmStats).
+- titles:top - hash short prefix -> JSON list of the most popular keys
+  matching it. Short prefixes ("st", "the") match far more titles than a
+  query can rank, so their most popular matches are precomputed on rebuild;
+  longer prefixes are selective enough to rank all lex matches.
+
+The key is the TMDB id (or "film:<id>" for local films without one), so a
+film imported from a feed replaces the feed-only entry.
+
+Films are added on import and feed titles on every feed refresh. A periodic
+rebuild refreshes popularity and drops stale entries.
+"""
+
+import heapq
+import json
+import re
+import unicodedata
+
+from django.db.models.functions import Coalesce
+from django_redis import get_redis_connection
+
+from .models import Film
+
+LEX_KEY = "cinema_tracker:titles:lex"
+META_KEY = "cinema_tracker:titles:meta"
+POPULARITY_KEY = "cinema_tracker:titles:popularity"
+TOP_KEY = "cinema_tracker:titles:top"
+
+MIN_QUERY_LENGTH = 2
+# Lex matches read per round trip
+CANDIDATES = 50
+# Prefixes up to this length use the precomputed titles:top lists ...
+TOP_PREFIX_LENGTH = 4
+TOP_PER_PREFIX = 20
+# ... longer ones rank up to this many lex matches
+MAX_CANDIDATES = 1000
+# Index at most this many word suffixes per title
+MAX_WORDS = 6
+
+_non_alnum = re.compile(r"[^\w]+")
+
+
+def normalize_title(title):
+    """Lowercase, strip accents and punctuation, collapse whitespace."""
+    title = unicodedata.normalize("NFKD", title)
+    title = "".join(ch for ch in title if not unicodedata.combining(ch))
+    return " ".join(_non_alnum.sub(" ", title.casefold()).split())
+
+
+def _entry_key(tmdb_id=None, film_id=None):
+    return str(tmdb_id) if tmdb_id else f"film:{film_id}"
+
+
+def _top_prefixes(title):
+    """Short prefixes (of every indexed word suffix) the title is found by."""
+    words = normalize_title(title).split()
+    prefixes = set()
+    for i in range(min(len(words), MAX_WORDS)):
+        text = " ".join(words[i:])
+        for length in range(MIN_QUERY_LENGTH, min(len(text), TOP_PREFIX_LENGTH) + 1):
+            prefix = text[:length].rstrip()
+            if len(prefix) >= MIN_QUERY_LENGTH:
+                prefixes.add(prefix)
+    return prefixes
+
+
+def _lex_members(title, key):
+    words = normalize_title(title).split()
+    return {
+        f"{' '.join(words[i:])}\0{key}": 0
+        for i in range(min(len(words), MAX_WORDS))
+    }
+
+
+def _add(pipe, *, key, title, year, media_type, film_id, overwrite=True):
+    members = _lex_members(title, key)
+    if not members:
+        return
+    meta = json.dumps({
+        "title": title,
+        "year": year,
+        "media_type": media_type,
+        "film_id": film_id,
+    })
+    pipe.zadd(LEX_KEY, members)
+    if overwrite:
+        pipe.hset(META_KEY, key, meta)
+    else:
+        pipe.hsetnx(META_KEY, key, meta)
+
+
+def _film_media_type(film_type):
+    return "tv" if film_type == "series" else "movie"
+
+
+def index_film(film):
+    """Add or update a film from our DB."""
+    pipe = get_redis_connection("default").pipeline(transaction=False)
+    _add(
+        pipe,
+        key=_entry_key(film.tmdb_id, film.id),
+        title=film.title,
+        year=film.start_year,
+        media_type=_film_media_type(film.type),
+        film_id=film.id,
+    )
+    pipe.execute()
+
+
+def index_tmdb_items(items):
+    """Add TMDB feed items; entries of films already in our DB are kept."""
+    pipe = get_redis_connection("default").pipeline(transaction=False)
+    for item in items:
+        _add(
+            pipe,
+            key=_entry_key(item.id),
+            title=item.title,
+            year=item.year,
+            media_type=item.media_type,
+            film_id=None,
+            overwrite=False,
+        )
+    pipe.execute()
+
+
+def rebuild_title_index(extra_items=(), batch_size=2000):
+    """
+    Rebuild the whole index from the Film table (with popularity) plus
+    extra TMDB items, then atomically swap it in.
+    """
+    conn = get_redis_connection("default")
+    tmp = {key: f"{key}:rebuild" for key in (LEX_KEY, META_KEY, POPULARITY_KEY, TOP_KEY)}
+    conn.delete(*tmp.values())
+
+    films = (
+        Film.objects.annotate(watchers_count=Coalesce("stats__watchers_count", 0))
+        .values_list("id", "tmdb_id", "title", "start_year", "type", "watchers_count")
+        .iterator(chunk_size=batch_size)
+    )
+
+    pipe = conn.pipeline(transaction=False)
+    count = 0
+    top = {}  # prefix -> min-heap of (watchers_count, key), at most TOP_PER_PREFIX
+    for film_id, tmdb_id, title, year, film_type, watchers_count in films:
+        key = _entry_key(tmdb_id, film_id)
+        members = _lex_members(title, key)
+        if not members:
+            continue
+        pipe.zadd(tmp[LEX_KEY], members)
+        pipe.hset(tmp[META_KEY], key, json.dumps({
+            "title": title,
+            "year": year,
+            "media_type": _film_media_type(film_type),
+            "film_id": film_id,
+        }))
+        if watchers_count:
+            pipe.zadd(tmp[POPULARITY_KEY], {key: watchers_count})
+            for prefix in _top_prefixes(title):
+                heap = top.setdefault(prefix, [])
+                if len(heap) < TOP_PER_PREFIX:
+                    heapq.heappush(heap, (watchers_count, key))
+                else:
+                    heapq.heappushpop(heap, (watchers_count, key))
+        count += 1
+        if count % batch_size == 0:
+            pipe.execute()
+
+    for item in extra_items:
+        key = _entry_key(item.id)
+        members = _lex_members(item.title, key)
+        if not members:
+            continue
+        pipe.zadd(tmp[LEX_KEY], members)
+        pipe.hsetnx(tmp[META_KEY], key, json.dumps({
+            "title": item.title,
+            "year": item.year,
+            "media_type": item.media_type,
+            "film_id": None,
+        }))
+        count += 1
+    pipe.execute()
+
+    prefixes = list(top)
+    for i in range(0, len(prefixes), batch_size):
+        conn.hset(tmp[TOP_KEY], mapping={
+            prefix: json.dumps([key for _, key in sorted(top[prefix], reverse=True)])
+            for prefix in prefixes[i:i + batch_size]
+        })
+
+    pipe = conn.pipeline(transaction=True)
+    for key, tmp_key in tmp.items():
+        if conn.exists(tmp_key):
+            pipe.rename(tmp_key, key)
+        else:
+            pipe.delete(key)
+    pipe.execute()
+    return count
+
+
+def search_titles(query, limit=10):
+    """
+    Return up to `limit` titles starting with query (at any word), most
+    popular first, as dicts with key/title/year/media_type/film_id.
+    """
+    prefix = normalize_title(query)
+    if len(prefix) < MIN_QUERY_LENGTH:
+        return []
+
+    conn = get_redis_connection("default")
+    # Lex ranges compare raw bytes; 0xff sorts after any UTF-8 continuation
+    encoded = prefix.encode()
+    lex_range = (LEX_KEY, b"[" + encoded, b"[" + encoded + b"\xff")
+    short = len(prefix) <= TOP_PREFIX_LENGTH
+
+    pipe = conn.pipeline(transaction=False)
+    pipe.hget(TOP_KEY, prefix)
+    pipe.zrangebylex(*lex_range, start=0, num=CANDIDATES)
+    top, members = pipe.execute()
+
+    # Short prefix: its most popular titles are precomputed, lex matches only
+    # fill up with unpopular ones. Longer prefix: rank all (bounded) matches.
+    page = members
+    while not short and len(page) == CANDIDATES and len(members) < MAX_CANDIDATES:
+        page = conn.zrangebylex(*lex_range, start=len(members), num=CANDIDATES)
+        members += page
+
+    keys = list(dict.fromkeys([
+        *(json.loads(top) if top else ()),
+        *(m.decode().rsplit("\0", 1)[1] for m in members),
+    ]))
+    if not keys:
+        return []
+
+    pipe = conn.pipeline(transaction=False)
+    pipe.zmscore(POPULARITY_KEY, keys)
+    pipe.hmget(META_KEY, keys)
+    scores, metas = pipe.execute()
+
+    results = []
+    for key, score, meta in zip(keys, scores, metas):
+        if meta is None:
+            continue
+        entry = json.loads(meta)
+        entry["key"] = key
+        entry["popularity"] = int(score or 0)
+        results.append(entry)
+
+    results.sort(key=lambda e: (-e["popularity"], len(e["title"])))
+    return results[:limit]
@@ -2,97 +2,164 @@
 Low-level client for TMDB API.
 Contains functions for searching movies/series and fetching movie/series details.
 
-Uses the requests library for HTTP requests.
+Uses the requests library for HTTP requests. All calls go through a shared
+circuit breaker: while TMDB is down, calls fail immediately with
+TMDBUnavailable instead of waiting for the timeout.
+
+Identical concurrent search/detail calls are coalesced into one upstream
+request (see singleflight.py).
+
+Calls also take a token from the shared rate limiter. Code running in
+background jobs should wrap its calls in `with tmdb_background():` so that
+interactive requests keep priority.
 """
 
 import os
 import requests
 
+from .circuit_breaker import tmdb_breaker
+from .rate_limit import BACKGROUND, RateLimited, acquire, rate_limit_lane
+from .singleflight import singleflight
+
 TMDB_API_KEY = os.getenv("TMDB_API_KEY")
 TMDB_BASE_URL = "https://api.themoviedb.org/3"
+TMDB_TIMEOUT = 5
 
-def tmdb_search_movie(query):
-    """Search movies/series by title"""
-    url = f"{TMDB_BASE_URL}/search/multi"
-    params = {
-        "api_key": TMDB_API_KEY,
-        "query": query,
-        "include_adult": False,
-    }
 
+class TMDBUnavailable(requests.RequestException):
+    """TMDB is not reachable (circuit open)."""
+
+
+class TMDBRateLimited(requests.RequestException):
+    """Our outbound TMDB budget is exhausted."""
+
+
+def tmdb_background():
+    """Context manager: account TMDB calls to the background lane."""
+    return rate_limit_lane(BACKGROUND)
+
+
+def tmdb_is_available():
+    """False while the circuit breaker is open."""
+    return not tmdb_breaker.is_open()
+
+
+def _tmdb_get(path, params=None):
+    """
+    GET a TMDB endpoint and return the decoded JSON.
+
+    Timeouts, connection errors, 429 and 5xx responses count as failures
+    for the circuit breaker; other 4xx responses (e.g. unknown id) do not.
+    Raises requests.RequestException (TMDBUnavailable if the circuit is open,
+    TMDBRateLimited if no rate limit token is available).
+    """
+    if tmdb_breaker.is_open():
+        raise TMDBUnavailable("TMDB circuit is open")
+
+    # Token first: a caller that takes the half-open probe must actually
+    # make the request, or the circuit would stay shut for another cooldown
     try:
-        resp = requests.get(url, params=params, timeout=5)
-        resp.raise_for_status()
-    except requests.RequestException as e:
-        return []
+        acquire()
+    except RateLimited as e:
+        raise TMDBRateLimited(str(e)) from e
 
-    data = resp.json()
-    return data.get("results", [])
+    if not tmdb_breaker.allow_request():
+        raise TMDBUnavailable("TMDB circuit is open")
+
+    params = {"api_key": TMDB_API_KEY, **(params or {})}
+
+    try:
+        resp = requests.get(f"{TMDB_BASE_URL}{path}", params=params, timeout=TMDB_TIMEOUT)
+    except requests.RequestException:
+        tmdb_breaker.record_failure()
+        raise
+
+    # Throttling by TMDB means it can't take our load right now
+    if resp.status_code >= 500 or resp.status_code == 429:
+        tmdb_breaker.record_failure()
+    else:
+        tmdb_breaker.record_success()
 
-def tmdb_get_movie_details(tmdb_id, media_type="movie"):
-    """Get movie/series details by TMDB ID"""
-    url = f"{TMDB_BASE_URL}/{media_type}/{tmdb_id}"
-    params = {"api_key": TMDB_API_KEY}
-    resp = requests.get(url, params=params)
     resp.raise_for_status()
     return resp.json()
 
 
-def tmdb_get_trending(media_type="all", time_window="week"):
-    """Get trending movies/TV shows (media_type: all/movie/tv, time_window: day/week)"""
-    url = f"{TMDB_BASE_URL}/trending/{media_type}/{time_window}"
-    params = {"api_key": TMDB_API_KEY}
-    
+def _tmdb_get_results(path, params=None):
+    """GET a paginated TMDB list endpoint, returning [] on any error"""
     try:
-        resp = requests.get(url, params=params, timeout=5)
-        resp.raise_for_status()
+        data = _tmdb_get(path, params)
     except requests.RequestException:
         return []
-    
-    data = resp.json()
     return data.get("results", [])
 
 
+def tmdb_search_movie(query):
+    """Search movies/series by title"""
+    query = " ".join(query.split())
+    return singleflight(
+        f"tmdb:search:{query.casefold()}",
+        lambda: _tmdb_get_results("/search/multi", {
+            "query": query,
+            "include_adult": False,
+        }),
+    )
+
+
+def tmdb_get_movie_details(tmdb_id, media_type="movie"):
+    """
+    Get movie/series details by TMDB ID.
+
+    Raises requests.RequestException if TMDB is unreachable or returns an error.
+    """
+    return singleflight(
+        f"tmdb:details:{media_type}:{tmdb_id}",
+        lambda: _tmdb_get(f"/{media_type}/{tmdb_id}"),
+    )
+
+
+def tmdb_get_trending(media_type="all", time_window="week"):
+    """Get trending movies/TV shows (media_type: all/movie/tv, time_window: day/week)"""
+    return _tmdb_get_results(f"/trending/{media_type}/{time_window}")
+
+
 def tmdb_get_popular(media_type="movie"):
     """Get popular movies or TV shows (media_type: movie/tv)"""
-    url = f"{TMDB_BASE_URL}/{media_type}/popular"
-    params = {"api_key": TMDB_API_KEY}
-    
-    try:
-        resp = requests.get(url, params=params, timeout=5)
-        resp.raise_for_status()
-    except requests.RequestException:
-        return []
-    
-    data = resp.json()
-    return data.get("results", [])
+    return _tmdb_get_results(f"/{media_type}/popular")
 
 
 def tmdb_get_top_rated(media_type="movie"):
     """Get top rated movies or TV shows (media_type: movie/tv)"""
-    url = f"{TMDB_BASE_URL}/{media_type}/top_rated"
-    params = {"api_key": TMDB_API_KEY}
-    
-    try:
-        resp = requests.get(url, params=params, timeout=5)
-        resp.raise_for_status()
-    except requests.RequestException:
-        return []
-    
-    data = resp.json()
-    return data.get("results", [])
+    return _tmdb_get_results(f"/{media_type}/top_rated")
 
 
 def tmdb_get_similar(tmdb_id, media_type="movie"):
-    """Get similar movies or TV shows (media_type: movie/tv)"""
-    url = f"{TMDB_BASE_URL}/{media_type}/{tmdb_id}/similar"
-    params = {"api_key": TMDB_API_KEY}
-    
-    try:
-        resp = requests.get(url, params=params, timeout=5)
-        resp.raise_for_status()
-    except requests.RequestException:
-        return []
-    
-    data = resp.json()
-    return data.get("results", [])
+    """
+    Get similar movies or TV shows (media_type: movie/tv).
+
+    Raises requests.RequestException if TMDB is unreachable or returns an error.
+    """
+    return _tmdb_get(f"/{media_type}/{tmdb_id}/similar").get("results", [])
+
+
+def tmdb_get_changes(media_type="movie", start_date=None, end_date=None, page=1):
+    """
+    Get one page of ids changed between start_date and end_date
+    (media_type: movie/tv; the range can't exceed 14 days).
+
+    Raises requests.RequestException if TMDB is unreachable or returns an error.
+    """
+    params = {"page": page}
+    if start_date:
+        params["start_date"] = start_date.isoformat()
+    if end_date:
+        params["end_date"] = end_date.isoformat()
+    return _tmdb_get(f"/{media_type}/changes", params)
+
+
+def tmdb_get_genres(media_type="movie"):
+    """
+    Get the official genre list ([{"id", "name"}]) for movies or TV shows.
+
+    Raises requests.RequestException if TMDB is unreachable or returns an error.
+    """
+    return _tmdb_get(f"/genre/{media_type}/list").get("genres", [])
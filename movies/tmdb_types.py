@@ -0,0 +1,121 @@
+"""
+Compact types for TMDB search/feed results.
+
+TMDBItem keeps only the fields our templates render and is immutable, so one
+cached copy can be shared by every request. Per-user data (watch status,
+library membership) goes into a TMDBCard overlay created per request.
+
+For the cache, lists of items are packed into tuples of plain values, which
+pickle much smaller than the raw TMDB dicts and the objects themselves.
+"""
+
+import hashlib
+
+
+class TMDBItem:
+    """Immutable TMDB movie/series result."""
+
+    __slots__ = (
+        "id", "media_type", "title", "poster_path", "vote_average", "year", "overview", "genre_ids",
+    )
+
+    def __init__(self, id, media_type, title, poster_path=None, vote_average=None, year=None,
+                 overview="", genre_ids=()):
+        genre_ids = tuple(genre_ids or ())
+        for name, value in zip(
+            self.__slots__,
+            (id, media_type, title, poster_path, vote_average, year, overview, genre_ids),
+        ):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("TMDBItem is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("TMDBItem is immutable")
+
+    def __reduce__(self):
+        return (self.__class__, self.to_tuple())
+
+    def __eq__(self, other):
+        if not isinstance(other, TMDBItem):
+            return NotImplemented
+        return self.to_tuple() == other.to_tuple()
+
+    def __hash__(self):
+        return hash(self.to_tuple())
+
+    def __repr__(self):
+        return f"<TMDBItem {self.media_type}:{self.id} {self.title!r}>"
+
+    @classmethod
+    def from_tmdb(cls, data, media_type=None):
+        """
+        Build an item from a raw TMDB result dict.
+
+        media_type is used for endpoints whose results don't carry it
+        (e.g. /movie/popular).
+        """
+        date = data.get("release_date") or data.get("first_air_date") or ""
+        return cls(
+            id=data.get("id"),
+            media_type=data.get("media_type") or media_type,
+            title=data.get("title") or data.get("name") or "",
+            poster_path=data.get("poster_path"),
+            vote_average=data.get("vote_average"),
+            year=int(date[:4]) if date[:4].isdigit() else None,
+            overview=data.get("overview") or "",
+            # Search/list results carry genre_ids, details carry genres
+            genre_ids=data.get("genre_ids") or [g["id"] for g in data.get("genres", ())],
+        )
+
+    @property
+    def fingerprint(self):
+        """Short hash of the rendered fields (for fragment cache keys)."""
+        return hashlib.md5(repr(self.to_tuple()).encode()).hexdigest()[:12]
+
+    def to_tuple(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    @classmethod
+    def from_tuple(cls, values):
+        return cls(*values)
+
+
+class TMDBCard:
+    """Per-request overlay of a shared TMDBItem with user-specific fields."""
+
+    __slots__ = ("item", "film_id", "user_status")
+
+    def __init__(self, item, film_id=None, user_status=None):
+        self.item = item
+        self.film_id = film_id
+        self.user_status = user_status
+
+    @property
+    def in_database(self):
+        return self.film_id is not None
+
+    def __getattr__(self, name):
+        # Only called for names not found on the card itself
+        if name == "item":
+            raise AttributeError(name)
+        return getattr(self.item, name)
+
+
+def items_from_tmdb(results, media_type=None):
+    """Convert raw TMDB results to TMDBItems, skipping people and broken entries."""
+    return [
+        TMDBItem.from_tmdb(data, media_type=media_type)
+        for data in results
+        if data.get("id") and data.get("media_type", media_type) != "person"
+    ]
+
+
+def pack_items(items):
+    """Pack items into a tuple of tuples for caching."""
+    return tuple(item.to_tuple() for item in items)
+
+
+def unpack_items(packed):
+    return [TMDBItem.from_tuple(values) for values in packed]
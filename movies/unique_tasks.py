@@ -0,0 +1,40 @@
+"""
+Base class for Celery tasks whose repeated triggers collapse into one run.
+
+While a task with the same name and arguments is waiting in the queue,
+further apply_async()/delay() calls don't enqueue anything and return the
+AsyncResult of the queued one. The lock is released when the task starts,
+so a trigger that arrives while it runs schedules exactly one more run
+(which will see the latest data).
+
+    @shared_task(base=UniqueTask)
+    def recompute_something(user_id): ...
+"""
+
+import hashlib
+import json
+
+from celery import Task
+from celery.utils import uuid
+from django.core.cache import cache
+
+
+class UniqueTask(Task):
+    # Upper bound for how long a queued task keeps the lock (e.g. lost messages)
+    unique_timeout = 60 * 60
+
+    def unique_key(self, args, kwargs):
+        payload = json.dumps([args or (), kwargs or {}], sort_keys=True, default=str)
+        return f"unique_task:{self.name}:{hashlib.md5(payload.encode()).hexdigest()}"
+
+    def apply_async(self, args=None, kwargs=None, task_id=None, **options):
+        key = self.unique_key(args, kwargs)
+        task_id = task_id or uuid()
+        if not cache.add(key, task_id, self.unique_timeout):
+            queued_id = cache.get(key)
+            if queued_id:
+                return self.AsyncResult(queued_id)
+        return super().apply_async(args, kwargs, task_id=task_id, **options)
+
+    def before_start(self, task_id, args, kwargs):
+        cache.delete(self.unique_key(args, kwargs))
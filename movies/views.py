@@ -1,21 +1,48 @@
-from django.views.decorators.http import require_POST
+import json
+from django.conf import settings
+from django.views.decorators.http import require_POST, condition
+from django.utils.cache import patch_cache_control
 from django.shortcuts import render, redirect, get_object_or_404
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Avg
+from django.db.models import F, FloatField
+from django.db.models.functions import Cast, NullIf
 from urllib.parse import urlencode
-from .tmdb_client import tmdb_search_movie, tmdb_get_movie_details
-from .services_tmdb import import_tmdb_movie
-from .services import set_watch_status, get_film_rating_stats, get_user_recommendations
+from redis.exceptions import RedisError
+from requests import RequestException
+from .tmdb_client import tmdb_search_movie, tmdb_is_available
+from .services_tmdb import (
+    import_tmdb_movie,
+    import_tmdb_item,
+    get_movie_details,
+    cache_tmdb_items,
+    get_cached_tmdb_item,
+)
+from .tasks import enqueue, refresh_films_batch
+from .services import (
+    set_watch_status,
+    save_review,
+    bulk_upsert_library,
+    get_film_rating_stats,
+    get_user_recommendations,
+    get_user_statuses_by_tmdb_id,
+)
+from .tmdb_types import TMDBItem, TMDBCard, items_from_tmdb
+from .title_index import search_titles
 from .models import Film, WatchStatus, Review
+from .conditional import film_detail_etag, film_detail_last_modified
+from .posters import POSTER_MAX_AGE, PosterNotFound, get_poster_file, poster_url, tmdb_poster_url
 
 
+@condition(etag_func=film_detail_etag, last_modified_func=film_detail_last_modified)
 def film_detail(request, film_id):
-    film = get_object_or_404(Film.objects.prefetch_related("genres"), id=film_id)
+    # Genres are rendered from a cached fragment, so they are not prefetched
+    film = get_object_or_404(Film, id=film_id)
     user_watch_status = None
     query = request.GET.get("q", "")
     user_review = None
-    tmdb_poster_url = None
+    detail_poster_url = None
     tmdb_rating = None
     tmdb_vote_count = None
 
@@ -27,14 +54,14 @@ def film_detail(request, film_id):
         if film.type == Film.TypeChoices.SERIES:
             media_type = "tv"
         try:
-            tmdb_data = tmdb_get_movie_details(tmdb_id=film.tmdb_id, media_type=media_type)
+            tmdb_data = get_movie_details(tmdb_id=film.tmdb_id, media_type=media_type)
             poster_path = tmdb_data.get("poster_path")
             if poster_path:
-                tmdb_poster_url = f"https://image.tmdb.org/t/p/w500{poster_path}"
+                detail_poster_url = poster_url(poster_path, "detail")
             tmdb_rating = tmdb_data.get("vote_average")
             tmdb_vote_count = tmdb_data.get("vote_count")
-        except Exception:
-            # Fail silently if TMDB is not reachable
+        except RequestException:
+            # Fail silently if TMDB is not reachable and nothing is cached
             pass
 
     if request.user.is_authenticated:
@@ -49,16 +76,21 @@ def film_detail(request, film_id):
         [:20]
     )
 
+    # Average rating from the per-film summary: Review is partitioned by user,
+    # so aggregating reviews of candidate films would scan every partition
     recommendations = (
         Film.objects.filter(genres__in=film.genres.all())
         .exclude(id=film.id)
         .distinct()
         .prefetch_related("genres")
-        .annotate(avg_rating=Avg("reviews__rating"))
-        .order_by("-avg_rating", "-id")[:8]
+        .annotate(
+            avg_rating=Cast("stats__rating_sum", FloatField())
+            / NullIf(F("stats__reviews_count"), 0)
+        )
+        .order_by(F("avg_rating").desc(nulls_last=True), "-id")[:8]
     )
 
-    return render(
+    response = render(
         request,
         "movies/film_detail.html",
         {
@@ -67,7 +99,7 @@ def film_detail(request, film_id):
             "user_review": user_review,
             "avg_rating": avg_rating,
             "rating_count": rating_count,
-            "tmdb_poster_url": tmdb_poster_url,
+            "poster_url": detail_poster_url,
             "tmdb_rating": tmdb_rating,
             "tmdb_vote_count": tmdb_vote_count,
             "reviews": reviews,
@@ -76,6 +108,14 @@ def film_detail(request, film_id):
         },
     )
 
+    if request.user.is_authenticated:
+        # Browser may keep the page but must revalidate it (cheap 304)
+        patch_cache_control(response, private=True, no_cache=True)
+    else:
+        # Anonymous pages are identical for everyone - let proxies share them
+        patch_cache_control(response, public=True, max_age=settings.PUBLIC_PAGE_MAX_AGE)
+    return response
+
 
 @require_POST
 @login_required
@@ -119,47 +159,64 @@ def upsert_review(request, film_id):
             return redirect(f"/films/{film.id}/?{urlencode({'q': query})}")
         return redirect("film_detail", film_id=film.id)
 
-    Review.objects.update_or_create(
-        user=request.user,
-        film=film,
-        defaults={"rating": rating, "text": text},
-    )
+    save_review(user=request.user, film=film, rating=rating, text=text)
 
     messages.success(request, "Your review has been saved.")
     if query:
         return redirect(f"/films/{film.id}/?{urlencode({'q': query})}")
     return redirect("film_detail", film_id=film.id)
 
+# Максимум элементов в одном запросе bulk-обновления
+MAX_BULK_ITEMS = 5000
+
+
+@require_POST
+@login_required
+def bulk_update_library(request):
+    """
+    Массовое обновление статусов и отзывов (JSON API).
+
+    Body: {"items": [{"tmdb_id" or "film_id", "type", "status", "rating", "text"}, ...]}
+    Фильмы с неизвестным tmdb_id импортируются из TMDB в фоне ("importing").
+    """
+    try:
+        payload = json.loads(request.body)
+        items = payload["items"]
+    except (ValueError, TypeError, KeyError):
+        return JsonResponse({"error": "Expected JSON body with 'items' list"}, status=400)
+
+    if not isinstance(items, list):
+        return JsonResponse({"error": "'items' must be a list"}, status=400)
+    if len(items) > MAX_BULK_ITEMS:
+        return JsonResponse({"error": f"At most {MAX_BULK_ITEMS} items per request"}, status=400)
+
+    result = bulk_upsert_library(user=request.user, items=items)
+    return JsonResponse(result)
+
+
 def search_movies(request):
     query = request.GET.get("q")
     results = []
 
     if query:
-        tmdb_results = tmdb_search_movie(query)
+        items = items_from_tmdb(tmdb_search_movie(query))
+        # Remember results so that adding one of them doesn't need TMDB
+        cache_tmdb_items(items)
         
         # Добавляем информацию о том, есть ли фильм в БД и его статус у пользователя
-        for movie in tmdb_results:
-            tmdb_id = movie.get('id')
-            try:
-                film = Film.objects.get(tmdb_id=tmdb_id)
-                movie['in_database'] = True
-                movie['film_id'] = film.id
-                
-                # Проверяем статус у текущего пользователя
-                if request.user.is_authenticated:
-                    watch_status = WatchStatus.objects.filter(
-                        user=request.user,
-                        film=film
-                    ).first()
-                    movie['user_status'] = watch_status.status if watch_status else None
-                else:
-                    movie['user_status'] = None
-            except Film.DoesNotExist:
-                movie['in_database'] = False
-                movie['film_id'] = None
-                movie['user_status'] = None
-        
-        results = tmdb_results
+        tmdb_ids = [item.id for item in items]
+        film_ids = dict(
+            Film.objects.filter(tmdb_id__in=tmdb_ids).values_list("tmdb_id", "id")
+        )
+        user_statuses = get_user_statuses_by_tmdb_id(user=request.user, tmdb_ids=tmdb_ids)
+        results = [
+            TMDBCard(item, film_id=film_ids.get(item.id), user_status=user_statuses.get(item.id))
+            for item in items
+        ]
+
+        # TMDB недоступен - ищем по локальной базе
+        if not results and not tmdb_is_available():
+            results = _search_local_films(request.user, query)
 
     context = {
         "query": query,
@@ -168,6 +225,80 @@ def search_movies(request):
     return render(request, "movies/search_movies.html", context)
 
 
+def autocomplete(request):
+    """Подсказки названий для поиска (из локального индекса, без TMDB)"""
+    query = request.GET.get("q", "")
+    try:
+        limit = max(1, min(int(request.GET.get("limit", 10)), 20))
+    except ValueError:
+        limit = 10
+
+    try:
+        entries = search_titles(query, limit=limit)
+    except RedisError:
+        # Подсказки необязательны: без Redis просто не показываем их
+        entries = []
+
+    suggestions = [
+        {
+            "title": entry["title"],
+            "year": entry["year"],
+            "media_type": entry["media_type"],
+            "film_id": entry["film_id"],
+        }
+        for entry in entries
+    ]
+    return JsonResponse({"query": query, "results": suggestions})
+
+
+def _search_local_films(user, query):
+    """Search films in our DB, shaped like TMDB search results (degraded mode)"""
+    films = list(Film.objects.filter(title__icontains=query, tmdb_id__isnull=False).order_by("-id")[:20])
+    user_statuses = {}
+    if user.is_authenticated:
+        user_statuses = dict(
+            WatchStatus.objects.filter(user=user, film__in=films).values_list("film_id", "status")
+        )
+
+    return [
+        TMDBCard(
+            TMDBItem(
+                id=film.tmdb_id,
+                media_type="movie" if film.type == Film.TypeChoices.MOVIE else "tv",
+                title=film.title,
+                year=film.start_year,
+                overview=film.description,
+            ),
+            film_id=film.id,
+            user_status=user_statuses.get(film.id),
+        )
+        for film in films
+    ]
+
+
+def _get_or_import_film(tmdb_id, media_type):
+    """
+    Film by TMDB id, imported if needed: from the cached search/feed result
+    when there is one (details are refreshed in the background), otherwise
+    from TMDB details.
+
+    Raises requests.RequestException if TMDB is needed and unavailable.
+    """
+    film = Film.objects.filter(tmdb_id=tmdb_id).first()
+    if film is not None:
+        return film
+
+    item = get_cached_tmdb_item(tmdb_id, media_type)
+    if item is not None:
+        film, created = import_tmdb_item(item)
+        if created:
+            enqueue(refresh_films_batch, [film.id])
+        return film
+
+    tmdb_data = get_movie_details(tmdb_id=tmdb_id, media_type=media_type)
+    return import_tmdb_movie(tmdb_data)
+
+
 @require_POST
 @login_required
 def quick_add_movie(request):
@@ -177,20 +308,16 @@ def quick_add_movie(request):
     status = request.POST.get("status")
     query = request.POST.get("query", "")
 
-    if not tmdb_id or not media_type or not status:
+    if not tmdb_id or not tmdb_id.isdigit() or not media_type or not status:
         messages.error(request, "Missing required data")
         return redirect("search_movies")
 
-    # Проверяем, есть ли фильм в БД
+    # Берём фильм из БД или импортируем (из результата поиска, без запроса к TMDB)
     try:
-        film = Film.objects.get(tmdb_id=tmdb_id)
-    except Film.DoesNotExist:
-        # Если нет - импортируем из TMDB
-        tmdb_data = tmdb_get_movie_details(
-            tmdb_id=tmdb_id,
-            media_type=media_type
-        )
-        film = import_tmdb_movie(tmdb_data)
+        film = _get_or_import_film(int(tmdb_id), media_type)
+    except RequestException:
+        messages.error(request, "TMDB is unavailable right now, please try again later.")
+        return redirect(f"/search/?{urlencode({'q': query})}")
 
     # Устанавливаем статус
     set_watch_status(user=request.user, film=film, status=status)
@@ -198,7 +325,7 @@ def quick_add_movie(request):
     messages.success(request, f"'{film.title}' added to {status}!")
     
     # Возвращаемся на поиск с сохранением запроса
-    return redirect(f"/movies/search/?q={query}")
+    return redirect(f"/search/?{urlencode({'q': query})}")
 
 
 @require_POST
@@ -208,15 +335,16 @@ def add_movie(request):
     media_type = request.POST.get("media_type")
     query = request.POST.get("query", "")
 
-    if not tmdb_id or not media_type:
+    if not tmdb_id or not tmdb_id.isdigit() or not media_type:
         return redirect("search_movies")
 
-    tmdb_data = tmdb_get_movie_details(
-        tmdb_id=tmdb_id,
-        media_type=media_type
-    )
-
-    film = import_tmdb_movie(tmdb_data)
+    try:
+        film = _get_or_import_film(int(tmdb_id), media_type)
+    except RequestException:
+        messages.error(request, "TMDB is unavailable right now, please try again later.")
+        if query:
+            return redirect(f"/search/?{urlencode({'q': query})}")
+        return redirect("search_movies")
 
     # Редирект на детальную страницу фильма
     if query:
@@ -230,17 +358,40 @@ def recommendations(request):
     rec_list = get_user_recommendations(user=request.user, limit=24)
     
     # Check which films are already in user's database
-    if rec_list:
-        rec_ids = [item.get('id') for item in rec_list]
-        user_films = {
-            ws.film.tmdb_id: ws.status 
-            for ws in WatchStatus.objects.filter(user=request.user, film__tmdb_id__in=rec_ids).select_related('film')
-        }
-        for item in rec_list:
-            item['user_status'] = user_films.get(item.get('id'))
+    user_films = get_user_statuses_by_tmdb_id(
+        user=request.user,
+        tmdb_ids=[item.id for item in rec_list],
+    )
+    rec_list = [TMDBCard(item, user_status=user_films.get(item.id)) for item in rec_list]
     
     context = {
         'recommendations': rec_list,
     }
     
-    return render(request, 'movies/recommendations.html', context)
\ No newline at end of file
+    return render(request, 'movies/recommendations.html', context)
+
+
+def poster(request, variant, filename):
+    """Poster proxied from TMDB and stored locally (see movies.posters)"""
+    poster_path = f"/{filename}"
+    try:
+        path, content_type = get_poster_file(poster_path, variant, request.GET.get("s"))
+    except PosterNotFound:
+        raise Http404("Poster not found")
+    except RequestException:
+        # TMDB image CDN not reachable: let the browser load it directly this time
+        response = redirect(tmdb_poster_url(poster_path))
+        patch_cache_control(response, public=True, max_age=60)
+        return response
+
+    if settings.POSTER_ACCEL_REDIRECT:
+        # nginx serves the file itself (internal location mapped to POSTER_ROOT)
+        response = HttpResponse(content_type=content_type)
+        relative = path.relative_to(settings.POSTER_ROOT).as_posix()
+        response["X-Accel-Redirect"] = f"{settings.POSTER_ACCEL_REDIRECT.rstrip('/')}/{relative}"
+    else:
+        # Uses the server's wsgi.file_wrapper (sendfile) when available
+        response = FileResponse(open(path, "rb"), content_type=content_type)
+
+    patch_cache_control(response, public=True, max_age=POSTER_MAX_AGE, immutable=True)
+    return response
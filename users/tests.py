@@ -1,3 +1,66 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from redis.exceptions import RedisError
+
+from movies.models import Film, WatchStatus
+from movies.tests import LOCMEM_CACHES, make_user
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class DashboardTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.feed = mock.Mock(side_effect=AssertionError("feeds are loaded by the rails"))
+        patcher = mock.patch.dict("users.views.DASHBOARD_RAILS", {
+            "trending": (self.feed, "trending"),
+            "popular": (self.feed, "popular"),
+        })
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_guests_get_the_landing_page(self):
+        response = self.client.get(reverse("home"))
+        self.assertTrue(response.context["show_landing"])
+
+    def test_shell_renders_counters_without_feeds(self):
+        WatchStatus.objects.create(user=self.user, film=Film.objects.create(title="Film"), status="watching")
+        self.client.force_login(self.user)
+
+        response = self.client.get(reverse("home"))
+
+        self.assertEqual(response.context["watching_count"], 1)
+        for rail in ("trending", "popular"):
+            self.assertContains(response, reverse("dashboard_rail", args=[rail]))
+        self.feed.assert_not_called()
+
+    def test_rails_require_login(self):
+        response = self.client.get(reverse("dashboard_rail", args=["trending"]))
+        self.assertEqual(response.status_code, 302)
+
+    def test_unknown_rail(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse("dashboard_rail", args=["other"])).status_code, 404)
+
+    @mock.patch("movies.leaderboards.get_leaderboard", side_effect=RedisError)
+    def test_leaderboard_rail_survives_redis_errors(self, get_leaderboard):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("dashboard_rail", args=["most-added"]))
+        self.assertEqual(response.context["entries"], [])
+
+    @mock.patch("movies.leaderboards.get_leaderboard")
+    def test_leaderboard_rail_marks_films_in_library(self, get_leaderboard):
+        film, other = Film.objects.create(title="Film"), Film.objects.create(title="Other")
+        WatchStatus.objects.create(user=self.user, film=film, status="planned")
+        get_leaderboard.return_value = [(film, 3.0), (other, 1.5)]
+        self.client.force_login(self.user)
+
+        response = self.client.get(reverse("dashboard_rail", args=["best-rated"]))
+
+        self.assertEqual(
+            [(entry["film"], entry["user_status"]) for entry in response.context["entries"]],
+            [(film, "planned"), (other, None)],
+        )
+        self.assertContains(response, "#1 Film")
+        get_leaderboard.assert_called_once_with("rated", "week", limit=20)
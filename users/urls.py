@@ -1,13 +1,15 @@
 from django.urls import path
 from django.contrib.auth import views as auth_views
-from .views import home, signup, profile, watchlist
+from .views import home, dashboard_rail, signup, profile, watchlist, export_library
 
 urlpatterns = [
     path("", home, name="home"),
+    path("dashboard/rails/<str:rail>/", dashboard_rail, name="dashboard_rail"),
     path("login/", auth_views.LoginView.as_view(), name="login"),
     path("logout/", auth_views.LogoutView.as_view(), name="logout"),
     path("signup/", signup, name="signup"),
     path("profile/", profile, name="profile"),
     path("profile/<str:username>/", profile, name="profile_user"),
     path("watchlist/<str:status>/", watchlist, name="watchlist"),
+    path("export/<str:fmt>/", export_library, name="export_library"),
 ]
\ No newline at end of file
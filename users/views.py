@@ -1,13 +1,55 @@
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import login
 from django.shortcuts import render, redirect, get_object_or_404
+from django.http import Http404, StreamingHttpResponse
+from django.views.decorators.http import condition
+from django.views.decorators.cache import cache_control
 from django.contrib import messages
-from django.db.models import Avg, Count
-from django.core.cache import cache
+from redis.exceptions import RedisError
 from .forms import SignUpForm
 from .models import User
 from movies.models import WatchStatus, Review, Film
-from movies.tmdb_client import tmdb_get_trending, tmdb_get_popular
+from movies.services import (
+    get_user_statuses_by_tmdb_id,
+    get_user_status_counts,
+    get_user_profile_stats,
+)
+from movies.services_tmdb import (
+    get_trending_feed,
+    get_popular_feed,
+    get_feed_versions,
+    get_cached_tmdb_items,
+    TRENDING_FEED_KEY,
+    POPULAR_FEED_KEY,
+    FILM_MEDIA_TYPES,
+)
+from movies import leaderboards
+from movies.services_export import EXPORT_FORMATS, stream_library_export
+from movies.timelines import get_user_activity
+from movies.conditional import (
+    profile_etag,
+    profile_last_modified,
+    watchlist_etag,
+    watchlist_last_modified,
+)
+from movies.tmdb_types import TMDBCard
+
+
+ACTIVITY_PAGE_SIZE = 20
+
+
+# Dashboard rails loaded after the shell: name -> (feed getter, feed cache key)
+DASHBOARD_RAILS = {
+    'trending': (get_trending_feed, TRENDING_FEED_KEY),
+    'popular': (get_popular_feed, POPULAR_FEED_KEY),
+}
+
+# Site-wide leaderboards: name -> (metric, window)
+LEADERBOARD_RAILS = {
+    'most-added': (leaderboards.ADDED, 'week'),
+    'best-rated': (leaderboards.RATED, 'week'),
+}
+LEADERBOARD_SIZE = 20
 
 
 def home(request):
@@ -15,51 +57,76 @@ def home(request):
     if not request.user.is_authenticated:
         return render(request, "home.html", {'show_landing': True})
     
-    # Quick stats
-    watching_count = WatchStatus.objects.filter(user=request.user, status=WatchStatus.Status.WATCHING).count()
-    planned_count = WatchStatus.objects.filter(user=request.user, status=WatchStatus.Status.PLANNED).count()
-    watched_count = WatchStatus.objects.filter(user=request.user, status=WatchStatus.Status.WATCHED).count()
+    # Only the quick stats (cached until the user's next write) are rendered here;
+    # TMDB rails are fetched by the page from dashboard_rail in parallel
+    counts = get_user_status_counts(user=request.user)
     
-    # Get trending from cache or TMDB (cache for 1 hour)
-    trending = cache.get('trending_week')
-    if trending is None:
-        trending = tmdb_get_trending(media_type="all", time_window="week")[:12]
-        cache.set('trending_week', trending, 60 * 60)  # 1 hour
+    context = {
+        'watching_count': counts[WatchStatus.Status.WATCHING],
+        'planned_count': counts[WatchStatus.Status.PLANNED],
+        'watched_count': counts[WatchStatus.Status.WATCHED],
+    }
     
-    # Get popular movies from cache or TMDB (cache for 6 hours)
-    popular = cache.get('popular_movies')
-    if popular is None:
-        popular = tmdb_get_popular(media_type="movie")[:12]
-        cache.set('popular_movies', popular, 60 * 60 * 6)  # 6 hours
+    return render(request, "home.html", context)
+
+
+@login_required
+@cache_control(private=True, no_cache=True)
+def dashboard_rail(request, rail):
+    """HTML fragment with one dashboard rail (trending / popular / leaderboards)"""
+    if rail in LEADERBOARD_RAILS:
+        return _leaderboard_rail(request, *LEADERBOARD_RAILS[rail])
+    if rail not in DASHBOARD_RAILS:
+        raise Http404("Unknown rail")
+    get_feed, feed_key = DASHBOARD_RAILS[rail]
     
-    # Check which films are already in user's database
-    if trending:
-        trending_ids = [item.get('id') for item in trending]
-        user_films = {
-            ws.film.tmdb_id: ws.status 
-            for ws in WatchStatus.objects.filter(user=request.user, film__tmdb_id__in=trending_ids).select_related('film')
-        }
-        for item in trending:
-            item['user_status'] = user_films.get(item.get('id'))
+    # Feeds are cached (trending - 1 hour, popular - 6 hours) and shared by all users
+    items = get_feed()
     
-    if popular:
-        popular_ids = [item.get('id') for item in popular]
-        user_films_pop = {
-            ws.film.tmdb_id: ws.status 
-            for ws in WatchStatus.objects.filter(user=request.user, film__tmdb_id__in=popular_ids).select_related('film')
-        }
-        for item in popular:
-            item['user_status'] = user_films_pop.get(item.get('id'))
+    # Check which films are already in user's database
+    user_films = get_user_statuses_by_tmdb_id(
+        user=request.user,
+        tmdb_ids={item.id for item in items},
+    )
     
     context = {
-        'watching_count': watching_count,
-        'planned_count': planned_count,
-        'watched_count': watched_count,
-        'trending_films': trending,
-        'popular_films': popular,
+        'movies': [TMDBCard(item, user_status=user_films.get(item.id)) for item in items],
+        # Card fragments are cached per (tmdb_id, feed version)
+        'feed_version': get_feed_versions(feed_key)[feed_key],
     }
     
-    return render(request, "home.html", context)
+    return render(request, 'users/dashboard_rail.html', context)
+
+
+def _leaderboard_rail(request, metric, window):
+    # Top-N from one Redis call, films hydrated in one query
+    try:
+        entries = leaderboards.get_leaderboard(metric, window, limit=LEADERBOARD_SIZE)
+    except RedisError:
+        entries = []
+
+    films = [film for film, _ in entries]
+    statuses = dict(
+        WatchStatus.objects.filter(user=request.user, film__in=films).values_list("film_id", "status")
+    )
+    # Posters of films seen in search/feed results (one cache round trip)
+    cached = get_cached_tmdb_items(
+        (film.tmdb_id, FILM_MEDIA_TYPES[film.type]) for film in films if film.tmdb_id
+    )
+
+    context = {
+        'entries': [
+            {
+                'film': film,
+                'score': score,
+                'poster_path': getattr(cached.get((film.tmdb_id, FILM_MEDIA_TYPES[film.type])), 'poster_path', None),
+                'user_status': statuses.get(film.id),
+            }
+            for film, score in entries
+        ],
+        'metric': metric,
+    }
+    return render(request, 'users/leaderboard_rail.html', context)
 
 
 def signup(request):
@@ -82,6 +149,8 @@ def signup(request):
 
 
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=profile_etag, last_modified_func=profile_last_modified)
 def profile(request, username=None):
     """User profile with statistics"""
     if username:
@@ -89,33 +158,40 @@ def profile(request, username=None):
     else:
         user = request.user
     
-    # Get counts for each status
-    planned_count = WatchStatus.objects.filter(user=user, status=WatchStatus.Status.PLANNED).count()
-    watching_count = WatchStatus.objects.filter(user=user, status=WatchStatus.Status.WATCHING).count()
-    watched_count = WatchStatus.objects.filter(user=user, status=WatchStatus.Status.WATCHED).count()
-    dropped_count = WatchStatus.objects.filter(user=user, status=WatchStatus.Status.DROPPED).count()
+    # Counts for each status and average rating (cached until the user's next write)
+    stats = get_user_profile_stats(user=user)
+    counts = stats['counts']
     
-    # Get user's average rating
-    user_reviews = Review.objects.filter(user=user)
-    avg_rating = user_reviews.aggregate(avg=Avg('rating'))['avg']
-    reviews_count = user_reviews.count()
+    # Recent activity (from Redis timeline, films hydrated in one query)
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        page = 1
+    activities = get_user_activity(user=user, page=page, per_page=ACTIVITY_PAGE_SIZE)
     
     context = {
         'profile_user': user,
         'is_own_profile': user == request.user,
-        'planned_count': planned_count,
-        'watching_count': watching_count,
-        'watched_count': watched_count,
-        'dropped_count': dropped_count,
-        'total_count': planned_count + watching_count + watched_count + dropped_count,
-        'avg_rating': avg_rating,
-        'reviews_count': reviews_count,
+        'planned_count': counts[WatchStatus.Status.PLANNED],
+        'watching_count': counts[WatchStatus.Status.WATCHING],
+        'watched_count': counts[WatchStatus.Status.WATCHED],
+        'dropped_count': counts[WatchStatus.Status.DROPPED],
+        'total_count': stats['total_count'],
+        'avg_rating': stats['avg_rating'],
+        'reviews_count': stats['reviews_count'],
+        # Precomputed taste profile, part of the cached stats (no extra queries)
+        'taste': stats['taste'],
+        'activities': activities,
+        'activity_page': page,
+        'has_more_activity': len(activities) == ACTIVITY_PAGE_SIZE,
     }
     
     return render(request, 'users/profile.html', context)
 
 
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=watchlist_etag, last_modified_func=watchlist_last_modified)
 def watchlist(request, status):
     """Display user's watchlist by status"""
     valid_statuses = {choice for choice, _ in WatchStatus.Status.choices}
@@ -142,4 +218,20 @@ def watchlist(request, status):
         'user_reviews': user_reviews,
     }
     
-    return render(request, 'users/watchlist.html', context)
\ No newline at end of file
+    return render(request, 'users/watchlist.html', context)
+
+
+@login_required
+def export_library(request, fmt):
+    """Stream user's watchlist and reviews as CSV or JSON Lines"""
+    if fmt not in EXPORT_FORMATS:
+        raise Http404("Unknown export format")
+
+    response = StreamingHttpResponse(
+        stream_library_export(user=request.user, fmt=fmt),
+        content_type=EXPORT_FORMATS[fmt],
+    )
+    response["Content-Disposition"] = (
+        f'attachment; filename="cinema-tracker-{request.user.username}.{fmt}"'
+    )
+    return response